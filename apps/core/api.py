@@ -0,0 +1,76 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def dumps(data):
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def loads(data):
+    """Parse JSON from bytes or str, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse equivalent with compact output and an orjson fast path"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class FieldSet:
+    """
+    Declarative sparse fieldset for ``.values()`` based endpoints.
+
+    ``fields`` maps each public field name to ``(columns, render)`` where
+    ``columns`` are the ``.values()`` paths it needs and ``render`` turns a
+    row dict into the output value (``None`` copies the single column).
+    """
+
+    def __init__(self, fields, default):
+        self.fields = fields
+        self.default = tuple(default)
+
+    def parse(self, raw):
+        """Validate a ``?fields=a,b`` value; empty means the default set"""
+        if not raw:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+        return names or self.default
+
+    def columns(self, names, required=()):
+        columns = dict.fromkeys(required)
+        for name in names:
+            columns.update(dict.fromkeys(self.fields[name][0]))
+        return list(columns)
+
+    def render(self, row, names):
+        item = {}
+        for name in names:
+            columns, render = self.fields[name]
+            item[name] = render(row) if render else row[columns[0]]
+        return item
+
+
+def error_response(message, status=400):
+    return FastJsonResponse({'error': message}, status=status)
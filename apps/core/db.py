@@ -0,0 +1,30 @@
+from django.db import connections, router
+
+
+def update_rows(model, fields, rows, using=None):
+    """
+    ``UPDATE ... WHERE pk = %s`` for many rows with a single executemany.
+
+    ``rows`` are ``(pk, value, ...)`` tuples in ``fields`` order. Unlike
+    ``QuerySet.bulk_update`` no CASE expression is built per row, which
+    dominates the cost once there are thousands of them. Signals and
+    ``auto_now`` fields are skipped just the same.
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    meta = model._meta
+    model_fields = [meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in model_fields),
+        quote(meta.pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(value, connection) for field, value in zip(model_fields, values)] + [pk]
+        for pk, *values in rows
+    ]
+    if params:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+    return len(params)
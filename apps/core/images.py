@@ -0,0 +1,151 @@
+import hashlib
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from PIL import Image, ImageOps, features
+
+# Bounding boxes; thumbnail() keeps the aspect ratio and never upscales
+DERIVATIVE_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 360),
+    'detail': (1200, 900),
+}
+
+DERIVATIVE_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+
+def _field_names(field_name):
+    return f'{field_name}_hash', f'{field_name}_derivatives'
+
+
+def needs_processing(instance, field_name):
+    """True when the recorded derivatives were not built from the current source file"""
+    _, derivatives_attr = _field_names(field_name)
+    source = getattr(instance, field_name).name or None
+    return (getattr(instance, derivatives_attr) or {}).get('source') != source
+
+
+def pending_derivatives(queryset, field_name):
+    """Rows of ``queryset`` that ``needs_processing`` would pick, filtered in SQL"""
+    _, derivatives_attr = _field_names(field_name)
+    source = f'{derivatives_attr}__source'
+    return queryset.exclude(**{field_name: ''}).filter(
+        Q(**{f'{source}__isnull': True}) | ~Q(**{source: F(field_name)})
+    )
+
+
+def _hash_file(field_file):
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    for chunk in field_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def delete_derivative_files(derivatives):
+    """Remove the files recorded in a ``*_derivatives`` value; they belong to one row only"""
+    for entry in (derivatives or {}).get('sizes', {}).values():
+        for fmt in DERIVATIVE_FORMATS:
+            path = entry.get(fmt)
+            if path:
+                default_storage.delete(path)
+
+
+def _render_derivatives(field_file, base_path):
+    field_file.seek(0)
+    with Image.open(field_file) as source:
+        img = ImageOps.exif_transpose(source)
+        if img.mode != 'RGB':
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            rgba = img.convert('RGBA')
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+
+        sizes = {}
+        for size_name, box in DERIVATIVE_SIZES.items():
+            variant = img.copy()
+            variant.thumbnail(box, Image.Resampling.LANCZOS)
+            entry = {'width': variant.width, 'height': variant.height}
+
+            for fmt, (pil_format, extension, options) in DERIVATIVE_FORMATS.items():
+                if fmt == 'webp' and not features.check('webp'):
+                    continue
+                buffer = BytesIO()
+                variant.save(buffer, format=pil_format, **options)
+                path = f'{base_path}_{size_name}.{extension}'
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                entry[fmt] = default_storage.save(path, ContentFile(buffer.getvalue()))
+
+            sizes[size_name] = entry
+        return sizes
+
+
+def normalize_image(source_path, target_path, box, quality=85):
+    """
+    Flatten the image at ``source_path`` onto white RGB, shrink it to fit
+    ``box`` and write it to ``target_path`` as JPEG; returns the new size.
+    Only touches files, so it can run in a worker process.
+    """
+    with Image.open(source_path) as source:
+        img = source
+        if img.mode in ('RGBA', 'P', 'LA'):
+            # White background for transparency
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            rgba = img.convert('RGBA')
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+        img.save(target_path, format='JPEG', quality=quality, optimize=True)
+        return img.size
+
+
+def generate_derivatives(model_label, pk, field_name, force=False):
+    """
+    Build card/detail/thumbnail renditions (JPEG + WebP) of ``field_name``
+    and record their paths and dimensions on the row.
+
+    Encoding is skipped when the source bytes hash to the recorded value.
+    Only the ``process_image_derivatives`` worker calls this; web requests
+    never encode images, they serve the source until the worker catches up.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+
+    hash_attr, derivatives_attr = _field_names(field_name)
+    field_file = getattr(instance, field_name)
+    previous = getattr(instance, derivatives_attr) or {}
+
+    if not field_file:
+        delete_derivative_files(previous)
+        model.objects.filter(pk=pk).update(**{hash_attr: '', derivatives_attr: {}})
+        return {}
+
+    try:
+        digest = _hash_file(field_file)
+        if not force and digest == getattr(instance, hash_attr) and previous.get('sizes'):
+            derivatives = dict(previous, source=field_file.name)
+        else:
+            base_path = f'derivatives/{instance._meta.model_name}/{pk}/{digest[:16]}'
+            sizes = _render_derivatives(field_file, base_path)
+            if previous.get('hash') != digest:
+                delete_derivative_files(previous)
+            derivatives = {'source': field_file.name, 'hash': digest, 'sizes': sizes}
+    finally:
+        field_file.close()
+
+    # Only record the result if the source wasn't replaced while we were working
+    model.objects.filter(pk=pk, **{field_name: field_file.name}).update(
+        **{hash_attr: digest, derivatives_attr: derivatives}
+    )
+    return derivatives
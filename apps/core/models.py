@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """
+    A file kept under its content hash by ``ContentAddressedStorage``,
+    with the number of rows that point at it. Files nothing refers to
+    any more are found with an indexed query instead of a directory walk.
+    """
+    path = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When ref_count last dropped to zero; cleanup waits out a grace period
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['ref_count', 'released_at'])]
+
+    def __str__(self):
+        return f'{self.path} ({self.ref_count} refs)'
@@ -0,0 +1,197 @@
+import base64
+import hashlib
+import json
+from functools import cached_property
+
+from django.core.cache import cache
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPaginator:
+    """
+    Keyset ("seek") paginator.
+
+    Pages are addressed by an opaque cursor that encodes the ordering values
+    of the row on the page boundary, so page N costs the same as page 1 and
+    no COUNT(*) is needed to render next/previous links. ``ordering`` must end
+    in a unique column (``id``) to give a total order. Nullable columns can be
+    given as ``F(name).asc(nulls_last=True)`` (or ``nulls_first``); plain names
+    are assumed to hold no NULLs.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), count_timeout=300):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.keys = [self._key(item) for item in self.ordering]
+        self.fields = [name for name, _, _ in self.keys]
+        self.count_timeout = count_timeout
+
+    def encode_cursor(self, obj, direction):
+        # Rows may be model instances or .values() dicts
+        get = obj.get if isinstance(obj, dict) else lambda name: getattr(obj, name)
+        values = [self._serialize(get(name)) for name in self.fields]
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, values = payload['d'], payload['v']
+            if direction not in ('next', 'prev') or len(values) != len(self.fields):
+                raise ValueError('cursor does not match ordering')
+            return direction, [self._to_python(name, value) for name, value in zip(self.fields, values)]
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidCursor(str(e))
+
+    def page(self, cursor=None):
+        """Return the page after/before ``cursor``; an invalid cursor yields the first page"""
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'next', None
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, reverse=direction == 'prev'))
+        if direction == 'prev':
+            queryset = queryset.order_by(*[self._flip(name) for name in self.ordering])
+
+        # Fetch one extra row to learn whether there is another page
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(rows, self, has_next=has_next, has_previous=has_previous)
+
+    @cached_property
+    def approximate_count(self):
+        """COUNT(*) of the whole queryset, cached briefly per distinct query"""
+        if self.queryset.query.is_empty():
+            return 0
+        key = 'cursor_count:' + hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.queryset.count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    def _seek_filter(self, values, reverse=False):
+        # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition, equal = Q(), Q()
+        for (name, descending, nulls_last), value in zip(self.keys, values):
+            nulls_after = None if nulls_last is None else nulls_last != reverse
+            after = self._after(name, descending != reverse, nulls_after, value)
+            if after is not None:
+                condition |= equal & after
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _after(name, descending, nulls_after, value):
+        """Rows strictly past ``value`` in one column, or None if there can be none"""
+        if value is None:
+            # Only non-NULL rows can follow a NULL, and only if NULLs sort first
+            return Q(**{f'{name}__isnull': False}) if nulls_after is False else None
+        after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+        if nulls_after:
+            after |= Q(**{f'{name}__isnull': True})
+        return after
+
+    def _to_python(self, name, value):
+        annotation = self.queryset.query.annotations.get(name)
+        field = annotation.output_field if annotation is not None else self.queryset.model._meta.get_field(name)
+        return field.to_python(value)
+
+    @staticmethod
+    def _serialize(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @staticmethod
+    def _key(item):
+        """``(field, descending, nulls_last)`` for a name or ``OrderBy``; nulls_last is None if unspecified"""
+        if isinstance(item, str):
+            return item.lstrip('-'), item.startswith('-'), None
+        nulls_last = True if item.nulls_last else False if item.nulls_first else None
+        return item.expression.name, item.descending, nulls_last
+
+    @staticmethod
+    def _flip(item):
+        if isinstance(item, str):
+            return item[1:] if item.startswith('-') else f'-{item}'
+        return item.copy().reverse_ordering()
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], 'prev')
+        return None
+
+    @property
+    def approximate_count(self):
+        return self.paginator.approximate_count
+
+
+class CursorPaginationMixin:
+    """
+    Drop-in replacement for ListView's OFFSET pagination.
+
+    Reads the cursor from ``?cursor=`` and exposes the usual ``paginator``,
+    ``page_obj`` and ``is_paginated`` context; ``page_obj`` offers
+    ``next_cursor``/``previous_cursor`` instead of page numbers.
+    """
+    cursor_kwarg = 'cursor'
+    cursor_ordering = ('-created_at', '-id')
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, ordering=self.get_cursor_ordering())
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
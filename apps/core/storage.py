@@ -0,0 +1,86 @@
+import hashlib
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Now
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+def _stored_files():
+    return apps.get_model('core', 'StoredFile').objects
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Saves files as ``<upload dir>/<ab>/<sha256><ext>``, ignoring the
+    name they came with, so identical bytes are stored once: saving them
+    again returns the existing path without writing anything. Every file
+    gets a ``StoredFile`` row; ``retain_files``/``release_files`` keep
+    its reference count as rows start and stop pointing at it.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest, size = hashlib.sha256(), 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        digest = digest.hexdigest()
+
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), digest[:2], digest + extension)
+        if not self.exists(name):
+            # Two writers racing on new content leave one suffixed copy, indexed as well
+            name = self._save(name, content)
+        _stored_files().get_or_create(path=name, defaults={'sha256': digest, 'size': size})
+        return name
+
+
+content_storage = ContentAddressedStorage()
+
+
+def _group_by_count(paths):
+    """``{count: [paths]}`` so repeated paths cost one UPDATE per distinct count"""
+    groups = {}
+    for path, count in Counter(path for path in paths if path).items():
+        groups.setdefault(count, []).append(path)
+    return groups
+
+
+def retain_files(paths):
+    """Count one more reference to each path (repeats count repeatedly); unindexed paths are ignored"""
+    for count, group in _group_by_count(paths).items():
+        _stored_files().filter(path__in=group).update(ref_count=F('ref_count') + count, released_at=None)
+
+
+def release_files(paths):
+    """Drop one reference per path; files reaching zero become eligible for cleanup"""
+    groups = _group_by_count(paths)
+    for count, group in groups.items():
+        # Never below zero, even if a reference was made without being counted
+        _stored_files().filter(path__in=group).update(ref_count=Greatest(F('ref_count') - count, 0))
+    released = [path for group in groups.values() for path in group]
+    _stored_files().filter(path__in=released, ref_count=0, released_at=None).update(released_at=Now())
+
+
+def unreferenced_files(min_age=timedelta(hours=24)):
+    """
+    Files no row has pointed at for ``min_age``. Files that were saved
+    but never referenced (the row meant to use them failed to save)
+    qualify ``min_age`` after they were written.
+    """
+    cutoff = timezone.now() - min_age
+    return _stored_files().filter(ref_count=0).filter(
+        Q(released_at__lt=cutoff) | Q(released_at__isnull=True, created_at__lt=cutoff)
+    )
@@ -0,0 +1,21 @@
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+@register.simple_tag
+def image_srcset(derivatives, fmt='jpeg'):
+    """``srcset`` value listing every recorded derivative width of one format"""
+    sizes = (derivatives or {}).get('sizes', {})
+    candidates = {}
+    for entry in sizes.values():
+        # Small sources produce identical widths; a srcset may list each width once
+        if entry.get(fmt):
+            candidates.setdefault(entry['width'], default_storage.url(entry[fmt]))
+    return ', '.join(f'{candidates[width]} {width}w' for width in sorted(candidates))
+
+@register.simple_tag
+def derivative_url(derivatives, size, fallback='', fmt='jpeg'):
+    """URL of a single derivative, or ``fallback`` while it hasn't been generated yet"""
+    entry = (derivatives or {}).get('sizes', {}).get(size, {})
+    return default_storage.url(entry[fmt]) if entry.get(fmt) else fallback
@@ -17,7 +17,7 @@ class HomeView(TemplateView):
             # Featured recipes (public recipes)
             featured_recipes = Recipe.objects.filter(
                 is_public=True
-            ).select_related('author', 'category').order_by('-created_at')[:6]
+            ).select_related('author', 'category').with_card_stats().order_by('-created_at')[:6]
             
             context['featured_recipes'] = featured_recipes
             context['total_recipes'] = Recipe.objects.filter(is_public=True).count()
@@ -50,7 +50,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             from apps.shopping.models import ShoppingList
             
             # User's recent recipes
-            user_recipes = Recipe.objects.filter(author=user).order_by('-created_at')[:5]
+            user_recipes = Recipe.objects.filter(author=user).select_related('category').with_card_stats().order_by('-created_at')[:5]
             
             # This week's meal plans
             today = date.today()
@@ -16,10 +16,12 @@ import sys
 import os
 from django.http import JsonResponse, HttpResponse
 from .utils.pdf_export import export_week_to_pdf
+from apps.core.pagination import CursorPaginationMixin
 import json
 from .models import MealPlan, MealPlanTemplate, MealPlanTemplateItem, WeeklyMealPlan
 from .forms import MealPlanForm, MealPlanTemplateForm
 from apps.recipes.models import Recipe, Category
+from apps.recipes.services.search_index import search_recipes
 from django.conf import settings
 
 
@@ -88,7 +90,7 @@ def meal_calendar(request):
     
     return render(request, 'meal_planning/calendar.html', context)
 
-class MealPlanTemplateListView(LoginRequiredMixin, ListView):
+class MealPlanTemplateListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = MealPlanTemplate
     template_name = 'meal_planning/template_list.html'
     context_object_name = 'templates'
@@ -290,18 +292,17 @@ def recipe_search_ajax(request):
     
     recipes = Recipe.objects.filter(
         Q(author=request.user) | Q(is_public=True)
-    ).select_related('category')
-    
-    if query:
-        recipes = recipes.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query)
-        )
+    ).select_related('author', 'category')
     
     if category_id:
         recipes = recipes.filter(category_id=category_id)
     
-    recipes = recipes.order_by('title')[:20]  # Limit results
+    if query:
+        recipes = search_recipes(recipes, query).order_by('search_rank', 'title')
+    else:
+        recipes = recipes.order_by('title')
+    
+    recipes = recipes[:20]  # Limit results
     
     results = []
     for recipe in recipes:
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Category, Tag, Unit, Ingredient, Recipe,
-    RecipeIngredient, RecipeRating, RecipeStep
+    RecipeIngredient, RecipeRating, RecipeStep, ImportJournalEntry, GPTResult
 )
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -21,7 +21,7 @@ class UnitAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'description', 'default_unit', 'calories_per_100g')
+    list_display = ('name', 'description', 'default_unit', 'calories_per_100g', 'density_g_per_ml')
     search_fields = ('name', 'description')
     list_filter = ('default_unit',)
     ordering = ('name',)
@@ -50,7 +50,7 @@ class RecipeAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     filter_horizontal = ('tags',)
     inlines = [RecipeIngredientInline, RecipeStepInline, RecipeRatingInline]
-    readonly_fields = ('created_at', 'updated_at', 'average_rating', 'total_time')
+    readonly_fields = ('created_at', 'updated_at', 'rating_count', 'rating_avg', 'total_time')
 
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'quantity', 'unit', 'notes')
@@ -69,6 +69,18 @@ class RecipeStepAdmin(admin.ModelAdmin):
     list_filter = ('recipe',)
     ordering = ('recipe', 'step_number')
 
+class ImportJournalEntryAdmin(admin.ModelAdmin):
+    list_display = ('source', 'external_id', 'title', 'stage', 'failed_stage', 'attempts', 'updated_at')
+    search_fields = ('external_id', 'title', 'error')
+    list_filter = ('stage', 'failed_stage', 'source')
+    readonly_fields = ('created_at', 'updated_at')
+
+class GPTResultAdmin(admin.ModelAdmin):
+    list_display = ('key', 'analysis_type', 'model', 'hits', 'created_at', 'last_used_at')
+    search_fields = ('key',)
+    list_filter = ('analysis_type', 'model')
+    readonly_fields = ('created_at', 'last_used_at')
+
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Unit, UnitAdmin)
@@ -76,4 +88,6 @@ admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(RecipeRating, RecipeRatingAdmin)
-admin.site.register(RecipeStep, RecipeStepAdmin)
\ No newline at end of file
+admin.site.register(RecipeStep, RecipeStepAdmin)
+admin.site.register(ImportJournalEntry, ImportJournalEntryAdmin)
+admin.site.register(GPTResult, GPTResultAdmin)
@@ -0,0 +1,208 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from apps.core.api import FastJsonResponse, FieldSet, InvalidFields, error_response
+from apps.core.pagination import CursorPaginator
+from .models import Category, Recipe, RecipeIngredient, RecipeStep, Tag
+from .services.gpt_metrics import COMBINED_TYPES, summarize as summarize_gpt_calls
+from .services.search_index import search_recipes
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _image_url(size):
+    def render(row):
+        entry = (row['image_derivatives'] or {}).get('sizes', {}).get(size, {})
+        if entry.get('jpeg'):
+            return default_storage.url(entry['jpeg'])
+        return default_storage.url(row['image']) if row['image'] else None
+    return render
+
+
+RECIPE_FIELDS = FieldSet(
+    {
+        'id': (['id'], None),
+        'url': (['id'], lambda row: reverse('recipes:detail', args=[row['id']])),
+        'title': (['title'], None),
+        'description': (['description'], None),
+        'instructions': (['instructions'], None),
+        'prep_time': (['prep_time'], None),
+        'cook_time': (['cook_time'], None),
+        'total_time': (['prep_time', 'cook_time'], lambda row: row['prep_time'] + row['cook_time']),
+        'servings': (['servings'], None),
+        'difficulty': (['difficulty'], None),
+        'category': (['category_id', 'category__name'], lambda row: (
+            {'id': row['category_id'], 'name': row['category__name']} if row['category_id'] else None
+        )),
+        'author': (['author__username'], None),
+        'image': (['image', 'image_derivatives'], _image_url('card')),
+        'thumbnail': (['image', 'image_derivatives'], _image_url('thumbnail')),
+        'rating': (['rating_avg', 'rating_count'], lambda row: (
+            {'avg': round(row['rating_avg'], 2), 'count': row['rating_count']}
+        )),
+        'calories': (['calories_total', 'calories_per_serving'], lambda row: (
+            {'total': row['calories_total'], 'per_serving': row['calories_per_serving']}
+            if row['calories_total'] is not None else None
+        )),
+        'is_public': (['is_public'], None),
+        'featured': (['featured'], None),
+        'created_at': (['created_at'], None),
+        'updated_at': (['updated_at'], None),
+    },
+    default=['id', 'title', 'url', 'thumbnail', 'total_time', 'difficulty', 'rating'],
+)
+
+# Detail-only fields, each loaded with one extra narrow query when requested
+RECIPE_RELATED_FIELDS = {
+    'tags': lambda pk: list(
+        Tag.objects.filter(recipe=pk).order_by('name').values_list('name', flat=True)
+    ),
+    'ingredients': lambda pk: [
+        {'name': name, 'quantity': quantity, 'unit': unit, 'notes': notes}
+        for name, quantity, unit, notes in RecipeIngredient.objects.filter(recipe_id=pk).order_by('id')
+        .values_list('ingredient__name', 'quantity', 'unit__abbreviation', 'notes')
+    ],
+    'steps': lambda pk: [
+        {'number': number, 'instruction': instruction, 'time_required': time_required}
+        for number, instruction, time_required in RecipeStep.objects.filter(recipe_id=pk)
+        .values_list('step_number', 'instruction', 'time_required')
+    ],
+}
+
+RECIPE_DETAIL_FIELDS = FieldSet(
+    dict(RECIPE_FIELDS.fields, **{name: ([], None) for name in RECIPE_RELATED_FIELDS}),
+    default=[name for name in RECIPE_FIELDS.fields if name != 'thumbnail'] + list(RECIPE_RELATED_FIELDS),
+)
+
+CATEGORY_FIELDS = FieldSet(
+    {name: ([name], None) for name in ('id', 'name', 'description', 'icon', 'color')},
+    default=['id', 'name', 'icon'],
+)
+
+TAG_FIELDS = FieldSet(
+    {name: ([name], None) for name in ('id', 'name', 'color')},
+    default=['id', 'name'],
+)
+
+
+def _visible_recipes(request):
+    if request.user.is_authenticated:
+        return Recipe.objects.filter(Q(is_public=True) | Q(author=request.user))
+    return Recipe.objects.filter(is_public=True)
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def _parse_limit(raw):
+    try:
+        return max(1, min(int(raw), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+
+
+@require_GET
+def recipe_list(request):
+    """Public recipes (plus the user's own), newest first or by search relevance"""
+    try:
+        fields = RECIPE_FIELDS.parse(request.GET.get('fields'))
+    except InvalidFields as e:
+        return error_response(str(e))
+
+    queryset = _visible_recipes(request)
+    category_id = request.GET.get('category')
+    if category_id:
+        if not category_id.isdigit():
+            return error_response('category must be an integer id')
+        queryset = queryset.filter(category_id=category_id)
+
+    max_kcal = request.GET.get('max_kcal')
+    if max_kcal:
+        if not max_kcal.isdigit():
+            return error_response('max_kcal must be an integer')
+        queryset = queryset.filter(calories_per_serving__lte=int(max_kcal))
+
+    ordering = ('-created_at', '-id')
+    search_query = request.GET.get('search')
+    if search_query:
+        queryset = search_recipes(queryset, search_query)
+        ordering = ('search_rank',) + ordering
+
+    # Only the requested columns (plus the cursor keys) are selected
+    required = [name.lstrip('-') for name in ordering]
+    queryset = queryset.values(*RECIPE_FIELDS.columns(fields, required=required))
+    paginator = CursorPaginator(queryset, _parse_limit(request.GET.get('limit')), ordering=ordering)
+    page = paginator.page(request.GET.get('cursor'))
+
+    return FastJsonResponse({
+        'results': [RECIPE_FIELDS.render(row, fields) for row in page],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+
+
+@require_GET
+def recipe_detail(request, pk):
+    try:
+        fields = RECIPE_DETAIL_FIELDS.parse(request.GET.get('fields'))
+    except InvalidFields as e:
+        return error_response(str(e))
+
+    row = _visible_recipes(request).filter(pk=pk).values(
+        *RECIPE_DETAIL_FIELDS.columns(fields, required=['id'])
+    ).first()
+    if row is None:
+        return error_response('Not found', status=404)
+
+    data = RECIPE_DETAIL_FIELDS.render(row, [name for name in fields if name not in RECIPE_RELATED_FIELDS])
+    for name in fields:
+        if name in RECIPE_RELATED_FIELDS:
+            data[name] = RECIPE_RELATED_FIELDS[name](pk)
+    return FastJsonResponse(data)
+
+
+@require_GET
+def category_list(request):
+    try:
+        fields = CATEGORY_FIELDS.parse(request.GET.get('fields'))
+    except InvalidFields as e:
+        return error_response(str(e))
+
+    rows = Category.objects.values(*CATEGORY_FIELDS.columns(fields))
+    return FastJsonResponse({'results': [CATEGORY_FIELDS.render(row, fields) for row in rows]})
+
+
+@require_GET
+def tag_list(request):
+    try:
+        fields = TAG_FIELDS.parse(request.GET.get('fields'))
+    except InvalidFields as e:
+        return error_response(str(e))
+
+    rows = Tag.objects.values(*TAG_FIELDS.columns(fields))
+    return FastJsonResponse({'results': [TAG_FIELDS.render(row, fields) for row in rows]})
+
+
+@require_GET
+def gpt_metrics(request):
+    """GPT usage per analysis type, as reported by the gpt_metrics command; staff only"""
+    if not request.user.is_staff:
+        return error_response('Staff access required', status=403)
+    since = None
+    if request.GET.get('hours'):
+        try:
+            since = timezone.now() - timedelta(hours=float(request.GET['hours']))
+        except (ValueError, OverflowError):
+            return error_response('hours must be a number in range')
+    return FastJsonResponse({'since': since, 'results': summarize_gpt_calls(since), 'combined_types': COMBINED_TYPES})
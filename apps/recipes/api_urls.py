@@ -0,0 +1,12 @@
+from django.urls import path
+from . import api
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    path('recipes/', api.recipe_list, name='recipe_list'),
+    path('recipes/<int:pk>/', api.recipe_detail, name='recipe_detail'),
+    path('categories/', api.category_list, name='category_list'),
+    path('tags/', api.tag_list, name='tag_list'),
+    path('metrics/gpt/', api.gpt_metrics, name='gpt_metrics'),
+]
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.recipes'
\ No newline at end of file
+    name = 'apps.recipes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from apps.meal_planning.views import recipe_search_ajax
+from apps.recipes.models import Recipe
+from apps.recipes.services.autocomplete import build_index, get_index
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Compare the in-memory title autocomplete index with the recipe_search_ajax query path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prefixes',
+            type=int,
+            default=200,
+            help='Number of title prefixes to query (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(recipes__isnull=False).first()
+        titles = list(Recipe.objects.values_list('title', flat=True)[:options['prefixes']])
+        if user is None or not titles:
+            self.stdout.write(self.style.WARNING('No recipes to benchmark against'))
+            return
+
+        # Keystroke-sized prefixes: 2-5 characters of real titles
+        prefixes = [title[:2 + i % 4] for i, title in enumerate(titles)]
+
+        start = time.perf_counter()
+        index = build_index()
+        build_ms = (time.perf_counter() - start) * 1000
+        get_index()
+
+        index_times = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.lookup(prefix, user_id=user.pk)
+            index_times.append((time.perf_counter() - start) * 1000)
+
+        factory = RequestFactory()
+        ajax_times = []
+        for prefix in prefixes:
+            request = factory.get('/meal-planning/recipe-search/', {'q': prefix})
+            request.user = user
+            start = time.perf_counter()
+            recipe_search_ajax(request)
+            ajax_times.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(f'Index: {len(index)} recipes built in {build_ms:.1f} ms')
+        self.stdout.write(
+            f'Index lookup:       median {statistics.median(index_times):.4f} ms, '
+            f'max {max(index_times):.4f} ms'
+        )
+        self.stdout.write(
+            f'recipe_search_ajax: median {statistics.median(ajax_times):.4f} ms, '
+            f'max {max(ajax_times):.4f} ms'
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Speedup: {statistics.median(ajax_times) / statistics.median(index_times):.0f}x'
+            )
+        )
@@ -0,0 +1,57 @@
+import gzip
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.api import loads
+from apps.recipes.models import Recipe
+from apps.recipes.services.instructions import parse_instructions_batch
+
+class Command(BaseCommand):
+    help = 'Measure instruction-to-steps parsing throughput over real recipe instructions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            type=str,
+            help='JSON Lines file from export_recipes to read instructions from (default: the database)'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of timed passes over the corpus (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        if options['corpus']:
+            opener = gzip.open if options['corpus'].endswith('.gz') else open
+            try:
+                with opener(options['corpus'], 'rb') as stream:
+                    corpus = [loads(line).get('instructions', '') for line in stream if line.strip()]
+            except OSError as e:
+                raise CommandError(f'Cannot read corpus: {e}')
+        else:
+            corpus = list(Recipe.objects.exclude(instructions='').values_list('instructions', flat=True))
+        if not corpus:
+            self.stdout.write(self.style.WARNING('No instructions to benchmark against'))
+            return
+
+        # Warm up, and count what a pass produces
+        steps = sum(len(parsed) for parsed in parse_instructions_batch(corpus))
+
+        rates = []
+        for _ in range(options['rounds']):
+            start = time.perf_counter()
+            parse_instructions_batch(corpus)
+            rates.append(len(corpus) / (time.perf_counter() - start))
+
+        self.stdout.write(
+            f'Corpus: {len(corpus)} recipes, {sum(map(len, corpus)) / 1024:.0f} KiB of text, '
+            f'{steps} steps ({steps / len(corpus):.1f} per recipe)'
+        )
+        self.stdout.write(f'Slowest pass: {min(rates):,.0f} recipes/s')
+        self.stdout.write(
+            self.style.SUCCESS(f'Parsed {statistics.median(rates):,.0f} recipes/s (median of {len(rates)} passes)')
+        )
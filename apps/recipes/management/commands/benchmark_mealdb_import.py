@@ -0,0 +1,94 @@
+import statistics
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from apps.recipes.models import Recipe
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the full TheMealDB import from recorded responses (record them first with '
+        'import_mealdb_recipes --cache record); database and media changes are discarded'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes-count',
+            type=int,
+            default=50,
+            help='Recipes imported per run; use the count the cache was recorded with (default: 50)'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Number of timed imports (default: 3)'
+        )
+        parser.add_argument(
+            '--api-url',
+            type=str,
+            help='API base URL the responses were recorded from (default: settings.MEALDB_API_URL)'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            type=str,
+            help='Recorded response cache (default: settings.MEALDB_CACHE_DIR)'
+        )
+        parser.add_argument(
+            '--skip-images',
+            action='store_true',
+            help='Leave image download and processing out of the timing'
+        )
+
+    def handle(self, *args, **options):
+        rates = []
+        for _ in range(options['runs']):
+            imported, elapsed = self.run_import(options)
+            if not imported:
+                raise CommandError(
+                    f'Nothing imported from {options["cache_dir"] or settings.MEALDB_CACHE_DIR}; '
+                    'record the responses first'
+                )
+            rates.append(imported / elapsed)
+            self.stdout.write(f'Imported {imported} recipes in {elapsed:.2f}s')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{statistics.median(rates):,.1f} recipes/s (median of {len(rates)} runs)')
+        )
+
+    def run_import(self, options):
+        """``(recipes imported, seconds)`` for one replayed import, rolled back afterwards"""
+        output = StringIO()
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            try:
+                with transaction.atomic():
+                    before = Recipe.objects.count()
+                    start = time.perf_counter()
+                    call_command(
+                        'import_mealdb_recipes',
+                        recipes_count=options['recipes_count'],
+                        admin_username='benchmark-importer',
+                        create_admin=True,
+                        skip_images=options['skip_images'],
+                        api_url=options['api_url'],
+                        cache='replay',
+                        cache_dir=options['cache_dir'],
+                        stdout=output,
+                    )
+                    elapsed = time.perf_counter() - start
+                    imported = Recipe.objects.count() - before
+                    raise Rollback
+            except Rollback:
+                return imported, elapsed
@@ -0,0 +1,151 @@
+import gzip
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.api import loads
+from apps.recipes.models import RecipeIngredient
+from apps.recipes.services.measures import DEFAULT_QUANTITY, DEFAULT_UNIT, parse_measure, parse_measures
+
+
+def legacy_parse_measure(measure_str):
+    """The import commands' former token-by-token parser, kept as the parity and speed reference"""
+    if not measure_str:
+        return 1, 'piece'
+    unit_mappings = {
+        'cups': 'cup', 'cup': 'cup',
+        'tablespoons': 'tablespoon', 'tablespoon': 'tablespoon', 'tbsp': 'tablespoon',
+        'teaspoons': 'teaspoon', 'teaspoon': 'teaspoon', 'tsp': 'teaspoon',
+        'pounds': 'pound', 'pound': 'pound', 'lb': 'pound', 'lbs': 'pound',
+        'ounces': 'ounce', 'ounce': 'ounce', 'oz': 'ounce',
+        'grams': 'gram', 'gram': 'gram', 'g': 'gram', 'kg': 'kilogram',
+        'ml': 'milliliter', 'l': 'liter',
+        'cloves': 'clove', 'clove': 'clove',
+        'pinch': 'pinch', 'pinches': 'pinch',
+        'slices': 'slice', 'slice': 'slice',
+        'can': 'can', 'cans': 'can',
+        'bottle': 'bottle', 'bottles': 'bottle',
+        'jar': 'jar', 'jars': 'jar',
+        'package': 'package', 'packages': 'package',
+        'bunch': 'bunch', 'bunches': 'bunch',
+        'sprig': 'sprig', 'sprigs': 'sprig',
+        'dash': 'dash', 'dashes': 'dash',
+    }
+    parts = measure_str.strip().lower().split()
+    quantity = 1
+    unit = 'piece'
+    if parts:
+        try:
+            if '/' in parts[0]:
+                num, den = parts[0].split('/')
+                quantity = float(num) / float(den)
+            else:
+                quantity = float(parts[0])
+            for part in parts[1:]:
+                clean_part = part.strip('.,()').lower()
+                if clean_part in unit_mappings:
+                    unit = unit_mappings[clean_part]
+                    break
+        except ValueError:
+            for part in parts:
+                clean_part = part.strip('.,()').lower()
+                if clean_part in unit_mappings:
+                    unit = unit_mappings[clean_part]
+                    break
+    return quantity, unit
+
+
+def _compare(old, new):
+    """'same', 'filled' (new only adds what the old parser defaulted) or 'changed'"""
+    if old is None:
+        return 'changed'
+    same_quantity, same_unit = float(old[0]) == float(new[0]), old[1] == new[1]
+    if same_quantity and same_unit:
+        return 'same'
+    if (same_quantity or old[0] == DEFAULT_QUANTITY) and (same_unit or old[1] == DEFAULT_UNIT):
+        return 'filled'
+    return 'changed'
+
+
+class Command(BaseCommand):
+    help = 'Measure ingredient measure parsing throughput and check it against the old parser on real measures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            type=str,
+            help='JSON Lines file from export_recipes to read ingredient measures from (default: the database)'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Number of timed passes over the corpus (default: 5)'
+        )
+        parser.add_argument(
+            '--show-diffs',
+            action='store_true',
+            help='List every distinct measure the parsers disagree on, not just the changed ones'
+        )
+
+    def handle(self, *args, **options):
+        if options['corpus']:
+            opener = gzip.open if options['corpus'].endswith('.gz') else open
+            try:
+                with opener(options['corpus'], 'rb') as stream:
+                    corpus = [
+                        ingredient.get('notes', '')
+                        for line in stream if line.strip()
+                        for ingredient in loads(line).get('ingredients', [])
+                    ]
+            except OSError as e:
+                raise CommandError(f'Cannot read corpus: {e}')
+        else:
+            corpus = list(RecipeIngredient.objects.values_list('notes', flat=True))
+        if not corpus:
+            self.stdout.write(self.style.WARNING('No ingredient measures to benchmark against'))
+            return
+
+        legacy_rates, single_rates, rates = [], [], []
+        for _ in range(options['rounds']):
+            start = time.perf_counter()
+            for measure in corpus:
+                try:
+                    legacy_parse_measure(measure)
+                except ZeroDivisionError:
+                    pass
+            legacy_rates.append(len(corpus) / (time.perf_counter() - start))
+
+            start = time.perf_counter()
+            for measure in corpus:
+                parse_measure(measure)
+            single_rates.append(len(corpus) / (time.perf_counter() - start))
+
+            start = time.perf_counter()
+            parse_measures(corpus)
+            rates.append(len(corpus) / (time.perf_counter() - start))
+
+        distinct = sorted(set(corpus))
+        outcomes = {'same': [], 'filled': [], 'changed': []}
+        for measure, new in zip(distinct, parse_measures(distinct)):
+            try:
+                old = legacy_parse_measure(measure)
+            except ZeroDivisionError:
+                old = None
+            outcomes[_compare(old, new)].append((measure, old, new))
+
+        for measure, old, new in outcomes['filled'] * options['show_diffs'] + outcomes['changed']:
+            self.stdout.write(f'{measure!r:45} {old!s:25} -> {new}')
+        self.stdout.write(
+            f'Corpus: {len(corpus)} measures, {len(distinct)} distinct; {len(outcomes["same"])} parse the same, '
+            f'{len(outcomes["filled"])} fill in what the old parser defaulted, {len(outcomes["changed"])} changed'
+        )
+        self.stdout.write(f'Old parser: {statistics.median(legacy_rates):,.0f} measures/s')
+        self.stdout.write(f'One at a time: {statistics.median(single_rates):,.0f} measures/s')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Parsed {statistics.median(rates):,.0f} measures/s (median of {len(rates)} passes, '
+                f'{statistics.median(rates) / statistics.median(legacy_rates):.1f}x)'
+            )
+        )
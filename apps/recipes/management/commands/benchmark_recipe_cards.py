@@ -0,0 +1,48 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from apps.recipes.views import RecipeListView
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+class Command(BaseCommand):
+    help = 'Time rendering of the recipe list page (12 cards) with and without card fragment caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of renders to time per mode (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        view = RecipeListView.as_view()
+        request = RequestFactory().get('/recipes/')
+        request.user = AnonymousUser()
+
+        def render_once():
+            response = view(request)
+            start = time.perf_counter()
+            response.render()
+            return (time.perf_counter() - start) * 1000, response.context_data['recipes']
+
+        with override_settings(CACHES=NO_CACHE):
+            uncached = [render_once()[0] for _ in range(iterations)]
+
+        # First render fills the cache for this page, the rest are hits
+        cold, recipes = render_once()
+        cached = [render_once()[0] for _ in range(iterations)]
+
+        self.stdout.write(f'Cards on page: {len(recipes)}')
+        self.stdout.write(f'Uncached render: median {statistics.median(uncached):.2f} ms')
+        self.stdout.write(f'Cold cache render: {cold:.2f} ms')
+        self.stdout.write(f'Warm cache render: median {statistics.median(cached):.2f} ms')
+        self.stdout.write(
+            self.style.SUCCESS(f'Speedup: {statistics.median(uncached) / statistics.median(cached):.1f}x')
+        )
@@ -0,0 +1,119 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.recipes.models import Category, Ingredient, Recipe, RecipeIngredient, RecipeStep, Tag, Unit
+from apps.recipes.services.catalogue import CatalogueImporter
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare row-by-row recipe saves with the batched import writer (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=200,
+            help='Synthetic recipes written by each strategy (default: 200)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Recipes per batched write (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        author = User.objects.order_by('pk').first()
+        if author is None:
+            raise CommandError('Create a user first; the benchmark recipes need an author')
+        records = self.make_records(options['recipes'], author.username)
+        batch_size = options['batch_size']
+
+        row_by_row = self.timed(lambda: [self.save_row_by_row(record, author) for record in records])
+
+        def batched():
+            writer = CatalogueImporter(default_author=author)
+            writer.preload()
+            for start in range(0, len(records), batch_size):
+                writer.write_records(records[start:start + batch_size])
+        batched_time = self.timed(batched)
+
+        self.stdout.write(f'Row by row: {len(records) / row_by_row:,.0f} recipes/s')
+        self.stdout.write(f'Batched ({batch_size} per batch): {len(records) / batched_time:,.0f} recipes/s')
+        self.stdout.write(self.style.SUCCESS(f'Speed-up: {row_by_row / batched_time:.1f}x'))
+
+    def timed(self, func):
+        """Seconds ``func`` takes, with everything it wrote rolled back"""
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+                raise Rollback
+        except Rollback:
+            return elapsed
+
+    def make_records(self, count, username):
+        """Records shaped like a TheMealDB import: ~8 steps, ~12 ingredients, 2 tags"""
+        rng = random.Random(0)
+        ingredient_names = [f'Benchmark ingredient {i}' for i in range(300)]
+        records = []
+        for i in range(count):
+            records.append({
+                'title': f'Benchmark recipe {i}',
+                'instructions': 'Mix everything. Bake until golden.',
+                'prep_time': 15,
+                'cook_time': 30,
+                'author': username,
+                'category': {'name': f'Benchmark category {i % 10}', 'color': '#6c757d'},
+                'tags': [{'name': 'Benchmark', 'color': '#17a2b8'}, {'name': f'Benchmark tag {i % 25}'}],
+                'steps': [
+                    {'step_number': n, 'instruction': f'Step {n} of recipe {i}.', 'time_required': 5}
+                    for n in range(1, 9)
+                ],
+                'ingredients': [
+                    {
+                        'name': name, 'quantity': rng.randint(1, 500), 'notes': '',
+                        'unit': {'name': f'Benchmark unit {j % 6}', 'abbreviation': f'bu{j % 6}', 'unit_type': 'count'},
+                    }
+                    for j, name in enumerate(rng.sample(ingredient_names, 12))
+                ],
+            })
+        return records
+
+    def save_row_by_row(self, record, author):
+        """The per-row ORM path the import commands used to take"""
+        category, _ = Category.objects.get_or_create(
+            name=record['category']['name'], defaults={'color': record['category']['color']}
+        )
+        recipe = Recipe.objects.create(
+            title=record['title'], instructions=record['instructions'], prep_time=record['prep_time'],
+            cook_time=record['cook_time'], author=author, category=category
+        )
+        for step in record['steps']:
+            RecipeStep.objects.create(
+                recipe=recipe, step_number=step['step_number'],
+                instruction=step['instruction'], time_required=step['time_required']
+            )
+        for item in record['ingredients']:
+            ingredient, _ = Ingredient.objects.get_or_create(name=item['name'])
+            unit, _ = Unit.objects.get_or_create(
+                name=item['unit']['name'],
+                defaults={'abbreviation': item['unit']['abbreviation'], 'unit_type': item['unit']['unit_type']}
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, quantity=item['quantity'], unit=unit, notes=item['notes']
+            )
+        for tag_data in record['tags']:
+            tag, _ = Tag.objects.get_or_create(name=tag_data['name'])
+            recipe.tags.add(tag)
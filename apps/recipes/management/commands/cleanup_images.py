@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.core.models import StoredFile
+from apps.core.storage import content_storage, retain_files, unreferenced_files
+from apps.recipes.models import Recipe, RecipeStep
+
+class Command(BaseCommand):
+    help = 'Delete stored images no recipe or step has referenced for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=float,
+            default=24,
+            help='Hours a file must have gone unreferenced before it is deleted (default: 24)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the files that would be deleted without deleting them'
+        )
+        parser.add_argument(
+            '--adopt-legacy',
+            action='store_true',
+            help='First move images saved under their old title-based names to content-addressed paths'
+        )
+
+    def handle(self, *args, **options):
+        if options['adopt_legacy']:
+            self.adopt_legacy(options['dry_run'])
+
+        deleted = freed = 0
+        for pk, path, size in unreferenced_files(timedelta(hours=options['min_age'])).values_list(
+            'pk', 'path', 'size'
+        ).iterator():
+            if options['dry_run']:
+                self.stdout.write(f'Would delete {path}')
+            # The row goes first, and only if the file is still unreferenced
+            elif StoredFile.objects.filter(pk=pk, ref_count=0).delete()[0]:
+                content_storage.delete(path)
+            else:
+                continue
+            deleted += 1
+            freed += size
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} unreferenced images ({freed / 1024 / 1024:.1f} MiB)'))
+
+    def adopt_legacy(self, dry_run):
+        """
+        Re-save every image path missing from the index; identical files
+        collapse into one. The same bytes keep the same image hash, so the
+        recipes involved get a new card version and derivatives source to
+        stop cached pages from pointing at the old paths.
+        """
+        indexed = StoredFile.objects.values('path')
+        moved = {}
+        for model, fields in ((Recipe, ['image_derivatives']), (RecipeStep, ['recipe'])):
+            rows = model.objects.exclude(image='').exclude(image__isnull=True).exclude(image__in=indexed)
+            recipe_ids = set()
+            for row in rows.only('image', *fields).iterator():
+                old_path = row.image.name
+                if old_path not in moved:
+                    if not content_storage.exists(old_path):
+                        self.stdout.write(self.style.WARNING(f'{model.__name__} #{row.pk}: {old_path} is missing'))
+                        continue
+                    if dry_run:
+                        moved[old_path] = old_path
+                        continue
+                    with content_storage.open(old_path) as f:
+                        moved[old_path] = content_storage.save(old_path, f)
+                if dry_run:
+                    continue
+                changes = {'image': moved[old_path]}
+                derivatives = getattr(row, 'image_derivatives', None)
+                if derivatives and derivatives.get('source') == old_path:
+                    changes['image_derivatives'] = dict(derivatives, source=moved[old_path])
+                model.objects.filter(pk=row.pk).update(**changes)
+                retain_files([moved[old_path]])
+                recipe_ids.add(getattr(row, 'recipe_id', row.pk))
+            Recipe.objects.filter(pk__in=recipe_ids).bump_card_version()
+
+        if not dry_run:
+            for old_path, new_path in moved.items():
+                # Already at its content address, just not indexed
+                if new_path != old_path:
+                    content_storage.delete(old_path)
+        self.stdout.write(f'Adopted {len(moved)} legacy images into {len(set(moved.values()))} stored files')
+
+        # Content-addressed files live in subdirectories, so whatever is left
+        # at the top of the upload directories belongs to nothing. This is
+        # the last directory listing cleanup needs.
+        leftovers = [
+            f'{directory}{name}'
+            for directory in ('recipes/', 'recipe_steps/') if content_storage.exists(directory)
+            for name in content_storage.listdir(directory)[1]
+            if f'{directory}{name}' not in moved
+        ]
+        for path in leftovers:
+            if dry_run:
+                self.stdout.write(f'Would delete legacy leftover {path}')
+            else:
+                content_storage.delete(path)
+        self.stdout.write(f'{"Found" if dry_run else "Deleted"} {len(leftovers)} unreferenced legacy images')
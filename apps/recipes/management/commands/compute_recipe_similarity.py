@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.recipes.services.similarity import BATCH_SIZE, DEFAULT_K, compute_similarity
+
+class Command(BaseCommand):
+    help = 'Precompute top-k similar recipes (ingredients, tags, category) for the detail page'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rescore every recipe instead of only those changed since the last run'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=DEFAULT_K,
+            help=f'Neighbours stored per recipe (default: {DEFAULT_K})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Recipes scored per sparse matrix product (default: {BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        recomputed, merged = compute_similarity(
+            k=options['k'], full=options['full'], batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{recomputed} recipes rescored, {merged} lists merged in {elapsed:.2f}s'
+            )
+        )
@@ -0,0 +1,34 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.recipes.services.catalogue import write_jsonl
+from apps.recipes.services.gpt_service import recipe_analyzer
+
+class Command(BaseCommand):
+    help = 'Write the persistent GPT result cache as JSON Lines, to warm another database with import_gpt_cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help='Output file, gzip-compressed when it ends in .gz (default: stdout)'
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        records = recipe_analyzer.cache.export()
+        if output == '-':
+            count = write_jsonl(records, sys.stdout.buffer)
+            sys.stdout.flush()
+            # Keep stdout clean for piping
+            self.stderr.write(f'Exported {count} GPT results')
+            return
+
+        opener = gzip.open if output.endswith('.gz') else open
+        with opener(output, 'wb') as stream:
+            count = write_jsonl(records, stream)
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} GPT results to {output}'))
@@ -0,0 +1,53 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.recipes.models import Recipe
+from apps.recipes.services.catalogue import CHUNK_SIZE, export_recipes, write_jsonl
+
+class Command(BaseCommand):
+    help = 'Stream the recipe catalogue (steps, ingredients, tags, image references) as JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help='Output file, gzip-compressed when it ends in .gz (default: stdout)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Recipes fetched per query batch (default: {CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--public-only',
+            action='store_true',
+            help='Only export public recipes'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options['public_only']:
+            recipes = recipes.filter(is_public=True)
+
+        output = options['output']
+        started = time.perf_counter()
+        records = export_recipes(recipes, chunk_size=options['chunk_size'])
+        if output == '-':
+            count = write_jsonl(records, sys.stdout.buffer)
+            sys.stdout.flush()
+            # Keep stdout clean for piping
+            self.stderr.write(f'Exported {count} recipes in {time.perf_counter() - started:.2f}s')
+            return
+
+        opener = gzip.open if output.endswith('.gz') else open
+        with opener(output, 'wb') as stream:
+            count = write_jsonl(records, stream)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Exported {count} recipes to {output} in {time.perf_counter() - started:.2f}s')
+        )
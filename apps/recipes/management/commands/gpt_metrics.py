@@ -0,0 +1,74 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.recipes.models import GPTCall
+from apps.recipes.services.gpt_metrics import COMBINED_TYPES, summarize
+
+COLUMNS = [
+    ('requests', 'Requests', '{:,}'),
+    ('recipes', 'Recipes', '{:,}'),
+    ('latency_p50_ms', 'p50 ms', '{:,.0f}'),
+    ('latency_p95_ms', 'p95 ms', '{:,.0f}'),
+    ('latency_total_s', 'Total s', '{:,.1f}'),
+    ('prompt_tokens', 'Prompt tok', '{:,}'),
+    ('completion_tokens', 'Compl. tok', '{:,}'),
+    ('cost_usd', 'Cost $', '{:,.4f}'),
+    ('cache_hit_ratio', 'Cache hit', '{:.1%}'),
+    ('repair_rate', 'Repaired', '{:.1%}'),
+    ('fallback_rate', 'Fallback', '{:.1%}'),
+]
+
+class Command(BaseCommand):
+    help = 'Report GPT usage per analysis type: requests, latency, tokens, cost, cache hits, JSON repairs and fallbacks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            help='Only count calls made in the last N hours (default: all recorded calls)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the figures as JSON, as served by the metrics endpoint'
+        )
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            help='First delete calls recorded more than N days ago'
+        )
+
+    def handle(self, *args, **options):
+        if options['prune_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['prune_days'])
+            deleted, _ = GPTCall.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(f'Deleted {deleted} GPT calls older than {options["prune_days"]} days')
+
+        try:
+            since = timezone.now() - timedelta(hours=options['hours']) if options['hours'] else None
+        except (ValueError, OverflowError):
+            raise CommandError(f'--hours {options["hours"]} is out of range')
+        summary = summarize(since)
+        if options['json']:
+            self.stdout.write(json.dumps(
+                {'since': since and since.isoformat(), 'results': summary, 'combined_types': COMBINED_TYPES}, indent=2
+            ))
+            return
+        if not summary:
+            self.stdout.write(self.style.WARNING('No GPT calls recorded'))
+            return
+
+        width = max(len(name) for name in summary)
+        self.stdout.write(f'{"":{width}}  ' + '  '.join(f'{label:>10}' for _, label, _ in COLUMNS))
+        for name, figures in summary.items():
+            cells = ['—' if figures[key] is None else fmt.format(figures[key]) for key, _, fmt in COLUMNS]
+            line = f'{name:{width}}  ' + '  '.join(f'{cell:>10}' for cell in cells)
+            self.stdout.write(self.style.SUCCESS(line) if name == 'total' else line)
+        for name in summary.keys() & COMBINED_TYPES.keys():
+            self.stdout.write(
+                f'{name}: batched requests covering {", ".join(COMBINED_TYPES[name])} together, '
+                'counted here rather than under those types'
+            )
@@ -0,0 +1,45 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.core.api import loads
+from apps.recipes.services.gpt_service import recipe_analyzer
+
+class Command(BaseCommand):
+    help = 'Load GPT results written by export_gpt_cache, so a bulk import starts with a warm cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            default='-',
+            help='Input file, gzip-compressed when it ends in .gz (default: stdin)'
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Replace results that are already cached here'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        cache = recipe_analyzer.cache
+        if path == '-':
+            added = cache.import_records(self.records(sys.stdin.buffer), overwrite=options['overwrite'])
+        else:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rb') as stream:
+                added = cache.import_records(self.records(stream), overwrite=options['overwrite'])
+
+        evicted = cache.stats['evictions']
+        if evicted:
+            self.stdout.write(self.style.WARNING(
+                f'Evicted {evicted} least recently used results (GPT_CACHE_MAX_ENTRIES is {cache.max_entries})'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Imported {added} new GPT results'))
+
+    def records(self, lines):
+        for line in lines:
+            if line.strip():
+                yield loads(line)
@@ -0,0 +1,72 @@
+import gzip
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recipes.services.catalogue import CHUNK_SIZE, CatalogueImporter, UnknownAuthor
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Bulk import recipes from a JSON Lines file written by export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            default='-',
+            help='Input file, gzip-compressed when it ends in .gz (default: stdin)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'Recipes written per transaction (default: {CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--author',
+            type=str,
+            help='Username to assign recipes whose author does not exist here'
+        )
+        parser.add_argument(
+            '--allow-duplicates',
+            action='store_true',
+            help='Import recipes even when one with the same title exists'
+        )
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options['author']:
+            try:
+                default_author = User.objects.get(username=options['author'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["author"]}" does not exist')
+
+        importer = CatalogueImporter(
+            default_author=default_author,
+            chunk_size=options['chunk_size'],
+            skip_existing=not options['allow_duplicates'],
+        )
+
+        path = options['input']
+        started = time.perf_counter()
+        try:
+            if path == '-':
+                importer.import_lines(sys.stdin.buffer)
+            else:
+                opener = gzip.open if path.endswith('.gz') else open
+                with opener(path, 'rb') as stream:
+                    importer.import_lines(stream)
+        except UnknownAuthor as e:
+            raise CommandError(f'{e} (use --author); {importer.stats["imported"]} recipes were imported before this')
+
+        elapsed = time.perf_counter() - started
+        for label, count in sorted(importer.stats.items()):
+            if label not in ('imported', 'skipped'):
+                self.stdout.write(f'{label.capitalize()}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.stats["imported"]} recipes '
+            f'({importer.stats["skipped"]} already present) in {elapsed:.2f}s'
+        ))
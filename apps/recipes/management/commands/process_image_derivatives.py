@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.core.images import generate_derivatives, pending_derivatives
+from apps.recipes.models import Recipe
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Generate card/detail/thumbnail image derivatives for recipes and user avatars'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-encode derivatives even when the source image is unchanged'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Keep running, looking for new or replaced images every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        # (model label, pk) of images that failed, so a worker doesn't retry them every pass
+        self.failed = set()
+        self.process(options['force'])
+        if options['interval'] is None:
+            return
+        # Worker mode: uploads are served as-is until their derivatives are written here
+        while True:
+            time.sleep(options['interval'])
+            self.process(force=False, quiet=True)
+
+    def process(self, force, quiet=False):
+        targets = [
+            (Recipe, 'image', Recipe.objects.exclude(image__isnull=True)),
+            (User, 'avatar', User.objects.exclude(avatar__isnull=True)),
+        ]
+
+        for model, field_name, queryset in targets:
+            if force:
+                queryset = queryset.exclude(**{field_name: ''})
+            else:
+                queryset = pending_derivatives(queryset, field_name)
+            label = model._meta.label
+            skip = [pk for failed_label, pk in self.failed if failed_label == label]
+            processed = failed = 0
+            for pk in queryset.exclude(pk__in=skip).values_list('pk', flat=True).iterator():
+                try:
+                    generate_derivatives(label, pk, field_name, force=force)
+                    processed += 1
+                except Exception as e:
+                    failed += 1
+                    self.failed.add((label, pk))
+                    self.stdout.write(
+                        self.style.WARNING(f'Error processing {model.__name__} #{pk}: {e}')
+                    )
+
+            if quiet and not processed and not failed:
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(f'{model.__name__}: {processed} processed, {failed} failed')
+            )
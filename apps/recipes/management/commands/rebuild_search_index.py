@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.recipes.services import search_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite FTS5 full-text search index for recipes'
+
+    def handle(self, *args, **options):
+        if not search_index.is_available():
+            self.stdout.write(self.style.WARNING('Full-text index is only supported on SQLite, nothing to do.'))
+            return
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            indexed = search_index.rebuild_index()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} recipes in {elapsed:.2f}s')
+        )
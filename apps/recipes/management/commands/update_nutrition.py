@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.recipes.services.nutrition import update_nutrition
+
+class Command(BaseCommand):
+    help = 'Recompute the per-recipe and per-serving calorie rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe-id',
+            type=int,
+            action='append',
+            dest='recipe_ids',
+            help='Only recompute this recipe (may be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        updated = update_nutrition(options['recipe_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Updated nutrition for {updated} recipes'))
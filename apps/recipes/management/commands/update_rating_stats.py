@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.recipes.models import Recipe
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the denormalized rating_count/rating_sum/rating_avg columns on recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipe-id',
+            type=int,
+            action='append',
+            dest='recipe_ids',
+            help='Only repair the given recipe id (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options['recipe_ids']:
+            recipes = recipes.filter(pk__in=options['recipe_ids'])
+
+        with transaction.atomic():
+            updated = recipes.update_rating_stats()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated rating stats for {updated} recipes')
+        )
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Frozen copy of the index as first created; services.search_index may move on
+CREATE_TABLE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5(
+    title, description, instructions, ingredients,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+POPULATE_SQL = """
+INSERT INTO recipes_recipe_fts (rowid, title, description, instructions, ingredients)
+SELECT r.id, r.title, r.description, r.instructions,
+       COALESCE((
+           SELECT group_concat(i.name, ' ')
+           FROM recipes_recipeingredient ri
+           JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+           WHERE ri.recipe_id = r.id
+       ), '')
+FROM recipes_recipe r
+"""
+
+DROP_TABLE_SQL = "DROP TABLE IF EXISTS recipes_recipe_fts"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE_SQL)
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
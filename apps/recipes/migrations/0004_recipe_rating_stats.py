@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:31
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeRating = apps.get_model('recipes', 'RecipeRating')
+
+    stats = RecipeRating.objects.values('recipe_id').annotate(
+        count=Count('id'), total=Sum('score'), avg=Avg('score')
+    ).order_by()
+    for row in stats:
+        Recipe.objects.filter(pk=row['recipe_id']).update(
+            rating_count=row['count'],
+            rating_sum=row['total'],
+            rating_avg=row['avg'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_avg',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
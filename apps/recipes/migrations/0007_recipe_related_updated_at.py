@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_card_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='related_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
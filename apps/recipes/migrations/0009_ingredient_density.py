@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_similarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='density_g_per_ml',
+            field=models.FloatField(blank=True, help_text='Grams per millilitre, used to convert volumes to weights', null=True),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+# Frozen copy of the services.units/services.nutrition calorie rules as of
+# this migration, so later changes to them (or the models) can't break it
+GRAMS_PER_UNIT = {
+    'weight': {
+        'mg': 0.001, 'milligram': 0.001,
+        'g': 1.0, 'gram': 1.0,
+        'kg': 1000.0, 'kilogram': 1000.0,
+        'oz': 28.349523125, 'ounce': 28.349523125,
+        'lb': 453.59237, 'pound': 453.59237,
+    },
+    # Millilitres, weighed through the ingredient's density
+    'volume': {
+        'ml': 1.0, 'milliliter': 1.0, 'millilitre': 1.0,
+        'l': 1000.0, 'liter': 1000.0, 'litre': 1000.0,
+        'tsp': 4.92892159375, 'teaspoon': 4.92892159375,
+        'tbsp': 14.78676478125, 'tablespoon': 14.78676478125,
+        'fl oz': 29.5735295625, 'fluid ounce': 29.5735295625,
+        'cup': 236.5882365,
+        'pint': 473.176473,
+        'quart': 946.352946,
+        'gallon': 3785.411784,
+    },
+}
+
+
+def backfill_nutrition(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Unit = apps.get_model('recipes', 'Unit')
+
+    factors = {}
+    for pk, name, abbreviation, unit_type in Unit.objects.values_list('id', 'name', 'abbreviation', 'unit_type'):
+        known = GRAMS_PER_UNIT.get(unit_type, {})
+        factor = known.get(abbreviation.lower()) or known.get(name.lower())
+        if factor:
+            factors[pk] = (unit_type, factor)
+
+    kcal = {}
+    for recipe_id, quantity, unit_id, density, kcal_per_100g in RecipeIngredient.objects.values_list(
+        'recipe_id', 'quantity', 'unit_id', 'ingredient__density_g_per_ml', 'ingredient__calories_per_100g'
+    ):
+        unit_type, factor = factors.get(unit_id, (None, None))
+        if unit_type == 'weight':
+            grams = quantity * factor
+        elif unit_type == 'volume' and density:
+            grams = quantity * factor * density
+        else:
+            continue
+        if kcal_per_100g is None:
+            continue
+        kcal[recipe_id] = kcal.get(recipe_id, 0.0) + grams * kcal_per_100g / 100
+
+    for pk, servings in Recipe.objects.filter(pk__in=list(kcal)).values_list('id', 'servings'):
+        total = round(kcal[pk], 1)
+        Recipe.objects.filter(pk=pk).update(
+            calories_total=total, calories_per_serving=round(total / servings, 1) if servings else None
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_density'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='calories_per_serving',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='calories_total',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_nutrition, migrations.RunPython.noop),
+    ]
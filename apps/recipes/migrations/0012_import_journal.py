@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_title_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='mealdb_id',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='ImportJournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(default='mealdb', max_length=20)),
+                ('external_id', models.CharField(max_length=20)),
+                ('category', models.CharField(blank=True, help_text='Listing the recipe was picked from', max_length=100)),
+                ('title', models.CharField(blank=True, max_length=200)),
+                ('stage', models.CharField(choices=[('pending', 'Pending'), ('fetched', 'Fetched'), ('parsed', 'Parsed'), ('saved', 'Saved'), ('done', 'Images downloaded')], default='pending', max_length=10)),
+                ('failed_stage', models.CharField(blank=True, max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('meal_data', models.JSONField(blank=True, null=True)),
+                ('parsed', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recipe', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name_plural': 'Import journal entries',
+                'ordering': ['id'],
+                'unique_together': {('source', 'external_id')},
+            },
+        ),
+    ]
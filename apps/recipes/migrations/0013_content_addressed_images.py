@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:15
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_import_journal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.core.storage.ContentAddressedStorage(), upload_to='recipes/'),
+        ),
+        migrations.AlterField(
+            model_name='recipestep',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.core.storage.ContentAddressedStorage(), upload_to='recipe_steps/'),
+        ),
+    ]
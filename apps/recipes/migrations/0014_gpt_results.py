@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GPTResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 of what was asked', max_length=64)),
+                ('model', models.CharField(max_length=50)),
+                ('analysis_type', models.CharField(max_length=30)),
+                ('result', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'GPT result',
+                'unique_together': {('key', 'model')},
+            },
+        ),
+    ]
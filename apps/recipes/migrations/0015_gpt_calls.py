@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_gpt_results'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GPTCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('analysis_type', models.CharField(max_length=30)),
+                ('model', models.CharField(max_length=50)),
+                ('cached', models.BooleanField(default=False)),
+                ('recipes', models.PositiveIntegerField(default=1)),
+                ('fallbacks', models.PositiveIntegerField(default=0)),
+                ('repaired', models.BooleanField(default=False)),
+                ('failed', models.BooleanField(default=False)),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('cost_usd', models.FloatField(default=0, help_text='Estimated from GPT_TOKEN_PRICES')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'GPT call',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_search_rank(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # Weights as of this migration: title, description, instructions, ingredients
+    schema_editor.execute(
+        "INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0, 6.0)')"
+    )
+
+
+def reset_search_rank(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rank) VALUES ('rank', 'bm25()')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_gpt_calls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipe')),
+                ('document', models.TextField(db_column='recipes_recipe_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(set_search_rank, reset_search_rank),
+    ]
@@ -2,7 +2,11 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
-from PIL import Image
+from django.db.models import Avg, Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Now
+
+from apps.core.storage import content_storage
 
 User = get_user_model()
 
@@ -51,6 +55,9 @@ class Ingredient(models.Model):
     description = models.TextField(blank=True)
     default_unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True)
     calories_per_100g = models.FloatField(null=True, blank=True)
+    density_g_per_ml = models.FloatField(
+        null=True, blank=True, help_text='Grams per millilitre, used to convert volumes to weights'
+    )
     
     class Meta:
         ordering = ['name']
@@ -58,6 +65,69 @@ class Ingredient(models.Model):
     def __str__(self):
         return self.name
 
+CARD_TAG_SEPARATOR = '\x1f'
+
+# Recipe columns maintained by signals and services, left out of ordinary saves
+MAINTAINED_FIELDS = {
+    'rating_count', 'rating_sum', 'rating_avg',
+    'calories_total', 'calories_per_serving',
+    'card_version', 'related_updated_at', 'similarity_computed_at',
+}
+
+def _per_recipe_count(queryset):
+    """Correlated COUNT(*) subquery keyed on recipe_id"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+            .annotate(c=Count('*')).values('c')
+        ),
+        Value(0)
+    )
+
+class RecipeQuerySet(models.QuerySet):
+    def with_card_stats(self, tag_limit=3):
+        """
+        Annotate everything a recipe card renders so listings need no
+        per-recipe queries: step_count, ingredient_count, tag_count and the
+        first ``tag_limit`` tag names (by name) in ``card_tag_names``.
+        """
+        tag_names_sql = (
+            "SELECT group_concat(name, %s) FROM ("
+            "SELECT t.name AS name FROM recipes_tag t "
+            "JOIN recipes_recipe_tags rt ON rt.tag_id = t.id "
+            "WHERE rt.recipe_id = recipes_recipe.id "
+            "ORDER BY t.name LIMIT %s)"
+        )
+        return self.annotate(
+            step_count=_per_recipe_count(RecipeStep.objects.all()),
+            ingredient_count=_per_recipe_count(RecipeIngredient.objects.all()),
+            tag_count=_per_recipe_count(Recipe.tags.through.objects.all()),
+            card_tag_names=RawSQL(
+                tag_names_sql, [CARD_TAG_SEPARATOR, tag_limit], output_field=models.TextField()
+            ),
+        )
+
+    def update_rating_stats(self):
+        """Recompute the denormalized rating columns (and bump card_version) in a single UPDATE"""
+        ratings = RecipeRating.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+        return self.update(
+            rating_count=Coalesce(Subquery(ratings.annotate(c=Count('id')).values('c')), Value(0)),
+            rating_sum=Coalesce(Subquery(ratings.annotate(s=Sum('score')).values('s')), Value(0)),
+            rating_avg=Coalesce(
+                Subquery(ratings.annotate(a=Avg('score')).values('a'), output_field=models.FloatField()),
+                Value(0.0)
+            ),
+            card_version=F('card_version') + 1,
+            related_updated_at=Now(),
+        )
+    
+    def bump_card_version(self):
+        """
+        Invalidate cached recipe card fragments (keyed on pk + card_version)
+        and detail page validators after a related row changed.
+        """
+        return self.update(card_version=F('card_version') + 1, related_updated_at=Now())
+
 class Recipe(models.Model):
     DIFFICULTY_CHOICES = [
         ('easy', 'Easy'),
@@ -65,7 +135,7 @@ class Recipe(models.Model):
         ('hard', 'Hard'),
     ]
     
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     description = models.TextField()
     instructions = models.TextField()
     prep_time = models.PositiveIntegerField(help_text='Preparation time in minutes')
@@ -79,13 +149,32 @@ class Recipe(models.Model):
     tags = models.ManyToManyField(Tag, blank=True)
     
     # Media
-    image = models.ImageField(upload_to='recipes/', blank=True, null=True)
+    image = models.ImageField(upload_to='recipes/', storage=content_storage, blank=True, null=True)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_public = models.BooleanField(default=True)
     featured = models.BooleanField(default=False)
+    mealdb_id = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False)
+    
+    # Denormalized rating aggregates, maintained from RecipeRating signals
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0, editable=False)
+    
+    # Nutrition rollup from RecipeIngredient quantities, see services.nutrition
+    calories_total = models.FloatField(null=True, blank=True, editable=False)
+    calories_per_serving = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    
+    # Part of the cache key of rendered recipe cards, bumped from signals
+    card_version = models.PositiveIntegerField(default=0, editable=False)
+    related_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    similarity_computed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    objects = RecipeQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -102,20 +191,59 @@ class Recipe(models.Model):
     
     @property
     def average_rating(self):
-        ratings = self.ratings.all()
-        if ratings:
-            return sum(rating.score for rating in ratings) / len(ratings)
-        return 0
+        return self.rating_avg
+    
+    @property
+    def card_tags(self):
+        """Tag names annotated by RecipeQuerySet.with_card_stats()"""
+        names = getattr(self, 'card_tag_names', None)
+        return names.split(CARD_TAG_SEPARATOR) if names else []
+    
+    @property
+    def last_modified(self):
+        """Latest change to the recipe or anything shown alongside it"""
+        return max(filter(None, [self.updated_at, self.related_updated_at, self.similarity_computed_at]))
     
     def save(self, *args, **kwargs):
+        # Columns other writers keep current with UPDATE ... SET; an edit form
+        # loaded before a rating or card bump must not write back its stale copies
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in MAINTAINED_FIELDS and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
-        
-        if self.image:
-            img = Image.open(self.image.path)
-            if img.height > 800 or img.width > 800:
-                output_size = (800, 800)
-                img.thumbnail(output_size)
-                img.save(self.image.path)
+
+class SearchMatch(models.Lookup):
+    """FTS5 full-text query: ``document__match=expression``"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+class RecipeSearchDocument(models.Model):
+    """
+    The SQLite FTS5 index kept by services.search_index, one row per
+    recipe (rowid = recipe id). Not managed by Django; it exists so a
+    search can join the index and run its MATCH once.
+    """
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_document'
+    )
+    # FTS5's hidden column named after the table matches against every column
+    document = models.TextField(db_column='recipes_recipe_fts')
+    # BM25 with the column weights configured by services.search_index, lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_fts'
+
+RecipeSearchDocument._meta.get_field('document').register_lookup(SearchMatch)
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredients')
@@ -147,7 +275,7 @@ class RecipeStep(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='steps')
     step_number = models.PositiveIntegerField()
     instruction = models.TextField()
-    image = models.ImageField(upload_to='recipe_steps/', blank=True, null=True)
+    image = models.ImageField(upload_to='recipe_steps/', storage=content_storage, blank=True, null=True)
     time_required = models.PositiveIntegerField(null=True, blank=True, help_text='Time in minutes')
     
     class Meta:
@@ -155,4 +283,99 @@ class RecipeStep(models.Model):
         unique_together = ['recipe', 'step_number']
     
     def __str__(self):
-        return f"Step {self.step_number}: {self.instruction[:50]}..."
\ No newline at end of file
+        return f"Step {self.step_number}: {self.instruction[:50]}..."
+
+class RecipeSimilarity(models.Model):
+    """Precomputed top-k neighbours of a recipe, written by compute_recipe_similarity"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar')
+    neighbor = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['recipe', 'rank']
+        unique_together = ['recipe', 'rank']
+    
+    def __str__(self):
+        return f"{self.recipe_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+class ImportJournalEntry(models.Model):
+    """Progress of one external recipe through an import, so interrupted runs can resume"""
+    STAGE_CHOICES = [
+        ('pending', 'Pending'),
+        ('fetched', 'Fetched'),
+        ('parsed', 'Parsed'),
+        ('saved', 'Saved'),
+        ('done', 'Images downloaded'),
+    ]
+    
+    source = models.CharField(max_length=20, default='mealdb')
+    external_id = models.CharField(max_length=20)
+    category = models.CharField(max_length=100, blank=True, help_text='Listing the recipe was picked from')
+    title = models.CharField(max_length=200, blank=True)
+    
+    # Last completed stage; a failure records the stage that raised
+    stage = models.CharField(max_length=10, choices=STAGE_CHOICES, default='pending')
+    failed_stage = models.CharField(max_length=10, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    
+    # Stage outputs, kept so a resumed run never repeats a completed stage
+    meal_data = models.JSONField(null=True, blank=True)
+    parsed = models.JSONField(null=True, blank=True)
+    recipe = models.ForeignKey(Recipe, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['id']
+        unique_together = ['source', 'external_id']
+        verbose_name_plural = 'Import journal entries'
+    
+    def __str__(self):
+        return f"{self.source}:{self.external_id} ({self.stage})"
+
+class GPTResult(models.Model):
+    """A paid-for GPT answer, kept across restarts and deploys so the same question is never asked twice"""
+    key = models.CharField(max_length=64, help_text='SHA-256 of what was asked')
+    model = models.CharField(max_length=50)
+    analysis_type = models.CharField(max_length=30)
+    result = models.JSONField()
+    
+    # Read by the cache's least-recently-used eviction
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        unique_together = ['key', 'model']
+        verbose_name = 'GPT result'
+    
+    def __str__(self):
+        return f"{self.analysis_type} {self.key[:12]} ({self.model}, {self.hits} hits)"
+
+class GPTCall(models.Model):
+    """One GPT request, or one lookup answered by the result cache; the raw data behind the GPT metrics"""
+    analysis_type = models.CharField(max_length=30)
+    model = models.CharField(max_length=50)
+    cached = models.BooleanField(default=False)
+    # Recipes the request (or cache lookup) covered, and how many of them fell back to rule-based parsing
+    recipes = models.PositiveIntegerField(default=1)
+    fallbacks = models.PositiveIntegerField(default=0)
+    # The response wasn't valid JSON but _extract_partial_json salvaged it
+    repaired = models.BooleanField(default=False)
+    failed = models.BooleanField(default=False)
+    
+    latency_ms = models.FloatField(null=True, blank=True)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    cost_usd = models.FloatField(default=0, help_text='Estimated from GPT_TOKEN_PRICES')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = 'GPT call'
+    
+    def __str__(self):
+        source = 'cache' if self.cached else f'{self.latency_ms or 0:.0f} ms'
+        return f"{self.analysis_type} x{self.recipes} ({source})"
@@ -0,0 +1,121 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from apps.recipes.models import Recipe
+
+VERSION_KEY = 'recipes:title_index_version'
+DEFAULT_LIMIT = 8
+
+# How long a process trusts its copy before re-reading the shared version
+VERSION_CHECK_INTERVAL = 1.0
+
+
+class TitleIndex:
+    """
+    Sorted lists of lowercase keys for prefix lookups with ``bisect``.
+
+    ``titles`` holds whole titles; ``words`` holds the title from each later
+    word on, so "marengo" finds "Chicken Marengo". Whole-title matches rank
+    first; either scan stops as soon as ``limit`` visible recipes are found.
+    """
+
+    def __init__(self, rows):
+        self.recipes = {}
+        titles, words = [], []
+        for pk, title, image, derivatives, is_public, author_id in rows:
+            thumbnail = (derivatives or {}).get('sizes', {}).get('thumbnail', {}).get('jpeg')
+            self.recipes[pk] = (
+                {
+                    'id': pk,
+                    'title': title,
+                    'url': reverse('recipes:detail', args=[pk]),
+                    'image': default_storage.url(thumbnail or image) if (thumbnail or image) else None,
+                },
+                is_public,
+                author_id,
+            )
+            parts = title.lower().split()
+            titles.append((' '.join(parts), pk))
+            words.extend((' '.join(parts[position:]), pk) for position in range(1, len(parts)))
+        titles.sort()
+        words.sort()
+        self.titles = ([key for key, _ in titles], [pk for _, pk in titles])
+        self.words = ([key for key, _ in words], [pk for _, pk in words])
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def lookup(self, prefix, user_id=None, limit=DEFAULT_LIMIT):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        results, seen = [], set()
+        for keys, pks in (self.titles, self.words):
+            for i in range(bisect_left(keys, prefix), len(keys)):
+                if not keys[i].startswith(prefix) or len(results) >= limit:
+                    break
+                pk = pks[i]
+                payload, is_public, author_id = self.recipes[pk]
+                if pk in seen or (not is_public and author_id != user_id):
+                    continue
+                seen.add(pk)
+                results.append(payload)
+        return results
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A fresh random-ish start so an evicted counter can't repeat an old value
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def build_index():
+    rows = Recipe.objects.order_by().values_list(
+        'id', 'title', 'image', 'image_derivatives', 'is_public', 'author_id'
+    )
+    return TitleIndex(rows.iterator(chunk_size=2000))
+
+
+def get_index():
+    """Per-process index, rebuilt lazily when the shared version moves"""
+    global _index, _index_version, _checked_at
+
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _index
+
+    version = current_version()
+    if _index is None or version != _index_version:
+        with _lock:
+            if _index is None or version != _index_version:
+                _index = build_index()
+                _index_version = version
+    _checked_at = now
+    return _index
+
+
+def autocomplete(prefix, user=None, limit=DEFAULT_LIMIT):
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    return get_index().lookup(prefix, user_id=user_id, limit=limit)
@@ -0,0 +1,309 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from apps.core.api import dumps, loads
+from apps.core.db import update_rows
+from apps.core.storage import retain_files
+from apps.recipes.models import Category, Ingredient, Recipe, RecipeIngredient, RecipeStep, Tag, Unit
+from apps.recipes.services import autocomplete, nutrition, search_index
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+
+RECIPE_COLUMNS = [
+    'id', 'title', 'description', 'instructions', 'prep_time', 'cook_time', 'servings', 'difficulty',
+    'author__username', 'category__name', 'category__description', 'category__icon', 'category__color',
+    'image', 'image_hash', 'image_derivatives', 'is_public', 'featured', 'mealdb_id', 'created_at',
+]
+
+# Attributes copied onto lookup rows the import has to create, per model
+LOOKUP_DEFAULTS = {
+    Category: ('description', 'icon', 'color'),
+    Tag: ('color',),
+    Unit: ('abbreviation', 'unit_type'),
+    Ingredient: ('description', 'calories_per_100g', 'density_g_per_ml'),
+}
+
+
+# Export ---------------------------------------------------------------------
+
+def _export_chunk(rows):
+    """Attach steps, ingredients and tags to a chunk of recipe rows with three queries"""
+    ids = [row['id'] for row in rows]
+
+    steps = defaultdict(list)
+    for recipe_id, number, instruction, time_required, image in RecipeStep.objects.filter(
+        recipe_id__in=ids
+    ).order_by('recipe_id', 'step_number').values_list(
+        'recipe_id', 'step_number', 'instruction', 'time_required', 'image'
+    ):
+        steps[recipe_id].append({
+            'step_number': number, 'instruction': instruction,
+            'time_required': time_required, 'image': image or None,
+        })
+
+    ingredients = defaultdict(list)
+    for recipe_id, *values in RecipeIngredient.objects.filter(recipe_id__in=ids).order_by('id').values_list(
+        'recipe_id', 'ingredient__name', 'quantity', 'notes', 'ingredient__calories_per_100g',
+        'ingredient__density_g_per_ml', 'unit__name', 'unit__abbreviation', 'unit__unit_type',
+    ):
+        name, quantity, notes, calories, density, unit_name, abbreviation, unit_type = values
+        ingredients[recipe_id].append({
+            'name': name, 'quantity': quantity, 'notes': notes,
+            'calories_per_100g': calories, 'density_g_per_ml': density,
+            'unit': {'name': unit_name, 'abbreviation': abbreviation, 'unit_type': unit_type},
+        })
+
+    tags = defaultdict(list)
+    for recipe_id, name, color in Recipe.tags.through.objects.filter(recipe_id__in=ids).order_by(
+        'recipe_id', 'tag__name'
+    ).values_list('recipe_id', 'tag__name', 'tag__color'):
+        tags[recipe_id].append({'name': name, 'color': color})
+
+    for row in rows:
+        recipe_id = row['id']
+        yield {
+            'title': row['title'],
+            'description': row['description'],
+            'instructions': row['instructions'],
+            'prep_time': row['prep_time'],
+            'cook_time': row['cook_time'],
+            'servings': row['servings'],
+            'difficulty': row['difficulty'],
+            'author': row['author__username'],
+            'category': {
+                'name': row['category__name'],
+                'description': row['category__description'],
+                'icon': row['category__icon'],
+                'color': row['category__color'],
+            } if row['category__name'] else None,
+            'tags': tags[recipe_id],
+            'image': row['image'] or None,
+            'image_hash': row['image_hash'],
+            'image_derivatives': row['image_derivatives'],
+            'is_public': row['is_public'],
+            'featured': row['featured'],
+            'mealdb_id': row['mealdb_id'],
+            'created_at': row['created_at'],
+            'steps': steps[recipe_id],
+            'ingredients': ingredients[recipe_id],
+        }
+
+
+def export_recipes(queryset=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield one self-contained dict per recipe, oldest first. Rows are
+    streamed with ``.iterator()`` and related rows fetched per chunk, so
+    memory stays bounded by ``chunk_size`` whatever the catalogue size.
+    """
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('id').values(*RECIPE_COLUMNS).iterator(chunk_size=chunk_size)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _export_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from _export_chunk(chunk)
+
+
+def write_jsonl(records, stream):
+    """Write records to a binary stream as JSON Lines; returns the count"""
+    count = 0
+    for record in records:
+        stream.write(dumps(record))
+        stream.write(b'\n')
+        count += 1
+    return count
+
+
+# Import ---------------------------------------------------------------------
+
+class UnknownAuthor(ValueError):
+    pass
+
+
+class CatalogueImporter:
+    """
+    Bulk loader for ``export_recipes`` records, also the save stage of
+    the TheMealDB imports.
+
+    Each chunk of recipes is written in one transaction with ``bulk_create``.
+    Categories, tags, units, ingredients and authors resolve through
+    name -> id caches kept for the whole run, so each distinct name costs
+    at most one lookup (and one bulk insert when it is new). ``bulk_create``
+    skips signals, so the search index, nutrition rollups and autocomplete
+    version are refreshed per chunk instead.
+    """
+
+    def __init__(self, default_author=None, chunk_size=CHUNK_SIZE, skip_existing=True):
+        self.default_author = default_author
+        self.chunk_size = chunk_size
+        self.skip_existing = skip_existing
+        self.lookups = {model: {} for model in LOOKUP_DEFAULTS}
+        self.authors = {}
+        self.stats = Counter()
+
+    def import_lines(self, lines):
+        """Import JSON Lines (bytes or str) from any iterable, e.g. an open file"""
+        chunk = []
+        for line in lines:
+            if not line.strip():
+                continue
+            chunk.append(loads(line))
+            if len(chunk) >= self.chunk_size:
+                self.import_records(chunk)
+                chunk = []
+        if chunk:
+            self.import_records(chunk)
+        return self.stats
+
+    def preload(self):
+        """Fill the lookup caches with every existing row, one query per model"""
+        for model, cache in self.lookups.items():
+            cache.update(model.objects.values_list('name', 'id'))
+
+    def _resolve(self, model, entries):
+        """Name -> id cache for ``model`` covering ``{name: attrs}``, creating missing rows"""
+        cache = self.lookups[model]
+        missing = [name for name in entries if name not in cache]
+        if missing:
+            cache.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+            new = [
+                model(name=name, **{key: entries[name].get(key) for key in LOOKUP_DEFAULTS[model]
+                                    if entries[name].get(key) is not None})
+                for name in missing if name not in cache
+            ]
+            if new:
+                # Another import may have created some of them meanwhile
+                model.objects.bulk_create(new, ignore_conflicts=True)
+                cache.update(model.objects.filter(name__in=[obj.name for obj in new]).values_list('name', 'id'))
+                self.stats[f'{model._meta.verbose_name_plural} created'] += len(new)
+        return cache
+
+    def _author_ids(self, usernames):
+        missing = [name for name in usernames if name not in self.authors]
+        if missing:
+            found = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+            for username in missing:
+                author_id = found.get(username) or (self.default_author and self.default_author.pk)
+                if author_id is None:
+                    raise UnknownAuthor(f'Unknown author {username!r} and no default author given')
+                self.authors[username] = author_id
+        return self.authors
+
+    def import_records(self, records):
+        if self.skip_existing:
+            seen = set(Recipe.objects.filter(
+                title__in={record['title'] for record in records}
+            ).values_list('title', flat=True))
+            seen_ids = set(Recipe.objects.filter(
+                mealdb_id__in={record['mealdb_id'] for record in records if record.get('mealdb_id')}
+            ).values_list('mealdb_id', flat=True))
+            fresh = []
+            for record in records:
+                if record['title'] in seen or record.get('mealdb_id') in seen_ids:
+                    self.stats['skipped'] += 1
+                else:
+                    seen.add(record['title'])
+                    if record.get('mealdb_id'):
+                        seen_ids.add(record['mealdb_id'])
+                    fresh.append(record)
+            records = fresh
+        if records:
+            self.write_records(records)
+
+    def write_records(self, records):
+        """
+        Create one recipe per record, with its steps, ingredients and tags,
+        in a single transaction; returns the recipes in record order.
+        """
+        with transaction.atomic():
+            categories = self._resolve(Category, {
+                record['category']['name']: record['category'] for record in records if record.get('category')
+            })
+            tags = self._resolve(Tag, {
+                tag['name']: tag for record in records for tag in record.get('tags', [])
+            })
+            units = self._resolve(Unit, {
+                item['unit']['name']: item['unit'] for record in records for item in record.get('ingredients', [])
+            })
+            ingredients = self._resolve(Ingredient, {
+                item['name']: item for record in records for item in record.get('ingredients', [])
+            })
+            authors = self._author_ids({record.get('author') for record in records})
+
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    title=record['title'],
+                    description=record.get('description', ''),
+                    instructions=record.get('instructions', ''),
+                    prep_time=record.get('prep_time', 0),
+                    cook_time=record.get('cook_time', 0),
+                    servings=record.get('servings', 4),
+                    difficulty=record.get('difficulty', 'easy'),
+                    author_id=authors[record.get('author')],
+                    category_id=categories[record['category']['name']] if record.get('category') else None,
+                    image=record.get('image') or None,
+                    image_hash=record.get('image_hash') or '',
+                    image_derivatives=record.get('image_derivatives') or {},
+                    is_public=record.get('is_public', True),
+                    featured=record.get('featured', False),
+                    # Unique, so duplicated recipes can't carry it over
+                    mealdb_id=record.get('mealdb_id') if self.skip_existing else None,
+                )
+                for record in records
+            ])
+
+            # auto_now_add overrides created_at on insert; restore the exported one
+            update_rows(Recipe, ['created_at'], [
+                (recipe.pk, parse_datetime(record['created_at']))
+                for recipe, record in zip(recipes, records) if record.get('created_at')
+            ])
+
+            steps, recipe_ingredients, recipe_tags = [], [], []
+            for recipe, record in zip(recipes, records):
+                for step in record.get('steps', []):
+                    steps.append(RecipeStep(
+                        recipe_id=recipe.pk,
+                        step_number=step['step_number'],
+                        instruction=step['instruction'],
+                        time_required=step.get('time_required'),
+                        image=step.get('image') or None,
+                    ))
+                used = set()
+                for item in record.get('ingredients', []):
+                    ingredient_id = ingredients[item['name']]
+                    if ingredient_id in used:
+                        continue
+                    used.add(ingredient_id)
+                    recipe_ingredients.append(RecipeIngredient(
+                        recipe_id=recipe.pk,
+                        ingredient_id=ingredient_id,
+                        unit_id=units[item['unit']['name']],
+                        quantity=item['quantity'],
+                        notes=item.get('notes', ''),
+                    ))
+                for tag_id in {tags[tag['name']] for tag in record.get('tags', [])}:
+                    recipe_tags.append(Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id))
+
+            RecipeStep.objects.bulk_create(steps)
+            RecipeIngredient.objects.bulk_create(recipe_ingredients)
+            Recipe.tags.through.objects.bulk_create(recipe_tags)
+            retain_files([recipe.image.name for recipe in recipes] + [step.image.name for step in steps])
+
+            # What the post_save signals would have done, once per chunk
+            recipe_ids = [recipe.pk for recipe in recipes]
+            search_index.index_recipes(recipe_ids)
+            nutrition.update_nutrition(recipe_ids)
+            Recipe.objects.filter(pk__in=recipe_ids).bump_card_version()
+            transaction.on_commit(autocomplete.bump_version)
+
+        self.stats['imported'] += len(recipes)
+        return recipes
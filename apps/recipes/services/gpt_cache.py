@@ -0,0 +1,126 @@
+import hashlib
+import itertools
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from apps.recipes.models import GPTResult
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(text):
+    """Cache key for a prompt (or one recipe's part of a batched prompt)"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class GPTResultCache:
+    """
+    Durable cache of GPT answers in the ``GPTResult`` table, keyed by
+    prompt hash and model, so results survive restarts and deploys and
+    are shared by every process using the database.
+
+    Holds at most ``max_entries`` results: writes that go past the limit
+    evict the least recently used tenth. ``stats`` counts this process's
+    hits, misses, writes and evictions.
+    """
+
+    def __init__(self, model, max_entries=None):
+        self.model = model
+        self.max_entries = max_entries or getattr(settings, 'GPT_CACHE_MAX_ENTRIES', 20000)
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+
+    def entries(self):
+        return GPTResult.objects.filter(model=self.model)
+
+    def _count(self, name, value):
+        with self.lock:
+            self.stats[name] += value
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """``{key: result}`` for the keys that are cached; counts a hit or miss per key"""
+        keys = set(keys)
+        if not keys:
+            return {}
+        found = dict(self.entries().filter(key__in=keys).values_list('key', 'result'))
+        if found:
+            self.entries().filter(key__in=found).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        self._count('hits', len(found))
+        self._count('misses', len(keys) - len(found))
+        return found
+
+    def set(self, key, result, analysis_type):
+        self.set_many({key: result}, analysis_type)
+
+    def set_many(self, results, analysis_type):
+        """Store ``{key: result}``, replacing earlier answers to the same prompts"""
+        if not results:
+            return
+        now = timezone.now()
+        GPTResult.objects.bulk_create(
+            [
+                GPTResult(key=key, model=self.model, analysis_type=analysis_type, result=result, last_used_at=now)
+                for key, result in results.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['key', 'model'],
+            update_fields=['analysis_type', 'result', 'last_used_at'],
+        )
+        self._count('writes', len(results))
+        self.evict()
+
+    def evict(self):
+        """Trim the table back under ``max_entries``, oldest use first; returns the number removed"""
+        excess = GPTResult.objects.count() - self.max_entries
+        if excess <= 0:
+            return 0
+        # Overshoot a little so the next few writes don't each pay for an eviction
+        stale = GPTResult.objects.order_by('last_used_at').values_list('pk', flat=True)[:excess + self.max_entries // 10]
+        removed, _ = GPTResult.objects.filter(pk__in=list(stale)).delete()
+        self._count('evictions', removed)
+        logger.info(f'Evicted {removed} least recently used GPT results')
+        return removed
+
+    def export(self):
+        """Every cached result as a JSON-serialisable record, for ``export_gpt_cache``"""
+        for entry in GPTResult.objects.order_by('pk').iterator():
+            yield {
+                'key': entry.key,
+                'model': entry.model,
+                'analysis_type': entry.analysis_type,
+                'result': entry.result,
+                'hits': entry.hits,
+            }
+
+    def import_records(self, records, overwrite=False, batch_size=500):
+        """
+        Load exported records, for every model they were recorded with;
+        existing answers are kept unless ``overwrite``. Returns the number
+        of new results; the table is then evicted down to ``max_entries``.
+        """
+        before = GPTResult.objects.count()
+        now = timezone.now()
+        entries = (
+            GPTResult(
+                key=record['key'], model=record['model'], analysis_type=record.get('analysis_type', ''),
+                result=record['result'], hits=record.get('hits', 0), last_used_at=now,
+            )
+            for record in records
+        )
+        conflicts = (
+            {'update_conflicts': True, 'unique_fields': ['key', 'model'],
+             'update_fields': ['analysis_type', 'result', 'last_used_at']}
+            if overwrite else {'ignore_conflicts': True}
+        )
+        while batch := list(itertools.islice(entries, batch_size)):
+            GPTResult.objects.bulk_create(batch, **conflicts)
+        added = GPTResult.objects.count() - before
+        self.evict()
+        return added
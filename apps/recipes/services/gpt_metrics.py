@@ -0,0 +1,114 @@
+import logging
+import math
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from apps.recipes.models import GPTCall
+
+logger = logging.getLogger(__name__)
+
+# Types whose requests answer several questions at once, with the single-recipe
+# types they stand in for. Their latency, tokens, cost and repairs can't be
+# split between those, so summaries report them as their own row.
+COMBINED_TYPES = {
+    'recipe_analysis': ['steps_and_timing', 'cooking_times', 'category'],
+}
+
+
+def _percentile(latencies, count, fraction):
+    """Nearest-rank percentile of ``count`` non-NULL latencies, fetching just that row"""
+    if not count:
+        return None
+    rank = max(0, math.ceil(fraction * count) - 1)
+    return round(latencies.order_by('latency_ms')[rank], 1)
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+class GPTMetrics:
+    """
+    Records every GPT request and cache-answered lookup as a ``GPTCall``
+    row, so import commands and web workers feed the same figures and
+    ``summarize()`` can report on any time window.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def cost(self, prompt_tokens, completion_tokens):
+        """Estimated USD for a request; 0 for models missing from GPT_TOKEN_PRICES"""
+        prompt_price, completion_price = getattr(settings, 'GPT_TOKEN_PRICES', {}).get(self.model, (0, 0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record(self, analysis_type, cached=False, recipes=1, fallbacks=0, repaired=False, failed=False,
+               latency_ms=None, prompt_tokens=0, completion_tokens=0):
+        """Save one request (or cache lookup); metrics never break an analysis"""
+        try:
+            GPTCall.objects.create(
+                analysis_type=analysis_type, model=self.model, cached=cached,
+                recipes=recipes, fallbacks=fallbacks, repaired=repaired, failed=failed,
+                latency_ms=latency_ms, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                cost_usd=self.cost(prompt_tokens, completion_tokens),
+            )
+        except Exception as e:
+            logger.warning(f"Could not record GPT metrics for {analysis_type}: {e}")
+
+
+def summarize(since=None):
+    """
+    ``{analysis_type: figures}`` plus a ``total`` entry, over the calls
+    made after ``since`` (all of them by default). Rates are per recipe
+    except ``repair_rate`` and ``failure_rate``, which are per request.
+    Rows of ``COMBINED_TYPES`` list the types they cover in ``covers``.
+    """
+    calls = GPTCall.objects.all()
+    if since is not None:
+        calls = calls.filter(created_at__gte=since)
+
+    groups = {}
+    for row in calls.values('analysis_type', 'cached').annotate(
+        calls=Count('id'),
+        recipes_sum=Sum('recipes'),
+        fallbacks_sum=Sum('fallbacks'),
+        repaired_count=Count('id', filter=Q(repaired=True)),
+        failed_count=Count('id', filter=Q(failed=True)),
+        latency_count=Count('latency_ms'),
+        latency_sum=Sum('latency_ms'),
+        prompt_tokens_sum=Sum('prompt_tokens'),
+        completion_tokens_sum=Sum('completion_tokens'),
+        cost_sum=Sum('cost_usd'),
+    ).order_by():
+        for name in (row['analysis_type'], 'total'):
+            group = groups.setdefault(name, {'requests': {}, 'cached': {}})
+            part = group['cached' if row['cached'] else 'requests']
+            for key, value in row.items():
+                if key not in ('analysis_type', 'cached'):
+                    part[key] = part.get(key, 0) + (value or 0)
+
+    summary = {}
+    for analysis_type in sorted(groups, key=lambda name: (name == 'total', name)):
+        requests, cached = groups[analysis_type]['requests'], groups[analysis_type]['cached']
+        recipes = requests.get('recipes_sum', 0) + cached.get('recipes_sum', 0)
+        latencies = calls.filter(cached=False, latency_ms__isnull=False).values_list('latency_ms', flat=True)
+        if analysis_type != 'total':
+            latencies = latencies.filter(analysis_type=analysis_type)
+        latency_count = requests.get('latency_count', 0)
+        summary[analysis_type] = {
+            'requests': requests.get('calls', 0),
+            'recipes': recipes,
+            'latency_p50_ms': _percentile(latencies, latency_count, 0.5),
+            'latency_p95_ms': _percentile(latencies, latency_count, 0.95),
+            'latency_total_s': round(requests.get('latency_sum', 0) / 1000, 3),
+            'prompt_tokens': requests.get('prompt_tokens_sum', 0),
+            'completion_tokens': requests.get('completion_tokens_sum', 0),
+            'cost_usd': round(requests.get('cost_sum', 0), 4),
+            'cache_hit_ratio': _ratio(cached.get('recipes_sum', 0), recipes),
+            'repair_rate': _ratio(requests.get('repaired_count', 0), requests.get('calls', 0)),
+            'failure_rate': _ratio(requests.get('failed_count', 0), requests.get('calls', 0)),
+            'fallback_rate': _ratio(requests.get('fallbacks_sum', 0) + cached.get('fallbacks_sum', 0), recipes),
+            'covers': COMBINED_TYPES.get(analysis_type, []),
+        }
+    return summary
@@ -1,32 +1,54 @@
 import os
 import json
-import hashlib
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
-from django.core.cache import cache
 from django.conf import settings
 from openai import OpenAI
+from .gpt_cache import GPTResultCache, result_key
+from .gpt_metrics import GPTMetrics
+from .instructions import parse_instructions
 import logging
 
 logger = logging.getLogger(__name__)
 
+CATEGORIES = [
+    'Breakfast', 'Dessert', 'Beef', 'Chicken', 'Seafood', 'Pasta',
+    'Vegetarian', 'Vegan', 'Side', 'Starter', 'Miscellaneous',
+]
+
+SYSTEM_PROMPT = "You are a professional chef assistant. Always respond with valid JSON only. No additional text or explanations. Ensure all strings are properly escaped."
+
 class RecipeStepAnalyzer:
     """Cost-optimized GPT service for recipe step analysis with robust JSON handling"""
 
-    def __init__(self):
+    def __init__(self, client=None, max_concurrency=None):
         self.model = "gpt-4o"
         self.max_tokens = 800  # Increased for better responses
+        self.batch_max_tokens = 12000  # Output budget for one batched request
         self.temperature = 0.1
-        self.enabled = bool(getattr(settings, 'OPENAI_API_KEY', os.getenv('OPENAI_API_KEY')))
+        self.cache = GPTResultCache(self.model)
+        self.metrics = GPTMetrics(self.model)
+        self.enabled = client is not None or bool(getattr(settings, 'OPENAI_API_KEY', os.getenv('OPENAI_API_KEY')))
+        # Shared by every thread using this analyzer, so callers can't exceed it together
+        self.slots = threading.BoundedSemaphore(max_concurrency or getattr(settings, 'GPT_MAX_CONCURRENCY', 4))
         
-        if self.enabled:
-            self.client = OpenAI(api_key=getattr(settings, 'OPENAI_API_KEY', os.getenv('OPENAI_API_KEY')))
+        if client is not None:
+            # Anything with the chat.completions.create() interface, e.g. a local stub
+            self.client = client
+        elif self.enabled:
+            self.client = OpenAI(
+                api_key=getattr(settings, 'OPENAI_API_KEY', os.getenv('OPENAI_API_KEY')),
+                base_url=getattr(settings, 'OPENAI_BASE_URL', None) or None,
+            )
         else:
             logger.warning("OpenAI API key not found. GPT features will be disabled.")
 
     def _get_cache_key(self, text: str, analysis_type: str) -> str:
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        return f"recipe_gpt_{analysis_type}_{text_hash}"
+        """Key of a prompt's answer in the result cache; the model is keyed separately"""
+        return result_key(f"{analysis_type}:{text}")
 
     def _clean_json_response(self, response_text: str) -> str:
         """Clean and fix common JSON issues in GPT responses"""
@@ -56,34 +78,68 @@ class RecipeStepAnalyzer:
         
         return json_text
 
-    def _call_gpt_api(self, prompt: str, cache_key: str) -> Dict:
-        """Make cost-optimized GPT API call with robust error handling"""
+    def _call_gpt_api(self, prompt: str, analysis_type: str, required: Tuple[str, ...] = ()) -> Dict:
+        """Make cost-optimized GPT API call with robust error handling; a result
+        lacking any ``required`` key is counted as a fallback in the metrics"""
         if not self.enabled:
             logger.warning("OpenAI GPT is not enabled.")
             return None
 
-        cached_result = cache.get(cache_key)
+        def fallbacks(result):
+            return int(not result or any(key not in result for key in required))
+
+        cache_key = self._get_cache_key(prompt, analysis_type)
+        cached_result = self.cache.get(cache_key)
         if cached_result:
-            logger.info(f"Using cached GPT result for {cache_key}")
+            logger.info(f"Using cached GPT result for {analysis_type} {cache_key[:12]}")
+            self.metrics.record(analysis_type, cached=True, fallbacks=fallbacks(cached_result))
             return cached_result
 
+        result, call = self._complete(prompt)
+        if result:
+            # Cache successful result
+            self.cache.set(cache_key, result, analysis_type)
+        self.metrics.record(analysis_type, fallbacks=fallbacks(result), **call)
+        return result
+
+    def _complete(self, prompt: str, max_tokens: int = None, timeout: float = 15,
+                  partial: bool = True) -> Tuple[Dict, Dict]:
+        """
+        One chat completion parsed as JSON (or None), and a dict of what
+        the call took for ``GPTMetrics.record``. Waits for a free
+        concurrency slot; the wait isn't counted as latency.
+        """
+        call = {'latency_ms': None, 'prompt_tokens': 0, 'completion_tokens': 0, 'repaired': False, 'failed': True}
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a professional chef assistant. Always respond with valid JSON only. No additional text or explanations. Ensure all strings are properly escaped."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                timeout=15,
-            )
+            with self.slots:
+                started = time.perf_counter()
+                try:
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {
+                                "role": "system", 
+                                "content": SYSTEM_PROMPT
+                            },
+                            {
+                                "role": "user", 
+                                "content": prompt
+                            }
+                        ],
+                        max_tokens=max_tokens or self.max_tokens,
+                        temperature=self.temperature,
+                        timeout=timeout,
+                    )
+                finally:
+                    call['latency_ms'] = (time.perf_counter() - started) * 1000
+            
+            # Log token usage for cost tracking
+            if hasattr(response, 'usage') and response.usage:
+                logger.info(f"GPT API call: {response.usage.total_tokens} tokens used")
+                call['prompt_tokens'] = response.usage.prompt_tokens or 0
+                call['completion_tokens'] = response.usage.completion_tokens or 0
+            else:
+                logger.info("GPT API call completed (token count unavailable)")
             
             raw_content = response.choices[0].message.content.strip()
             logger.info(f"Raw GPT response: {raw_content[:200]}...")
@@ -96,24 +152,17 @@ class RecipeStepAnalyzer:
                 logger.error(f"Failed to parse cleaned JSON: {e}")
                 logger.error(f"Cleaned JSON: {cleaned_json}")
                 # Try to extract partial data
-                result = self._extract_partial_json(cleaned_json)
+                result = self._extract_partial_json(cleaned_json) if partial else None
                 if not result:
-                    return None
-            
-            # Cache successful result
-            cache.set(cache_key, result, 60 * 60 * 24 * 30)
-            
-            # Log token usage for cost tracking
-            if hasattr(response, 'usage') and response.usage:
-                logger.info(f"GPT API call: {response.usage.total_tokens} tokens used")
-            else:
-                logger.info("GPT API call completed (token count unavailable)")
+                    return None, call
+                call['repaired'] = True
             
-            return result
+            call['failed'] = False
+            return result, call
 
         except Exception as e:
             logger.error(f"GPT API call failed: {e}")
-            return None
+            return None, call
 
     def _extract_partial_json(self, json_text: str) -> Dict:
         """Attempt to extract partial data from malformed JSON"""
@@ -185,7 +234,6 @@ class RecipeStepAnalyzer:
         if len(instructions) > 1500:
             instructions = instructions[:1500] + "..."
 
-        cache_key = self._get_cache_key(instructions, "steps_and_timing")
 
         # Improved prompt with explicit JSON structure
         prompt = f"""Parse this recipe into numbered steps with time estimates.
@@ -194,7 +242,7 @@ Return ONLY valid JSON in this exact format:
 
 Instructions: {instructions[:1000]}"""
 
-        result = self._call_gpt_api(prompt, cache_key)
+        result = self._call_gpt_api(prompt, "steps_and_timing", required=('steps',))
 
         if result and 'steps' in result:
             return self._validate_and_clean_steps(result['steps'])
@@ -219,7 +267,6 @@ Instructions: {instructions[:1000]}"""
             context_parts.append(f"Ingredients: {ingredients_count}")
 
         context = ". ".join(context_parts)
-        cache_key = self._get_cache_key(context, "cooking_times")
 
         # Simplified prompt
         prompt = f"""Estimate cooking times for this recipe.
@@ -227,7 +274,7 @@ Return ONLY valid JSON: {{"prep_minutes": 15, "cook_minutes": 30}}
 
 {context[:150]}"""
 
-        result = self._call_gpt_api(prompt, cache_key)
+        result = self._call_gpt_api(prompt, "cooking_times", required=('prep_minutes', 'cook_minutes'))
 
         if result and 'prep_minutes' in result and 'cook_minutes' in result:
             prep_time = max(5, min(120, result['prep_minutes']))
@@ -252,21 +299,135 @@ Return ONLY valid JSON: {{"prep_minutes": 15, "cook_minutes": 30}}
         ingredient_names = [ing['name'][:20] for ing in ingredients if isinstance(ing, dict)]
 
         context = f"Title: {title}. Ingredients: {', '.join(ingredient_names[:5])}"
-        cache_key = self._get_cache_key(context, "category")
 
         # Simplified prompt with limited options
-        prompt = f"""Categorize this recipe. Choose ONE from: Breakfast, Dessert, Beef, Chicken, Seafood, Pasta, Vegetarian, Vegan, Side, Starter, Miscellaneous.
+        prompt = f"""Categorize this recipe. Choose ONE from: {', '.join(CATEGORIES)}.
 Return ONLY valid JSON: {{"category": "category_name"}}
 
 {context[:120]}"""
 
-        result = self._call_gpt_api(prompt, cache_key)
+        result = self._call_gpt_api(prompt, "category", required=('category',))
 
         if result and 'category' in result:
             return result['category']
 
         return "Miscellaneous"
 
+    def analyze_recipes(self, recipes: List[Dict], batch_size: int = 10) -> List[Dict]:
+        """
+        Steps, prep/cook times and category for many recipes at once.
+
+        Recipes are packed ``batch_size`` to a request and the batches run
+        concurrently (at most ``max_concurrency`` in flight), replacing the
+        three sequential calls per recipe of the single-recipe methods.
+        Returns one ``{"steps", "prep_minutes", "cook_minutes", "category"}``
+        dict per recipe, in order; recipes missing from a response, or in a
+        batch that failed, get the same fallbacks as the single-recipe methods.
+        """
+        if not recipes:
+            return []
+        if not self.enabled:
+            return [self._fallback_analysis(recipe_data) for recipe_data in recipes]
+
+        contexts = [self._analysis_context(recipe_data) for recipe_data in recipes]
+        keys = [self._get_cache_key(json.dumps(context, sort_keys=True), "recipe_analysis") for context in contexts]
+        cached = self.cache.get_many(keys)
+        results = [cached.get(key) for key in keys]
+        if cached:
+            self.metrics.record("recipe_analysis", cached=True, recipes=len(recipes) - results.count(None))
+
+        todo = [i for i, result in enumerate(results) if result is None]
+        if len(todo) < len(recipes):
+            logger.info(f"Using cached GPT analysis for {len(recipes) - len(todo)} of {len(recipes)} recipes")
+        batches = [todo[start:start + max(1, batch_size)] for start in range(0, len(todo), max(1, batch_size))]
+        if batches:
+            with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+                responses = executor.map(lambda batch: self._analyze_batch([contexts[i] for i in batch]), batches)
+                for batch, (analyses, call) in zip(batches, responses):
+                    for i, analysis in zip(batch, analyses):
+                        results[i] = analysis
+                    # Recorded here rather than in the workers, which have no business with the database
+                    self.metrics.record("recipe_analysis", recipes=len(batch), fallbacks=analyses.count(None), **call)
+
+        fresh = {}
+        for i in todo:
+            if results[i] is None:
+                results[i] = self._fallback_analysis(recipes[i])
+            else:
+                fresh[keys[i]] = results[i]
+        # Only GPT answers are cached; a fallback is retried next time
+        self.cache.set_many(fresh, "recipe_analysis")
+        return results
+
+    def _analysis_context(self, recipe_data: Dict) -> Dict:
+        """What a batched request sends for one recipe, trimmed like the single-recipe prompts"""
+        ingredients = recipe_data.get('ingredients', [])
+        instructions = recipe_data.get('instructions') or ''
+        return {
+            'title': recipe_data.get('title', '')[:100],
+            'category': (recipe_data.get('category') or '').strip(),
+            'ingredients': [ing['name'][:20] for ing in ingredients[:10] if isinstance(ing, dict)],
+            'instructions': instructions[:1000],
+        }
+
+    def _analyze_batch(self, contexts: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """One request for ``contexts``: an analysis or None per context, in order, and the call's metrics"""
+        payload = [dict(context, id=str(i)) for i, context in enumerate(contexts)]
+        prompt = f"""Analyze each recipe below. For every recipe, parse its instructions into numbered steps with time estimates, estimate prep and cook times, and give its category: keep the given one unless it is empty or Miscellaneous, otherwise choose ONE from: {', '.join(CATEGORIES)}.
+Return ONLY valid JSON in this exact format, with one entry per recipe and the same ids:
+{{"recipes": [{{"id": "0", "steps": [{{"text": "step description", "time_minutes": 5, "type": "prep"}}], "prep_minutes": 15, "cook_minutes": 30, "category": "category_name"}}]}}
+
+Recipes: {json.dumps(payload, ensure_ascii=False)}"""
+
+        # Larger batches need a longer answer, and longer to write it
+        max_tokens = min(self.batch_max_tokens, self.max_tokens * len(contexts))
+        result, call = self._complete(prompt, max_tokens=max_tokens, timeout=15 + 5 * len(contexts), partial=False)
+        items = result.get('recipes') if isinstance(result, dict) else None
+        if not isinstance(items, list):
+            logger.warning(f"Batched GPT analysis of {len(contexts)} recipes failed, using fallback")
+            return [None] * len(contexts), call
+
+        by_id = {str(item.get('id')): item for item in items if isinstance(item, dict)}
+        analyses = [self._clean_analysis(by_id.get(str(i)), context) for i, context in enumerate(contexts)]
+        missing = analyses.count(None)
+        if missing:
+            logger.warning(f"Batched GPT analysis left out {missing} of {len(contexts)} recipes")
+        return analyses, call
+
+    def _clean_analysis(self, item: Dict, context: Dict) -> Dict:
+        """Validate one recipe's part of a batched response; None if it is unusable"""
+        if not item:
+            return None
+        steps = self._validate_and_clean_steps(item.get('steps') or [])
+        if context['instructions'] and not steps:
+            return None
+        category = context['category']
+        if not category or category == 'Miscellaneous':
+            category = item.get('category') if item.get('category') in CATEGORIES else 'Miscellaneous'
+        return {
+            'steps': steps,
+            'prep_minutes': self._clamp_minutes(item.get('prep_minutes'), 15, 120),
+            'cook_minutes': self._clamp_minutes(item.get('cook_minutes'), 30, 240),
+            'category': category,
+        }
+
+    @staticmethod
+    def _clamp_minutes(value, default: int, upper: int) -> int:
+        if not isinstance(value, (int, float)):
+            return default
+        return int(max(5, min(upper, value)))
+
+    def _fallback_analysis(self, recipe_data: Dict) -> Dict:
+        """What the single-recipe methods return when GPT is unavailable"""
+        instructions = recipe_data.get('instructions') or ''
+        category = (recipe_data.get('category') or '').strip()
+        return {
+            'steps': self._fallback_step_parsing(instructions) if instructions else [],
+            'prep_minutes': 15,
+            'cook_minutes': 30,
+            'category': category or 'Miscellaneous',
+        }
+
     def _validate_and_clean_steps(self, steps: List[Dict]) -> List[Dict]:
         """Validate and clean GPT-generated steps"""
         cleaned_steps = []
@@ -301,73 +462,7 @@ Return ONLY valid JSON: {{"category": "category_name"}}
 
     def _fallback_step_parsing(self, instructions: str) -> List[Dict]:
         """Fallback parsing when GPT is not available or fails"""
-        if not instructions:
-            return []
-
-        import re
-        steps = []
-
-        # Split by numbered patterns
-        step_patterns = [
-            r'\n\d+\.',
-            r'\d+\.\s',
-            r'STEP \d+',
-            r'Step \d+',
-        ]
-
-        parts = []
-        for pattern in step_patterns:
-            if re.search(pattern, instructions, re.IGNORECASE):
-                parts = re.split(pattern, instructions, flags=re.IGNORECASE)
-                parts = [part.strip() for part in parts if part.strip()]
-                if len(parts) > 1:
-                    if len(parts[0]) < 50:  # Remove intro text
-                        parts = parts[1:]
-                    break
-
-        if not parts:
-            # Split by double newlines
-            parts = [p.strip() for p in instructions.split('\n\n') if p.strip()]
-
-        if not parts:
-            # Split by periods followed by capital letters
-            parts = re.split(r'\.\s+(?=[A-Z])', instructions)
-            parts = [p.strip() + '.' for p in parts if len(p.strip()) > 20]
-
-        if not parts:
-            # Single long instruction
-            parts = [instructions]
-
-        for i, part in enumerate(parts[:12]):  # Max 12 steps
-            if len(part) < 10:
-                continue
-
-            # Clean up the step text
-            part = re.sub(r'^\d+\.?\s*', '', part).strip()
-            part = re.sub(r'^STEP\s*\d+:?\s*', '', part, flags=re.IGNORECASE).strip()
-
-            # Simple time estimation
-            time_estimate = 5
-            part_lower = part.lower()
-            if any(word in part_lower for word in ['bake', 'roast', 'cook', 'simmer', 'boil']):
-                time_estimate = 25
-            elif any(word in part_lower for word in ['fry', 'saute', 'brown', 'sear']):
-                time_estimate = 8
-            elif any(word in part_lower for word in ['mix', 'stir', 'combine', 'whisk']):
-                time_estimate = 3
-            elif any(word in part_lower for word in ['chop', 'dice', 'cut', 'slice']):
-                time_estimate = 6
-            elif any(word in part_lower for word in ['chill', 'rest', 'cool', 'refrigerate']):
-                time_estimate = 15
-
-            steps.append({
-                'number': i + 1,
-                'text': part[:500],
-                'time_minutes': time_estimate,
-                'type': 'prep'
-            })
-
-        return steps
+        return parse_instructions(instructions, max_steps=12)
 
 # Singleton instance
 recipe_analyzer = RecipeStepAnalyzer()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from apps.core.images import normalize_image
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes of imported images; thumbnail() never upscales
+MAIN_IMAGE_BOX = (800, 800)
+STEP_IMAGE_BOX = (600, 400)
+
+# Anything smaller is a placeholder or an error page, not a photo
+MIN_IMAGE_BYTES = 1000
+
+
+class ImagePipeline:
+    """
+    Downloads and normalises images off the importer's main thread.
+
+    Downloads run on the client's I/O thread pool and stream straight to
+    temporary files; decoding, resizing and JPEG encoding run on a process
+    pool, so PIL work uses every core. Stages hand each other file paths,
+    so no image is ever held in memory by this process. ``submit`` blocks
+    while ``max_pending`` images are in flight, which bounds temporary
+    disk use and keeps the process pool's queue short.
+
+    Results are collected on the caller's thread with ``completed()``,
+    where it is safe to write to the database.
+    """
+
+    def __init__(self, client, processes=None, max_pending=None):
+        self.client = client
+        self.processes = processes or os.cpu_count() or 1
+        # Spawned workers start clean: no inherited DB connections or client threads
+        self.pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+        self.slots = threading.BoundedSemaphore(max_pending or self.processes * 4)
+        self.results = queue.Queue()
+        self.pending = 0
+        self.tempdir = tempfile.TemporaryDirectory(prefix='image-import-')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.tempdir.cleanup()
+
+    def _temp_path(self, suffix):
+        return os.path.join(self.tempdir.name, uuid.uuid4().hex + suffix)
+
+    def submit(self, key, url, box=MAIN_IMAGE_BOX):
+        """Queue ``url``; ``completed()`` later yields it under ``key``"""
+        self.slots.acquire()
+        self.pending += 1
+        self.client.executor.submit(self._download, key, url, box)
+
+    def _download(self, key, url, box):
+        source = self._temp_path('.src')
+        try:
+            with open(source, 'w+b') as f:
+                size = self.client.download_to(url, f)
+            if size < MIN_IMAGE_BYTES:
+                raise ValueError(f'Image too small ({size} bytes)')
+            target = self._temp_path('.jpg')
+            future = self.pool.submit(normalize_image, source, target, box)
+        except Exception as e:
+            self._finish(key, source, None, e)
+        else:
+            future.add_done_callback(lambda future: self._processed(key, source, target, future))
+
+    def _processed(self, key, source, target, future):
+        try:
+            future.result()
+        except Exception as e:
+            self._finish(key, source, None, e)
+        else:
+            self._finish(key, source, target, None)
+
+    def _finish(self, key, source, target, error):
+        if os.path.exists(source):
+            os.remove(source)
+        self.slots.release()
+        self.results.put((key, target, error))
+
+    def completed(self, wait=False):
+        """
+        Yield ``(key, path, error)`` for finished images; ``path`` is a
+        JPEG the caller should move or delete. With ``wait``, keeps going
+        until nothing is in flight.
+        """
+        while self.pending:
+            try:
+                result = self.results.get(block=wait)
+            except queue.Empty:
+                return
+            self.pending -= 1
+            yield result
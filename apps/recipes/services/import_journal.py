@@ -0,0 +1,159 @@
+import logging
+
+from django.db import transaction
+
+from apps.recipes.models import ImportJournalEntry, Recipe
+
+logger = logging.getLogger(__name__)
+
+STAGES = [stage for stage, _ in ImportJournalEntry.STAGE_CHOICES]
+
+
+def _reached(entry, stage):
+    return STAGES.index(entry.stage) >= STAGES.index(stage)
+
+
+class ImportJournal:
+    """
+    Persistent checkpoints for an external import.
+
+    Each meal id gets one ``ImportJournalEntry`` that moves through
+    fetched -> parsed -> saved -> done. Every stage's output is stored on
+    the entry, so ``run()`` on a resumed import continues from the first
+    unfinished stage instead of refetching or reparsing.
+    """
+
+    def __init__(self, source='mealdb'):
+        self.source = source
+
+    def entries(self):
+        return ImportJournalEntry.objects.filter(source=self.source)
+
+    def completed_ids(self, external_ids):
+        """Ids among ``external_ids`` that already have a recipe, in two bulk lookups"""
+        external_ids = [str(external_id) for external_id in external_ids]
+        done = set(Recipe.objects.filter(mealdb_id__in=external_ids).values_list('mealdb_id', flat=True))
+        done.update(self.entries().filter(external_id__in=external_ids, stage='done').values_list(
+            'external_id', flat=True
+        ))
+        return done
+
+    def pending(self):
+        """Unfinished entries, failed ones included, oldest first"""
+        return self.entries().exclude(stage='done')
+
+    def start(self, external_id, category='', restart=False):
+        """The entry for ``external_id``; ``restart`` discards earlier progress"""
+        entry, created = self.entries().get_or_create(
+            external_id=str(external_id), defaults={'category': category}
+        )
+        if restart and not created and entry.stage != 'done':
+            entry.stage, entry.meal_data, entry.parsed, entry.recipe = 'pending', None, None, None
+            entry.category = category or entry.category
+            entry.save()
+        return entry
+
+    def advance(self, entry, stage, **fields):
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        entry.stage, entry.failed_stage, entry.error = stage, '', ''
+        entry.save()
+
+    def fail(self, entry, stage, error):
+        entry.failed_stage, entry.error = stage, str(error)[:2000]
+        entry.attempts += 1
+        entry.save(update_fields=['failed_stage', 'error', 'attempts', 'updated_at'])
+
+    def fetched(self, entry, meal_data):
+        if meal_data:
+            self.advance(entry, 'fetched', meal_data=meal_data, title=meal_data.get('strMeal', ''))
+        else:
+            self.fail(entry, 'fetched', 'Meal not found or fetch failed')
+
+    def _attempt(self, entry, stage, func):
+        """Run one stage of ``entry``, recording a failure instead of raising"""
+        try:
+            func()
+        except Exception as e:
+            logger.warning(f'Import of {self.source}:{entry.external_id} failed at {stage}: {e}')
+            self.fail(entry, stage, e)
+
+    def save_batch(self, entries, save_many):
+        """
+        Save parsed ``entries`` with one ``save_many(items)`` call, where
+        items are ``(meal_data, parsed)`` pairs and the result the saved
+        recipes in order. Recipes and journal updates share a transaction;
+        if the batch fails, each entry is retried alone so one bad record
+        only fails itself.
+        """
+        if not entries:
+            return
+        try:
+            with transaction.atomic():
+                recipes = save_many([(entry.meal_data, entry.parsed) for entry in entries])
+                for entry, recipe in zip(entries, recipes):
+                    self.advance(entry, 'saved', recipe=recipe)
+        except Exception as e:
+            # The rollback doesn't reach the in-memory entries; rewind them
+            for entry in entries:
+                entry.stage, entry.recipe = 'parsed', None
+            if len(entries) > 1:
+                for entry in entries:
+                    self.save_batch([entry], save_many)
+            else:
+                logger.warning(f'Import of {self.source}:{entries[0].external_id} failed at saved: {e}')
+                self.fail(entries[0], 'saved', e)
+
+    def run(self, entries, fetch_many, parse, save_many, prepare=None):
+        """
+        Take ``entries`` up to the saved stage, yielding ``(entry, recipe)``
+        in order; ``recipe`` is set for every saved entry. Images come
+        last and are reported with ``finish()``, once they are attached.
+
+        Entries without meal data are fetched through ``fetch_many(ids)``,
+        which must yield a record (or ``None``) per id in order. ``parse``
+        turns a record into JSON-serialisable data and the parsed entries
+        are then written together by ``save_batch``. ``prepare(records)``,
+        if given, sees every record about to be parsed first, so work
+        that is cheaper in bulk can be done once for the whole batch.
+        """
+        entries = list(entries)
+        fetched = fetch_many([entry.external_id for entry in entries if entry.stage == 'pending'])
+        for entry in entries:
+            if entry.stage == 'pending':
+                self.fetched(entry, next(fetched))
+            if entry.stage in ('saved', 'done') and entry.recipe_id is None:
+                # The recipe was deleted since; build it again from the parsed data
+                entry.stage = 'parsed'
+
+        if prepare:
+            try:
+                prepare([entry.meal_data for entry in entries if entry.stage == 'fetched'])
+            except Exception as e:
+                # parse() is still expected to cope with whatever prepare didn't do
+                logger.warning(f'Preparing {self.source} records for parsing failed: {e}')
+
+        for entry in entries:
+            if entry.stage == 'fetched':
+                self._attempt(entry, 'parsed', lambda: self.advance(entry, 'parsed', parsed=parse(entry.meal_data)))
+
+        self.save_batch([entry for entry in entries if entry.stage == 'parsed'], save_many)
+
+        for entry in entries:
+            yield entry, entry.recipe if _reached(entry, 'saved') else None
+
+    def finish(self, entry, error=None):
+        """Mark a saved entry done, or record why its images failed"""
+        if error is None:
+            self.advance(entry, 'done')
+        else:
+            logger.warning(f'Import of {self.source}:{entry.external_id} failed at done: {error}')
+            self.fail(entry, 'done', error)
+
+    def summary(self):
+        """``{stage: count}`` plus the number of entries with an error"""
+        counts = {stage: 0 for stage in STAGES}
+        for stage in self.entries().values_list('stage', flat=True):
+            counts[stage] += 1
+        counts['failed'] = self.entries().exclude(error='').count()
+        return counts
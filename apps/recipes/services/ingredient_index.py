@@ -0,0 +1,244 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+import numpy as np
+
+from apps.recipes.models import Ingredient, Recipe, RecipeIngredient
+
+VERSION_KEY = 'recipes:ingredient_index_version'
+DEFAULT_LIMIT = 20
+
+# How long a process trusts its copy before looking for changed recipes
+REFRESH_INTERVAL = 2.0
+
+# Re-read a little before the watermark so rows committed late by a slow
+# transaction (timestamped before our last refresh) are not missed
+WATERMARK_OVERLAP = timedelta(seconds=30)
+
+
+class IngredientIndex:
+    """
+    Inverted index from ingredient id to a sorted ``array('i')`` of dense
+    recipe slots, plus the forward recipe -> ingredient ids map used to
+    report what is missing.
+
+    Slots are positions in ``recipe_ids``; they keep the posting arrays
+    compact and let coverage be counted with a single ``np.bincount``.
+    Per-slot totals, visibility and ids are mirrored into numpy columns
+    so a search ranks without visiting hits one by one in Python.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.recipe_ids = []
+        self.slots = {}
+        self.recipe_ingredients = []
+        self.visibility = []
+        self.ingredient_names = {}
+        self.name_lookup = {}
+        self.watermark = None
+        # numpy mirrors of recipe_ingredients lengths, visibility and recipe_ids
+        self.totals = np.zeros(0, dtype=np.intc)
+        self.public = np.zeros(0, dtype=bool)
+        self.authors = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.slots)
+
+    # Building -----------------------------------------------------------
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        index.watermark = timezone.now()
+        index._load_names()
+        recipes = Recipe.objects.order_by().values_list('id', 'is_public', 'author_id')
+        index._apply(recipes, cls._ingredient_rows(None))
+        return index
+
+    def refresh(self):
+        """Re-read recipes touched since the last build/refresh; returns how many"""
+        since, self.watermark = self.watermark - WATERMARK_OVERLAP, timezone.now()
+        changed = Recipe.objects.filter(
+            Q(updated_at__gte=since) | Q(related_updated_at__gte=since)
+        ).order_by().values_list('id', 'is_public', 'author_id')
+        changed = list(changed)
+        if changed:
+            self._load_names()
+            self._apply(changed, self._ingredient_rows([pk for pk, _, _ in changed]))
+        return len(changed)
+
+    @staticmethod
+    def _ingredient_rows(recipe_ids):
+        rows = RecipeIngredient.objects.order_by()
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+        return rows.values_list('recipe_id', 'ingredient_id').iterator(chunk_size=5000)
+
+    def _load_names(self):
+        self.ingredient_names = dict(Ingredient.objects.values_list('id', 'name'))
+        # Imported data has case variants ("Rice"/"rice") of the same ingredient
+        self.name_lookup = {}
+        for pk, name in self.ingredient_names.items():
+            self.name_lookup.setdefault(name.strip().lower(), set()).add(pk)
+
+    def _apply(self, recipes, ingredient_rows):
+        by_recipe = {}
+        for recipe_id, ingredient_id in ingredient_rows:
+            by_recipe.setdefault(recipe_id, set()).add(ingredient_id)
+
+        touched = []
+        for recipe_id, is_public, author_id in recipes:
+            slot = self.slots.get(recipe_id)
+            if slot is None:
+                slot = self.slots[recipe_id] = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+                self.recipe_ingredients.append(array('i'))
+                self.visibility.append((is_public, author_id))
+            else:
+                self.visibility[slot] = (is_public, author_id)
+
+            old = set(self.recipe_ingredients[slot])
+            new = by_recipe.get(recipe_id, set())
+            for ingredient_id in old - new:
+                posting = self.postings[ingredient_id]
+                del posting[bisect_left(posting, slot)]
+            for ingredient_id in new - old:
+                insort(self.postings.setdefault(ingredient_id, array('i')), slot)
+            self.recipe_ingredients[slot] = array('i', sorted(new))
+            touched.append(slot)
+        self._sync_columns(touched)
+
+    def _sync_columns(self, slots):
+        """Copy the given slots (and any new ones) into the numpy columns"""
+        grow = len(self.recipe_ids) - len(self.ids)
+        if grow:
+            self.totals = np.concatenate([self.totals, np.zeros(grow, dtype=np.intc)])
+            self.public = np.concatenate([self.public, np.zeros(grow, dtype=bool)])
+            self.authors = np.concatenate([self.authors, np.zeros(grow, dtype=np.int64)])
+            self.ids = np.concatenate([self.ids, np.zeros(grow, dtype=np.int64)])
+        if not slots:
+            return
+        slots = np.array(slots, dtype=np.intp)
+        self.totals[slots] = [len(self.recipe_ingredients[slot]) for slot in slots.tolist()]
+        self.public[slots] = [self.visibility[slot][0] for slot in slots.tolist()]
+        self.authors[slots] = [self.visibility[slot][1] for slot in slots.tolist()]
+        self.ids[slots] = [self.recipe_ids[slot] for slot in slots.tolist()]
+
+    # Querying -----------------------------------------------------------
+
+    def resolve(self, names):
+        """Map free-text ingredient names to ingredient ids (exact, else substring)"""
+        ingredient_ids = set()
+        for name in names:
+            name = name.strip().lower()
+            if not name:
+                continue
+            if name in self.name_lookup:
+                ingredient_ids.update(self.name_lookup[name])
+            else:
+                for key, pks in self.name_lookup.items():
+                    if name in key:
+                        ingredient_ids.update(pks)
+        return ingredient_ids
+
+    def _coverage(self, ingredient_ids):
+        """Matched ingredient count per slot (0 for recipes using none of them)"""
+        postings = [self.postings[pk] for pk in ingredient_ids if self.postings.get(pk)]
+        if not postings:
+            return np.zeros(len(self.recipe_ids), dtype=np.intp)
+        slots = np.concatenate([np.frombuffer(posting, dtype=np.intc) for posting in postings])
+        return np.bincount(slots, minlength=len(self.recipe_ids))
+
+    def search(self, ingredient_ids, user_id=None, limit=DEFAULT_LIMIT):
+        """
+        Top ``limit`` visible recipes ranked by coverage (share of their
+        ingredients the user has), then by number of matched ingredients,
+        then by recipe id.
+        """
+        ingredient_ids = set(ingredient_ids)
+        counts = self._coverage(ingredient_ids)
+        visible = self.public if user_id is None else self.public | (self.authors == user_id)
+        candidates = np.flatnonzero((counts > 0) & visible)
+        matched = counts[candidates]
+        coverage = matched / self.totals[candidates]
+
+        if len(candidates) > limit > 0:
+            # Everything tied with the limit-th best coverage stays in for the tie-breaks
+            threshold = coverage[np.argpartition(-coverage, limit - 1)[limit - 1]]
+            keep = coverage >= threshold
+            candidates, matched, coverage = candidates[keep], matched[keep], coverage[keep]
+        order = np.lexsort((self.ids[candidates], -matched, -coverage))[:limit]
+
+        results = []
+        for slot, slot_matched, slot_coverage in zip(
+            candidates[order].tolist(), matched[order].tolist(), coverage[order].tolist()
+        ):
+            missing = [pk for pk in self.recipe_ingredients[slot] if pk not in ingredient_ids]
+            results.append({
+                'recipe_id': self.recipe_ids[slot],
+                'coverage': slot_coverage,
+                'matched': slot_matched,
+                'total': len(self.recipe_ingredients[slot]),
+                'missing': sorted(self.ingredient_names.get(pk, '') for pk in missing),
+            })
+        return results
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_lock = threading.RLock()
+
+
+def bump_version():
+    """Force every process to rebuild (used for deletions, which refresh() can't see)"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_index():
+    """Per-process index: rebuilt on version change, otherwise patched incrementally"""
+    global _index, _index_version, _checked_at
+
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < REFRESH_INTERVAL:
+        return _index
+
+    with _lock:
+        version = _current_version()
+        if _index is None or version != _index_version:
+            _index = IngredientIndex.build()
+            _index_version = version
+        else:
+            _index.refresh()
+        _checked_at = now
+    return _index
+
+
+def find_recipes(ingredient_names, user=None, limit=DEFAULT_LIMIT):
+    """Resolve names and rank recipes; returns (results, matched ingredient names)"""
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    # Posting arrays are patched in place by refresh(); don't read them mid-update
+    with _lock:
+        index = get_index()
+        ingredient_ids = index.resolve(ingredient_names)
+        results = index.search(ingredient_ids, user_id=user_id, limit=limit)
+        return results, sorted(index.ingredient_names[pk] for pk in ingredient_ids)
@@ -0,0 +1,175 @@
+import re
+
+MIN_STEP_LENGTH = 10
+MAX_STEP_LENGTH = 500
+WORDS_PER_CHUNK = 30
+
+# Split strategies, tried in order until one yields more than one part
+_NUMBERED_SPLITS = [
+    re.compile(r'^\s*(\d+)\.', re.MULTILINE),  # "1." at the start of a line
+    re.compile(r'(\d+)\.\s'),                  # "1. " anywhere
+    re.compile(r'step (\d+):?', re.IGNORECASE),
+]
+_LOOSE_SPLITS = [
+    re.compile(r'\n-\s'),             # "- " bullets
+    re.compile(r'\n\n'),              # paragraphs
+]
+_SENTENCE_SPLIT = re.compile(r'\.\s+(?=[A-Z])')
+_STEP_PREFIX = re.compile(r'^(?:\d+\.\s*)?(?:step\s*\d+:?\s*)?', re.IGNORECASE)
+
+# Explicit durations; any hours mention wins over minutes
+_DURATION = re.compile(r'(\d+)\s*(?:(hours?|hrs?)|minutes?|mins?)\b', re.IGNORECASE)
+
+# Time classes by priority: (name, step type, minutes, keyword stems)
+TIME_CLASSES = [
+    ('cook', 'cook', 20, ['bak', 'roast', 'cook', 'simmer', 'boil']),
+    ('fry', 'cook', 8, ['fry', 'fried', 'fries', 'saut', 'brown', 'sear']),
+    ('mix', 'mix', 3, ['mix', 'stir', 'combin', 'whisk', 'beat']),
+    ('chop', 'prep', 5, ['chop', 'dice', 'dicing', 'slic', 'cut', 'prepar']),
+    ('chill', 'wait', 15, ['chill', 'cool', 'rest', 'sit', 'refrigerat']),
+]
+_CLASS_BY_STEM = {
+    stem: priority for priority, (_, _, _, stems) in enumerate(TIME_CLASSES) for stem in stems
+}
+
+
+def _trie_pattern(words):
+    """
+    Regex alternation with shared prefixes factored out ("c(?:hop|ook)"),
+    which the backtracking engine tries far faster than a flat "a|b|c".
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return build(trie)
+
+
+# Every stem in one pass over the lowercased step, matched at word starts only
+_KEYWORDS = re.compile(r'(?<![a-z])(' + _trie_pattern(_CLASS_BY_STEM) + ')')
+
+
+def _split_numbered(pattern, text):
+    """Parts between step numbers, if the numbers found count up one by one"""
+    matches = list(pattern.finditer(text))
+    numbers = [int(match.group(1)) for match in matches]
+    # "Gas 4. Bake ..." must not pass for a step marker
+    if len(matches) < 2 or any(b != a + 1 for a, b in zip(numbers, numbers[1:])):
+        return None
+
+    parts = [
+        text[match.end():matches[i + 1].start() if i + 1 < len(matches) else len(text)].strip()
+        for i, match in enumerate(matches)
+    ]
+    # A short leading part is a title or intro, not a step
+    intro = text[:matches[0].start()].strip()
+    if len(intro) >= 50:
+        parts.insert(0, intro)
+    return [part for part in parts if part]
+
+
+def _split(text):
+    for pattern in _NUMBERED_SPLITS:
+        parts = _split_numbered(pattern, text)
+        if parts and len(parts) > 1:
+            return parts
+
+    for pattern in _LOOSE_SPLITS:
+        parts = [part.strip() for part in pattern.split(text) if part.strip()]
+        if len(parts) > 1:
+            return parts
+
+    sentences = _SENTENCE_SPLIT.split(text)
+    if len(sentences) > 3:
+        parts = [sentence.strip().rstrip('.') + '.' for sentence in sentences if len(sentence.strip()) > 20]
+        if len(parts) > 1:
+            return parts
+
+    words = text.split()
+    return [' '.join(words[i:i + WORDS_PER_CHUNK]) for i in range(0, len(words), WORDS_PER_CHUNK)]
+
+
+def split_steps(instructions):
+    """Split free-form instructions into step texts of a sensible length"""
+    if not instructions:
+        return []
+    text = instructions.replace('\r\n', '\n').strip()
+
+    steps = []
+    for part in _split(text):
+        part = _STEP_PREFIX.sub('', part, count=1).strip()
+        if MIN_STEP_LENGTH <= len(part) <= MAX_STEP_LENGTH:
+            steps.append(part)
+    if not steps and text:
+        steps = [text[:MAX_STEP_LENGTH] + '...' if len(text) > MAX_STEP_LENGTH else text]
+    return steps
+
+
+def classify_step(text):
+    """``(time class, step type, minutes)`` of the highest priority keyword, or ``None``"""
+    best = None
+    for match in _KEYWORDS.finditer(text.lower()):
+        priority = _CLASS_BY_STEM[match.group(1)]
+        if best is None or priority < best:
+            best = priority
+            if priority == 0:
+                break
+    if best is None:
+        return None
+    name, step_type, minutes, _ = TIME_CLASSES[best]
+    return name, step_type, minutes
+
+
+def _estimate(text, number, total, time_class):
+    minutes = None
+    for match in _DURATION.finditer(text):
+        if match.group(2):
+            return int(match.group(1)) * 60
+        if minutes is None:
+            minutes = int(match.group(1))
+    if minutes is not None:
+        return minutes
+
+    if time_class:
+        return time_class[2]
+    if number == 1:
+        return 10
+    return 5 if number == total else 7
+
+
+def estimate_step_time(text, number, total):
+    """Minutes for a step: an explicit duration, else its time class, else its position"""
+    return _estimate(text, number, total, classify_step(text))
+
+
+def parse_instructions(instructions, max_steps=None):
+    """
+    Structured steps as ``{'number', 'text', 'time_minutes', 'type'}``
+    dicts, the shape the GPT step analyzer returns.
+    """
+    texts = split_steps(instructions)[:max_steps]
+    steps = []
+    for number, text in enumerate(texts, start=1):
+        time_class = classify_step(text)
+        steps.append({
+            'number': number,
+            'text': text,
+            'time_minutes': _estimate(text, number, len(texts), time_class),
+            'type': time_class[1] if time_class else 'prep',
+        })
+    return steps
+
+
+def parse_instructions_batch(instructions_list, max_steps=None):
+    """``parse_instructions`` over many recipes, in input order"""
+    return [parse_instructions(instructions, max_steps) for instructions in instructions_list]
@@ -0,0 +1,347 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = 'https://www.themealdb.com/api/json/v1/1/'
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+# Responses worth another try; anything else 4xx is final
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+CACHE_MODES = ('off', 'record', 'replay')
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` tokens per second, at most ``burst``
+    banked. ``acquire()`` blocks until a token is available.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header, if any"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheMiss(requests.RequestException):
+    """A replay-mode request that was never recorded"""
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk store of successful GET responses.
+
+    ``keys/`` holds a small JSON entry per URL (status, headers, fetch
+    time, body digest); bodies are stored once under ``objects/`` by the
+    SHA-256 of their content, so the same image behind two URLs takes
+    disk space once. Files are written to a temporary name and renamed,
+    so concurrent workers and interrupted runs never leave partial entries.
+
+    In ``record`` mode entries older than ``max_age`` seconds count as
+    missing and are fetched again; ``replay`` serves whatever was
+    recorded, however old, and never touches the network.
+    """
+
+    def __init__(self, directory, mode='record', max_age=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f'Unknown cache mode: {mode}')
+        self.directory = Path(directory)
+        self.mode = mode
+        self.max_age = max_age
+
+    @staticmethod
+    def key(url, params=None):
+        params = sorted(params.items()) if isinstance(params, dict) else params
+        prepared = requests.Request('GET', url, params=params).prepare()
+        return hashlib.sha256(prepared.url.encode()).hexdigest()
+
+    def _path(self, kind, digest):
+        return self.directory / kind / digest[:2] / digest
+
+    def _expired(self, entry):
+        return self.max_age is not None and time.time() - entry['fetched_at'] > self.max_age
+
+    def _entry(self, url, params=None):
+        try:
+            entry = json.loads(self._path('keys', self.key(url, params)).read_bytes())
+        except (OSError, ValueError):
+            return None
+        if 'body' not in entry or (self.mode == 'record' and self._expired(entry)):
+            return None
+        return entry
+
+    def load(self, url, params=None):
+        """The recorded response, or ``None`` if missing or (when recording) expired"""
+        entry = self._entry(url, params)
+        if entry is None:
+            return None
+        try:
+            body = self._path('objects', entry['body']).read_bytes()
+        except OSError:
+            return None
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry.get('encoding')
+        response.url = entry['url']
+        response._content = body
+        return response
+
+    def open(self, url, params=None):
+        """The recorded body as an open binary file, for copying without loading it"""
+        entry = self._entry(url, params)
+        if entry is None:
+            return None
+        try:
+            return self._path('objects', entry['body']).open('rb')
+        except OSError:
+            return None
+
+    def store(self, url, params, response, body=None, digest=None):
+        """
+        Record ``response``. A streamed body is passed as a readable
+        file in ``body`` with its SHA-256 hex ``digest``.
+        """
+        if body is None:
+            body = response.content
+            digest = hashlib.sha256(body).hexdigest()
+        path = self._path('objects', digest)
+        if not path.exists():
+            self._write(path, body)
+        self._write(self._path('keys', self.key(url, params)), json.dumps({
+            'url': response.url,
+            'status': response.status_code,
+            'headers': {name: value for name, value in response.headers.items() if name.lower() == 'content-type'},
+            'encoding': response.encoding,
+            'fetched_at': time.time(),
+            'body': digest,
+        }).encode())
+
+    @staticmethod
+    def _write(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def prune(self):
+        """Delete expired entries and the bodies no entry refers to; returns the files removed"""
+        removed, live = 0, set()
+        for path in self.directory.glob('keys/*/*'):
+            try:
+                entry = json.loads(path.read_bytes())
+                if not self._expired(entry):
+                    live.add(entry['body'])
+                    continue
+            except (OSError, ValueError, KeyError):
+                pass
+            path.unlink(missing_ok=True)
+            removed += 1
+        for path in self.directory.glob('objects/*/*'):
+            if path.name not in live:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class MealDBClient:
+    """
+    TheMealDB client shared by the import commands.
+
+    All requests go through one pooled ``requests.Session`` (keep-alive
+    connections instead of a new TCP/TLS handshake per call), a token
+    bucket that caps the request rate across threads, and retries with
+    exponential backoff and jitter for connection errors and 429/5xx.
+    ``map`` fans calls out over a bounded thread pool. With a
+    ``cache_mode`` other than ``'off'``, responses go through a
+    ``ResponseCache`` first; cache hits skip the rate limit.
+    """
+
+    def __init__(self, base_url=None, rate=None, workers=None, retries=3, backoff=0.5, timeout=10,
+                 cache_mode=None, cache_dir=None, cache_max_age=None):
+        self.base_url = base_url or getattr(settings, 'MEALDB_API_URL', DEFAULT_API_URL)
+        if not self.base_url.endswith('/'):
+            self.base_url += '/'
+        self.workers = workers or getattr(settings, 'MEALDB_WORKERS', 8)
+        rate = getattr(settings, 'MEALDB_RATE_LIMIT', 5.0) if rate is None else rate
+        self.limiter = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        cache_mode = cache_mode or getattr(settings, 'MEALDB_CACHE_MODE', 'off')
+        if cache_mode not in CACHE_MODES:
+            raise ValueError(f'Unknown cache mode: {cache_mode}')
+        self.cache = None
+        if cache_mode != 'off':
+            self.cache = ResponseCache(
+                cache_dir or settings.MEALDB_CACHE_DIR,
+                cache_mode,
+                getattr(settings, 'MEALDB_CACHE_MAX_AGE', None) if cache_max_age is None else cache_max_age,
+            )
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='mealdb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def get(self, url, params=None, timeout=None):
+        """Rate-limited GET with retries; raises ``requests.RequestException`` once they run out"""
+        url = urljoin(self.base_url, url)
+        if self.cache:
+            response = self.cache.load(url, params)
+            if response is not None:
+                return response
+            self._check_replay(url, params)
+
+        response = self._fetch(url, params, timeout)
+        if self.cache:
+            self.cache.store(url, params, response)
+        return response
+
+    def _check_replay(self, url, params=None):
+        if self.cache.mode == 'replay':
+            raise CacheMiss(f'Not recorded: {url} {params or ""}'.strip())
+
+    def _fetch(self, url, params=None, timeout=None, stream=False):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            try:
+                response = self.session.get(url, params=params, timeout=timeout or self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    if not response.ok:
+                        response.close()
+                    response.raise_for_status()
+                    return response
+                response.close()
+                delay = max(delay, _retry_after(response) or 0)
+            logger.info(f'Retrying {url} in {delay:.1f}s (attempt {attempt + 1} of {self.retries})')
+            time.sleep(delay)
+
+    def get_json(self, path, params=None):
+        return self.get(path, params=params).json()
+
+    def map(self, func, items):
+        """``func`` over ``items`` on the thread pool; results (or exceptions) in input order"""
+        futures = [self.executor.submit(func, item) for item in items]
+        for future in futures:
+            try:
+                yield future.result(), None
+            except Exception as e:
+                yield None, e
+
+    # API calls --------------------------------------------------------------
+
+    def filter_by_category(self, category):
+        """Summary rows (``idMeal``, ``strMeal``, ``strMealThumb``) of a category"""
+        return self.get_json('filter.php', {'c': category}).get('meals') or []
+
+    def lookup(self, meal_id):
+        """Full meal record, or ``None`` if the id is unknown"""
+        meals = self.get_json('lookup.php', {'i': meal_id}).get('meals') or []
+        return meals[0] if meals else None
+
+    def download(self, url, timeout=30):
+        return self.get(url, timeout=timeout).content
+
+    def download_to(self, url, fileobj, timeout=30, chunk_size=64 * 1024):
+        """
+        Stream ``url`` into ``fileobj`` (binary, readable and seekable, e.g.
+        opened with ``'w+b'``) in chunks, so large bodies are never held in
+        memory; returns the bytes written.
+        """
+        url = urljoin(self.base_url, url)
+        if self.cache:
+            cached = self.cache.open(url)
+            if cached is not None:
+                with cached:
+                    shutil.copyfileobj(cached, fileobj, chunk_size)
+                return fileobj.tell()
+            self._check_replay(url)
+
+        start, digest = fileobj.tell(), hashlib.sha256()
+        with self._fetch(url, timeout=timeout, stream=True) as response:
+            for chunk in response.iter_content(chunk_size):
+                fileobj.write(chunk)
+                digest.update(chunk)
+        size = fileobj.tell() - start
+        if self.cache:
+            fileobj.seek(start)
+            self.cache.store(url, None, response, body=fileobj, digest=digest.hexdigest())
+            fileobj.seek(start + size)
+        return size
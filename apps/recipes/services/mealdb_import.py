@@ -0,0 +1,335 @@
+import hashlib
+import logging
+import os
+from collections import Counter
+
+from django.core.files import File
+
+from apps.recipes.models import Category, Recipe, Unit
+from apps.recipes.services.catalogue import CatalogueImporter
+from apps.recipes.services.image_import import MAIN_IMAGE_BOX, ImagePipeline
+from apps.recipes.services.import_journal import ImportJournal
+from apps.recipes.services.instructions import parse_instructions
+from apps.recipes.services.measures import parse_measures
+from apps.recipes.services.mealdb import MealDBClient
+
+logger = logging.getLogger(__name__)
+
+# TheMealDB categories, in the order their listings are imported
+CATEGORIES = [
+    'Beef', 'Chicken', 'Dessert', 'Lamb', 'Miscellaneous',
+    'Pasta', 'Pork', 'Seafood', 'Side', 'Starter',
+    'Vegan', 'Vegetarian', 'Breakfast', 'Goat',
+]
+
+DEFAULT_UNITS = [
+    ('cup', 'cup', 'volume'),
+    ('tablespoon', 'tbsp', 'volume'),
+    ('teaspoon', 'tsp', 'volume'),
+    ('pound', 'lb', 'weight'),
+    ('ounce', 'oz', 'weight'),
+    ('gram', 'g', 'weight'),
+    ('kilogram', 'kg', 'weight'),
+    ('liter', 'l', 'volume'),
+    ('milliliter', 'ml', 'volume'),
+    ('piece', 'pc', 'count'),
+    ('clove', 'clove', 'count'),
+    ('pinch', 'pinch', 'count'),
+    ('slice', 'slice', 'count'),
+    ('can', 'can', 'count'),
+    ('package', 'pkg', 'count'),
+    ('bottle', 'bottle', 'count'),
+    ('jar', 'jar', 'count'),
+    ('bunch', 'bunch', 'count'),
+    ('sprig', 'sprig', 'count'),
+    ('dash', 'dash', 'count'),
+]
+
+DEFAULT_CATEGORIES = [
+    ('Beef', 'Main dishes with beef', '🥩', '#dc3545'),
+    ('Chicken', 'Chicken-based dishes', '🐔', '#28a745'),
+    ('Dessert', 'Sweet treats and desserts', '🍰', '#ffc107'),
+    ('Lamb', 'Lamb and mutton dishes', '🐑', '#6f42c1'),
+    ('Miscellaneous', 'Various other dishes', '🍽️', '#6c757d'),
+    ('Pasta', 'Pasta dishes', '🍝', '#fd7e14'),
+    ('Pork', 'Pork-based dishes', '🐷', '#e83e8c'),
+    ('Seafood', 'Fish and seafood', '🐟', '#20c997'),
+    ('Side', 'Side dishes', '🥗', '#17a2b8'),
+    ('Starter', 'Appetizers and starters', '🥙', '#007bff'),
+    ('Vegan', 'Plant-based dishes', '🌱', '#28a745'),
+    ('Vegetarian', 'Vegetarian dishes', '🥕', '#ffc107'),
+    ('Breakfast', 'Morning meals', '🍳', '#fd7e14'),
+    ('Goat', 'Goat meat dishes', '🐐', '#6f42c1'),
+]
+
+
+def _log(message, level=None):
+    logger.log(logging.WARNING if level in ('WARNING', 'ERROR') else logging.INFO, message)
+
+
+class MealDBImport:
+    """
+    One run of a TheMealDB import.
+
+    Category listings are fetched concurrently, then meals are taken through
+    the import journal's fetch/parse/save stages in batches and their images
+    handed to the ``ImagePipeline``. Subclasses change how a meal is parsed
+    (``parse_meal``), the catalogue record built from it (``meal_record``),
+    or prepare each batch before parsing (``prepare``).
+
+    Progress is reported through ``log(message, level)``, where level is
+    ``None`` or a ``django.core.management.color`` style name such as
+    ``'WARNING'``; it defaults to the module logger.
+    """
+
+    def __init__(self, author, recipes_count=100, resume=False, skip_images=False, image_workers=None,
+                 client_options=None, log=None):
+        self.author = author
+        self.recipes_count = recipes_count
+        self.resume = resume
+        self.skip_images = skip_images
+        self.image_workers = image_workers
+        self.client_options = client_options or {}
+        self.log = log or _log
+        self.journal = ImportJournal()
+        self.client = None
+        self.images = None
+        self.writer = None
+
+    def create_defaults(self):
+        """Units and categories every import relies on"""
+        for name, abbrev, unit_type in DEFAULT_UNITS:
+            Unit.objects.get_or_create(name=name, defaults={'abbreviation': abbrev, 'unit_type': unit_type})
+        self.log('Created default units')
+        for name, desc, icon, color in DEFAULT_CATEGORIES:
+            Category.objects.get_or_create(name=name, defaults={'description': desc, 'icon': icon, 'color': color})
+        self.log('Created default categories')
+
+    def run(self):
+        """Import up to ``recipes_count`` recipes spread over the categories; returns them"""
+        # Recipes are written in batches, resolving names through cached lookups
+        self.writer = CatalogueImporter(default_author=self.author)
+        self.writer.preload()
+
+        imported_recipes = []
+        recipes_per_category = max(1, self.recipes_count // len(CATEGORIES))
+        category_counts = Counter()
+        attempted = set()
+
+        with MealDBClient(**self.client_options) as self.client, \
+                ImagePipeline(self.client, processes=self.image_workers) as self.images:
+            # Finish what an interrupted run left behind, from its last completed stage
+            if self.resume:
+                pending = list(self.journal.pending())
+                self.log(f'Resuming {len(pending)} unfinished imports from the journal')
+                for entry, recipe in self.import_meals(pending):
+                    attempted.add(entry.external_id)
+                    if recipe:
+                        imported_recipes.append(recipe)
+                        category_counts[entry.category] += 1
+
+            # Category listings are fetched concurrently, consumed in order
+            listings = self.client.map(self.get_recipes_by_category, CATEGORIES)
+            for category, (meals, _) in zip(CATEGORIES, listings):
+                if len(imported_recipes) >= self.recipes_count:
+                    break
+                self.log(f'Importing recipes from category: {category}')
+
+                # Skip known meals with two bulk lookups: by TheMealDB id, and by
+                # title for recipes imported before ids were recorded
+                done = self.journal.completed_ids(meal['idMeal'] for meal in meals)
+                existing = set(Recipe.objects.filter(
+                    title__in=[meal['strMeal'] for meal in meals]
+                ).values_list('title', flat=True))
+                candidates = []
+                for meal in meals:
+                    if meal['idMeal'] in done or meal['strMeal'] in existing:
+                        self.log(f'Recipe "{meal["strMeal"]}" already exists, skipping...')
+                    elif meal['idMeal'] not in attempted:
+                        candidates.append(meal)
+
+                while candidates and category_counts[category] < recipes_per_category \
+                        and len(imported_recipes) < self.recipes_count:
+                    # Fetch just enough details in parallel; failures pull in the next candidates
+                    wanted = min(recipes_per_category - category_counts[category],
+                                 self.recipes_count - len(imported_recipes))
+                    batch, candidates = candidates[:wanted], candidates[wanted:]
+                    entries = [
+                        self.journal.start(meal['idMeal'], category, restart=not self.resume)
+                        for meal in batch
+                    ]
+                    for entry, recipe in self.import_meals(entries):
+                        attempted.add(entry.external_id)
+                        if recipe:
+                            imported_recipes.append(recipe)
+                            category_counts[category] += 1
+
+            # Images still being processed are attached before the pipeline closes
+            self.attach_images(wait=True)
+
+            # Recording keeps refreshed copies; drop the expired ones and orphaned bodies
+            if self.client.cache and self.client.cache.mode == 'record':
+                removed = self.client.cache.prune()
+                if removed:
+                    self.log(f'Pruned {removed} expired response cache files')
+
+        summary = self.journal.summary()
+        if summary['failed']:
+            self.log(f'{summary["failed"]} journal entries have errors; rerun with --resume to retry them', 'WARNING')
+        return imported_recipes
+
+    # Fetching -----------------------------------------------------------
+
+    def get_recipes_by_category(self, category):
+        """Get recipes from TheMealDB by category"""
+        try:
+            return self.client.filter_by_category(category)
+        except Exception as e:
+            self.log(f'Error fetching recipes for category {category}: {e}', 'WARNING')
+            return []
+
+    def get_recipe_details(self, meal_id):
+        """Get detailed recipe information"""
+        try:
+            return self.client.lookup(meal_id)
+        except Exception as e:
+            self.log(f'Error fetching recipe details for ID {meal_id}: {e}', 'WARNING')
+            return None
+
+    # Parsing and saving -------------------------------------------------
+
+    def prepare(self, meals):
+        """Called with every meal of a batch about to be parsed; nothing to do by default"""
+
+    def parse_ingredients(self, meal_data):
+        """Parse ingredients from TheMealDB format"""
+        ingredients = []
+        for i in range(1, 21):  # TheMealDB has up to 20 ingredients
+            # The API sends null for unused slots
+            ingredient_name = (meal_data.get(f'strIngredient{i}') or '').strip()
+            measure = (meal_data.get(f'strMeasure{i}') or '').strip()
+            if ingredient_name and ingredient_name.lower() not in ['', 'null']:
+                ingredients.append({'name': ingredient_name, 'measure': measure})
+        return ingredients
+
+    def parse_ingredient_measures(self, ingredients):
+        """Ingredients with the quantity and unit parsed out of their measure"""
+        measures = parse_measures([ing_data['measure'] for ing_data in ingredients])
+        return [
+            dict(ing_data, quantity=quantity, unit=unit_name)
+            for ing_data, (quantity, unit_name) in zip(ingredients, measures)
+        ]
+
+    def parse_meal(self, meal_data):
+        """Parse stage: steps and ingredient measures, kept in the import journal"""
+        return {
+            'steps': parse_instructions(meal_data.get('strInstructions') or ''),
+            'ingredients': self.parse_ingredient_measures(self.parse_ingredients(meal_data)),
+        }
+
+    def meal_record(self, meal_data, parsed):
+        """Catalogue record (the ``export_recipes`` shape) for a parsed TheMealDB meal"""
+        category_name = meal_data.get('strCategory') or 'Miscellaneous'
+        tags = [{'name': meal_data['strArea'], 'color': '#17a2b8'}] if meal_data.get('strArea') else []
+        for tag_name in (meal_data.get('strTags') or '').split(','):
+            if tag_name.strip():
+                tags.append({'name': tag_name.strip(), 'color': '#28a745'})
+        return {
+            'title': meal_data['strMeal'],
+            'description': f"Delicious {meal_data['strMeal']} recipe from {meal_data.get('strArea', 'International')} cuisine.",
+            'instructions': meal_data.get('strInstructions', ''),
+            'prep_time': 15,  # Default prep time
+            'cook_time': 30,  # Default cook time
+            'servings': 4,    # Default servings
+            'difficulty': 'medium',
+            'category': {'name': category_name, 'description': f'{category_name} dishes', 'color': '#6c757d'},
+            'author': self.author.username,
+            'tags': tags,
+            'is_public': True,
+            'featured': False,
+            'mealdb_id': meal_data['idMeal'],
+            'steps': [
+                {'step_number': step['number'], 'instruction': step['text'], 'time_required': step['time_minutes']}
+                for step in parsed['steps']
+            ],
+            'ingredients': [
+                {
+                    'name': ing_data['name'],
+                    'description': f'{ing_data["name"]} ingredient',
+                    'quantity': ing_data['quantity'],
+                    'notes': ing_data['measure'],
+                    'unit': {'name': ing_data['unit'], 'abbreviation': ing_data['unit'][:10], 'unit_type': 'count'},
+                }
+                for ing_data in parsed['ingredients']
+            ],
+        }
+
+    def save_recipes(self, items):
+        """Save stage: write a batch of ``(meal_data, parsed)`` pairs with bulk inserts"""
+        records = [self.meal_record(meal_data, parsed) for meal_data, parsed in items]
+        recipes = self.writer.write_records(records)
+        step_count = sum(len(record['steps']) for record in records)
+        self.log(f'Saved {len(recipes)} recipes with {step_count} steps')
+        return recipes
+
+    def import_meals(self, entries):
+        """Run journal entries through fetch/parse/save, queueing their images; yields ``(entry, recipe)``"""
+        def fetch_many(meal_ids):
+            return (meal for meal, _ in self.client.map(self.get_recipe_details, meal_ids))
+
+        for entry, recipe in self.journal.run(
+            entries, fetch_many, self.parse_meal, self.save_recipes, prepare=self.prepare
+        ):
+            if entry.error:
+                self.log(
+                    f'Error importing {entry.title or entry.external_id} ({entry.failed_stage}): {entry.error}',
+                    'ERROR',
+                )
+            if recipe:
+                # The journal keeps the parsed steps, so no query per recipe
+                step_count = len(entry.parsed['steps'])
+                self.log(f'✓ Imported: {recipe.title} ({step_count} steps)')
+                if entry.stage == 'saved':
+                    self.queue_image(entry)
+            yield entry, recipe
+        # Attach whatever finished meanwhile; the rest lands during later batches
+        self.attach_images()
+
+    # Images -------------------------------------------------------------
+
+    def image_filename(self, image_url, recipe_title, is_step_image=False):
+        """Unique, filesystem-safe name for an imported image"""
+        safe_title = "".join(c for c in recipe_title if c.isalnum() or c in (' ', '-', '_')).strip()
+        safe_title = safe_title.replace(' ', '_')[:50]
+        # Add hash to ensure uniqueness
+        url_hash = hashlib.md5(image_url.encode()).hexdigest()[:8]
+        prefix = "step_" if is_step_image else ""
+        return f"{prefix}{safe_title}_{url_hash}.jpg"
+
+    def queue_image(self, entry):
+        """Hand a saved recipe's main image to the pipeline, or finish the entry if it has none"""
+        image_url = entry.meal_data.get('strMealThumb')
+        if not image_url or self.skip_images:
+            self.journal.finish(entry)
+            return
+        self.log(f'Downloading main image for: {entry.recipe.title}')
+        self.images.submit(entry, image_url, MAIN_IMAGE_BOX)
+
+    def attach_images(self, wait=False):
+        """Save processed images onto their recipes; ``wait`` drains the pipeline"""
+        for entry, path, error in self.images.completed(wait):
+            recipe = entry.recipe
+            if error is None:
+                try:
+                    filename = self.image_filename(entry.meal_data['strMealThumb'], recipe.title)
+                    with open(path, 'rb') as f:
+                        recipe.image.save(filename, File(f), save=True)
+                except Exception as e:
+                    error = e
+                finally:
+                    os.remove(path)
+            if error is None:
+                self.log(f'✓ Main image saved for: {recipe.title}')
+            else:
+                self.log(f'⚠ No main image saved for {recipe.title}: {error}', 'WARNING')
+            self.journal.finish(entry, error)
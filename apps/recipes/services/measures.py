@@ -0,0 +1,122 @@
+import re
+import unicodedata
+
+DEFAULT_QUANTITY = 1
+DEFAULT_UNIT = 'piece'
+
+# Unit names (as created by the import commands) and what they are written as
+UNITS = {
+    'cup': ['cup', 'cups'],
+    'tablespoon': ['tablespoon', 'tablespoons', 'tbsp', 'tbsps', 'tbs', 'tbls', 'tblsp'],
+    'teaspoon': ['teaspoon', 'teaspoons', 'tsp', 'tsps'],
+    'pound': ['pound', 'pounds', 'lb', 'lbs'],
+    'ounce': ['ounce', 'ounces', 'oz'],
+    'gram': ['gram', 'grams', 'gramme', 'grammes', 'g', 'gr'],
+    'kilogram': ['kilogram', 'kilograms', 'kilo', 'kilos', 'kg', 'kgs'],
+    'liter': ['liter', 'liters', 'litre', 'litres', 'l'],
+    'milliliter': ['milliliter', 'milliliters', 'millilitre', 'millilitres', 'ml'],
+    'clove': ['clove', 'cloves'],
+    'pinch': ['pinch', 'pinches'],
+    'slice': ['slice', 'slices'],
+    'can': ['can', 'cans', 'tin', 'tins'],
+    'bottle': ['bottle', 'bottles'],
+    'jar': ['jar', 'jars'],
+    'package': ['package', 'packages', 'packet', 'packets', 'pack', 'packs', 'pkg'],
+    'bunch': ['bunch', 'bunches'],
+    'sprig': ['sprig', 'sprigs'],
+    'dash': ['dash', 'dashes'],
+}
+UNIT_ALIASES = {alias: unit for unit, aliases in UNITS.items() for alias in aliases}
+
+VULGAR_FRACTIONS = {char: unicodedata.numeric(char) for char in '½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅐⅛⅜⅝⅞⅑⅒'}
+
+# Every token a measure is made of, found in one left-to-right pass;
+# anything else (spaces, brackets, other punctuation) separates tokens
+_TOKENS = re.compile(
+    r'(?P<fraction>(?P<num>\d+)\s*[/⁄]\s*(?P<den>\d+))'
+    r'|(?P<number>\d+(?:\.\d+)?|\.\d+)'
+    rf'|(?P<vulgar>[{"".join(VULGAR_FRACTIONS)}])'
+    r'|(?P<dash>[-–—])'
+    r'|(?P<word>[a-z]+)'
+)
+
+
+def _value(match):
+    """Numeric value of a number or fraction token, ``None`` for anything else"""
+    kind = match.lastgroup
+    if kind == 'number':
+        return float(match.group())
+    if kind == 'vulgar':
+        return VULGAR_FRACTIONS[match.group()]
+    if kind == 'fraction':
+        den = int(match.group('den'))
+        return int(match.group('num')) / den if den else None
+    return None
+
+
+def _quantity(tokens, i):
+    """``(value, next index)`` of a quantity starting at ``tokens[i]``: "2", "1/2", "½", "1 1/2", "1½" """
+    value = _value(tokens[i]) if i < len(tokens) else None
+    if value is None:
+        return None, i
+    i += 1
+    # A whole number followed by a fraction is one mixed number
+    if tokens[i - 1].lastgroup == 'number' and i < len(tokens) and tokens[i].lastgroup in ('fraction', 'vulgar'):
+        fraction = _value(tokens[i])
+        if fraction is not None:
+            return value + fraction, i + 1
+    return value, i
+
+
+def parse_measure(measure):
+    """
+    ``(quantity, unit name)`` of a free-text measure such as "1 1/2 cups",
+    "200g", "½ tsp" or "2-3 cloves" (a range counts as its lower bound).
+
+    The quantity must lead the measure; the unit is the first known alias
+    after it, and may be attached to it ("200g"). Measures without either
+    fall back to ``DEFAULT_QUANTITY`` and ``DEFAULT_UNIT``.
+    """
+    if not measure:
+        return DEFAULT_QUANTITY, DEFAULT_UNIT
+    text = measure.lower()
+    tokens = list(_TOKENS.finditer(text))
+
+    quantity, i = _quantity(tokens, 0)
+    if quantity is not None and i + 1 < len(tokens):
+        separator = tokens[i]
+        if separator.lastgroup == 'dash' or (separator.lastgroup == 'word' and separator.group() == 'to'):
+            upper, after = _quantity(tokens, i + 1)
+            if upper is not None:
+                # "2-1/2" is a mixed number written with a dash, not a range
+                if separator.lastgroup == 'dash' and tokens[i + 1].lastgroup == 'fraction' and upper < 1 \
+                        and quantity.is_integer():
+                    quantity += upper
+                i = after
+
+    unit = size = None
+    for k in range(i, len(tokens)):
+        token = tokens[k]
+        if token.lastgroup != 'word' or token.group() not in UNIT_ALIASES:
+            continue
+        start = token.start()
+        if start >= 2 and text[start - 1] == '-' and text[start - 2].isdigit():
+            # "14-ounce can" is a can; the size only counts if nothing follows
+            size = size or UNIT_ALIASES[token.group()]
+        # Only the unit right after the quantity may be glued to a number; "(400g) tin" is a tin
+        elif k == i or start == 0 or not text[start - 1].isdigit():
+            unit = UNIT_ALIASES[token.group()]
+            break
+
+    return (DEFAULT_QUANTITY if quantity is None else quantity), unit or size or DEFAULT_UNIT
+
+
+def parse_measures(measures):
+    """``parse_measure`` over many measures, in input order; repeats are parsed once"""
+    parsed = {}
+    results = []
+    for measure in measures:
+        if measure not in parsed:
+            parsed[measure] = parse_measure(measure)
+        results.append(parsed[measure])
+    return results
@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+from apps.core.db import update_rows
+from apps.recipes.models import Recipe, RecipeIngredient
+from apps.recipes.services.units import UnitConverter
+
+CHUNK_SIZE = 500
+
+
+def compute_calories(recipes, ingredient_rows, converter):
+    """
+    ``{recipe_id: (kcal_total, kcal_per_serving)}`` for ``(id, servings)``
+    recipes from ``(recipe_id, quantity, unit_id, density, kcal_per_100g)``
+    rows. Recipes without any weighable ingredient with calorie data get
+    ``(None, None)``.
+    """
+    rows_by_recipe = defaultdict(list)
+    for recipe_id, *row in ingredient_rows:
+        rows_by_recipe[recipe_id].append(row)
+
+    results = {}
+    for recipe_id, servings in recipes:
+        rows = rows_by_recipe.get(recipe_id, [])
+        kcal, unknown = converter.calories(rows)
+        if unknown == len(rows):
+            results[recipe_id] = (None, None)
+        else:
+            total = round(kcal, 1)
+            results[recipe_id] = (total, round(total / servings, 1) if servings else None)
+    return results
+
+
+def update_nutrition(recipe_ids=None):
+    """
+    Recompute the calorie rollup columns in bulk; ``None`` means every
+    recipe. Recipes whose figures changed get their card version bumped so
+    cached cards show the new calories.
+    """
+    converter = UnitConverter.load()
+    recipes = Recipe.objects.order_by('id')
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=list(recipe_ids))
+
+    updated = 0
+    recipe_rows = list(recipes.values_list('id', 'servings', 'calories_total', 'calories_per_serving'))
+    for start in range(0, len(recipe_rows), CHUNK_SIZE):
+        chunk = recipe_rows[start:start + CHUNK_SIZE]
+        stored = {pk: (total, per_serving) for pk, _, total, per_serving in chunk}
+        ingredient_rows = RecipeIngredient.objects.filter(
+            recipe_id__in=list(stored)
+        ).values_list(
+            'recipe_id', 'quantity', 'unit_id', 'ingredient__density_g_per_ml', 'ingredient__calories_per_100g'
+        )
+        calories = compute_calories([(pk, servings) for pk, servings, _, _ in chunk], ingredient_rows, converter)
+        changed = {pk: values for pk, values in calories.items() if values != stored[pk]}
+        if changed:
+            update_rows(
+                Recipe,
+                ['calories_total', 'calories_per_serving'],
+                [(pk, total, per_serving) for pk, (total, per_serving) in changed.items()],
+            )
+            Recipe.objects.filter(pk__in=list(changed)).bump_card_version()
+        updated += len(calories)
+    return updated
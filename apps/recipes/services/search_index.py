@@ -0,0 +1,131 @@
+import re
+from django.db import connection
+from django.db.models import F, Q, FloatField, Value
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+# bm25() column weights: title, description, instructions, ingredients
+BM25_WEIGHTS = (10.0, 4.0, 1.0, 6.0)
+
+MAX_QUERY_TOKENS = 8
+ID_CHUNK_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+CREATE_TABLE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title, description, instructions, ingredients,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+DROP_TABLE_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+# Makes FTS5's rank column the weighted bm25(), as read by search_recipes
+RANK_SQL = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) "
+    f"VALUES ('rank', 'bm25({', '.join(str(weight) for weight in BM25_WEIGHTS)})')"
+)
+
+# Rows are keyed by rowid = recipe id; ingredient names are flattened into one column
+_SELECT_DOCUMENTS_SQL = """
+SELECT r.id, r.title, r.description, r.instructions,
+       COALESCE((
+           SELECT group_concat(i.name, ' ')
+           FROM recipes_recipeingredient ri
+           JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+           WHERE ri.recipe_id = r.id
+       ), '')
+FROM recipes_recipe r
+"""
+
+
+def is_available():
+    """FTS5 is only wired up for the SQLite backend"""
+    return connection.vendor == 'sqlite'
+
+
+def create_index(cursor):
+    cursor.execute(CREATE_TABLE_SQL)
+    cursor.execute(RANK_SQL)
+
+
+def populate_index(cursor):
+    cursor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, title, description, instructions, ingredients) "
+        f"{_SELECT_DOCUMENTS_SQL}"
+    )
+
+
+def build_match_expression(query: str) -> str:
+    """Turn free user input into a safe FTS5 expression of prefix terms (AND-ed)"""
+    tokens = _TOKEN_RE.findall((query or '').lower())[:MAX_QUERY_TOKENS]
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_recipes(recipe_ids):
+    """(Re)index the given recipes; ids of deleted recipes are simply dropped"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not is_available():
+        return
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), ID_CHUNK_SIZE):
+            chunk = recipe_ids[start:start + ID_CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, instructions, ingredients) "
+                f"{_SELECT_DOCUMENTS_SQL} WHERE r.id IN ({placeholders})",
+                chunk
+            )
+
+
+def remove_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not is_available():
+        return
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), ID_CHUNK_SIZE):
+            chunk = recipe_ids[start:start + ID_CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index():
+    """Drop and repopulate the whole index in a single INSERT ... SELECT"""
+    with connection.cursor() as cursor:
+        create_index(cursor)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        populate_index(cursor)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def search_recipes(queryset, query):
+    """
+    Restrict a Recipe queryset to full-text matches for ``query``.
+
+    The result is annotated with ``search_rank`` (BM25, lower is better) so
+    callers can ``order_by('search_rank')``.
+    """
+    if not is_available():
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(instructions__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    expression = build_match_expression(query)
+    if not expression:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    # Joining the index runs the MATCH once for the whole query
+    return queryset.filter(
+        search_document__document__match=expression
+    ).annotate(
+        search_rank=F('search_document__rank')
+    )
@@ -0,0 +1,163 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+import numpy as np
+from scipy import sparse
+
+from apps.recipes.models import Recipe, RecipeIngredient, RecipeSimilarity
+
+DEFAULT_K = 8
+BATCH_SIZE = 256
+
+# Relative weight of each feature kind before IDF weighting
+FEATURE_WEIGHTS = {'ingredient': 1.0, 'tag': 0.5, 'category': 0.75}
+
+
+def build_vectors():
+    """
+    L2-normalised TF-IDF style sparse vectors, one per recipe, as
+    ``(recipe_ids, [{(kind, id): weight}, ...])``.
+    """
+    features = {pk: set() for pk in Recipe.objects.order_by('id').values_list('id', flat=True)}
+    for recipe_id, ingredient_id in RecipeIngredient.objects.order_by().values_list('recipe_id', 'ingredient_id'):
+        features[recipe_id].add(('ingredient', ingredient_id))
+    for recipe_id, tag_id in Recipe.tags.through.objects.order_by().values_list('recipe_id', 'tag_id'):
+        features[recipe_id].add(('tag', tag_id))
+    for recipe_id, category_id in Recipe.objects.exclude(category=None).order_by().values_list('id', 'category_id'):
+        features[recipe_id].add(('category', category_id))
+
+    document_frequency = Counter(feature for recipe_features in features.values() for feature in recipe_features)
+    n = len(features)
+    idf = {feature: math.log((1 + n) / (1 + df)) + 1 for feature, df in document_frequency.items()}
+
+    recipe_ids, vectors = [], []
+    for recipe_id, recipe_features in features.items():
+        vector = {feature: FEATURE_WEIGHTS[feature[0]] * idf[feature] for feature in recipe_features}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        recipe_ids.append(recipe_id)
+        vectors.append({feature: weight / norm for feature, weight in vector.items()})
+    return recipe_ids, vectors
+
+
+class SimilarityEngine:
+    """
+    Cosine similarity over the recipe vectors, held as a CSR matrix so
+    each batch of rows is scored with one sparse product ``X[batch] @ X.T``.
+    """
+
+    def __init__(self, recipe_ids, vectors):
+        self.recipe_ids = recipe_ids
+        columns = {}
+        indptr, indices, data = [0], [], []
+        for vector in vectors:
+            for feature, weight in vector.items():
+                indices.append(columns.setdefault(feature, len(columns)))
+                data.append(weight)
+            indptr.append(len(indices))
+        self.matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices), np.array(indptr)),
+            shape=(len(vectors), max(len(columns), 1)),
+        )
+        self.matrix_t = self.matrix.T.tocsr()
+
+    def score_rows(self, positions, batch_size=BATCH_SIZE):
+        """Yield ``(position, {other_position: score})`` for every nonzero pair"""
+        positions = list(positions)
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            product = (self.matrix[batch] @ self.matrix_t).tocsr()
+            for row, position in enumerate(batch):
+                cells = slice(product.indptr[row], product.indptr[row + 1])
+                scores = dict(zip(product.indices[cells].tolist(), product.data[cells].tolist()))
+                scores.pop(position, None)
+                yield position, scores
+
+
+def _top_k(scored, k):
+    """Best ``k`` (neighbor_id, score) pairs, ties broken by lower id"""
+    return heapq.nsmallest(k, scored, key=lambda pair: (-pair[1], pair[0]))
+
+
+def _write(neighbours, computed_at):
+    """Replace the stored lists of the given recipes in one transaction"""
+    recipe_ids = list(neighbours)
+    with transaction.atomic():
+        for start in range(0, len(recipe_ids), 500):
+            chunk = recipe_ids[start:start + 500]
+            RecipeSimilarity.objects.filter(recipe_id__in=chunk).delete()
+            Recipe.objects.filter(pk__in=chunk).update(similarity_computed_at=computed_at)
+        RecipeSimilarity.objects.bulk_create(
+            [
+                RecipeSimilarity(recipe_id=recipe_id, neighbor_id=neighbor_id, rank=rank, score=score)
+                for recipe_id, pairs in neighbours.items()
+                for rank, (neighbor_id, score) in enumerate(pairs, start=1)
+            ],
+            batch_size=1000,
+        )
+
+
+def compute_similarity(k=DEFAULT_K, full=False, batch_size=BATCH_SIZE):
+    """
+    Recompute stored neighbour lists; returns ``(recomputed, merged)`` counts.
+
+    Incrementally, only recipes changed since their last run are scored in
+    full. So are recipes whose list contained a changed recipe. Every other
+    list is merged with the changed recipes' new scores, which is exact
+    because its remaining entries' scores did not move. IDF weights do
+    drift as the corpus grows; an occasional ``full`` run re-bases them.
+    """
+    started = timezone.now()
+    recipe_ids, vectors = build_vectors()
+    engine = SimilarityEngine(recipe_ids, vectors)
+    positions = {recipe_id: position for position, recipe_id in enumerate(recipe_ids)}
+
+    if full:
+        changed, dependents = set(recipe_ids), set()
+    else:
+        changed = set(Recipe.objects.filter(
+            Q(similarity_computed_at__isnull=True) |
+            Q(updated_at__gt=F('similarity_computed_at')) |
+            Q(related_updated_at__gt=F('similarity_computed_at'))
+        ).values_list('id', flat=True))
+        dependents = set(
+            RecipeSimilarity.objects.filter(neighbor_id__in=changed).values_list('recipe_id', flat=True)
+        ) - changed
+    recompute = changed | dependents
+
+    neighbours, changed_scores = {}, {}
+    for position, scores in engine.score_rows(
+        sorted(positions[recipe_id] for recipe_id in recompute), batch_size=batch_size
+    ):
+        recipe_id = recipe_ids[position]
+        scored = [(recipe_ids[other], score) for other, score in scores.items() if score > 0]
+        neighbours[recipe_id] = _top_k(scored, k)
+        if not full and recipe_id in changed:
+            changed_scores[recipe_id] = scored
+
+    # Cosine is symmetric: a changed recipe's row is also its column
+    candidates = defaultdict(list)
+    for changed_id, scored in changed_scores.items():
+        for other_id, score in scored:
+            if other_id not in recompute:
+                candidates[other_id].append((changed_id, score))
+
+    merged = 0
+    if candidates:
+        existing = defaultdict(list)
+        for recipe_id, neighbor_id, score in RecipeSimilarity.objects.filter(
+            recipe_id__in=list(candidates)
+        ).values_list('recipe_id', 'neighbor_id', 'score'):
+            existing[recipe_id].append((neighbor_id, score))
+        for recipe_id, extra in candidates.items():
+            current = _top_k(existing[recipe_id], k)
+            updated = _top_k(existing[recipe_id] + extra, k)
+            if updated != current:
+                neighbours[recipe_id] = updated
+                merged += 1
+
+    _write(neighbours, started)
+    return len(recompute), merged
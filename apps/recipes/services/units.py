@@ -0,0 +1,176 @@
+from collections import namedtuple
+
+from apps.recipes.models import Unit
+
+# Factor from each known unit to the base unit of its dimension (g, ml).
+# Keys are lowercase names/abbreviations as they appear in the Unit table.
+UNIT_FACTORS = {
+    'weight': {
+        'mg': 0.001, 'milligram': 0.001,
+        'g': 1.0, 'gram': 1.0,
+        'kg': 1000.0, 'kilogram': 1000.0,
+        'oz': 28.349523125, 'ounce': 28.349523125,
+        'lb': 453.59237, 'pound': 453.59237,
+    },
+    'volume': {
+        'ml': 1.0, 'milliliter': 1.0, 'millilitre': 1.0,
+        'l': 1000.0, 'liter': 1000.0, 'litre': 1000.0,
+        'tsp': 4.92892159375, 'teaspoon': 4.92892159375,
+        'tbsp': 14.78676478125, 'tablespoon': 14.78676478125,
+        'fl oz': 29.5735295625, 'fluid ounce': 29.5735295625,
+        'cup': 236.5882365,
+        'pint': 473.176473,
+        'quart': 946.352946,
+        'gallon': 3785.411784,
+    },
+}
+
+# Units totals are expressed in when contributions can't keep their own unit
+DISPLAY_UNITS = {
+    'weight': [('kg', 1000.0), ('g', 1.0)],
+    'volume': [('l', 1000.0), ('ml', 1.0)],
+}
+
+Quantity = namedtuple('Quantity', 'key quantity unit')
+
+
+class IncompatibleUnits(ValueError):
+    pass
+
+
+def format_quantity(quantity):
+    """Human-friendly number: at most two decimals, no trailing zeros"""
+    return f'{quantity:.2f}'.rstrip('0').rstrip('.') or '0'
+
+
+class UnitConverter:
+    """
+    Precomputed conversion table for the rows of ``Unit``.
+
+    Every unit maps to ``(dimension, factor)``: weight and volume units get
+    a factor to grams/millilitres; anything else (count, unknown names)
+    gets its own dimension so it only ever combines with itself. Ingredient
+    density (g/ml) bridges volume and weight.
+    """
+
+    def __init__(self, units):
+        self.factors = {}
+        self.labels = {}
+        self.by_label = {}
+        for pk, name, abbreviation, unit_type in units:
+            factor = None
+            for key in (abbreviation.lower(), name.lower()):
+                factor = factor or UNIT_FACTORS.get(unit_type, {}).get(key)
+            self.factors[pk] = (unit_type, factor) if factor else (f'unit:{pk}', 1.0)
+            self.labels[pk] = abbreviation
+            self.by_label.setdefault(abbreviation.lower(), pk)
+            self.by_label.setdefault(name.lower(), pk)
+
+    @classmethod
+    def load(cls):
+        return cls(Unit.objects.values_list('id', 'name', 'abbreviation', 'unit_type'))
+
+    def resolve(self, unit):
+        """Unit id for an id or a free-text label (``None`` if unknown)"""
+        if isinstance(unit, int):
+            return unit if unit in self.factors else None
+        return self.by_label.get(str(unit).strip().lower())
+
+    def to_base(self, quantity, unit, density=None, prefer='weight'):
+        """``(dimension, quantity)`` in g/ml; with a density, volume becomes weight"""
+        unit_id = self.resolve(unit)
+        if unit_id is None:
+            return f'label:{str(unit).strip().lower()}', quantity
+        dimension, factor = self.factors[unit_id]
+        quantity = quantity * factor
+        if density and prefer == 'weight' and dimension == 'volume':
+            return 'weight', quantity * density
+        if density and prefer == 'volume' and dimension == 'weight':
+            return 'volume', quantity / density
+        return dimension, quantity
+
+    def convert(self, quantity, from_unit, to_unit, density=None):
+        from_id, to_id = self.resolve(from_unit), self.resolve(to_unit)
+        if from_id is None or to_id is None:
+            raise IncompatibleUnits(f'Unknown unit: {from_unit if from_id is None else to_unit}')
+        if from_id == to_id:
+            return quantity
+        to_dimension, to_factor = self.factors[to_id]
+        dimension, base = self.to_base(quantity, from_id, density, prefer=to_dimension)
+        if dimension != to_dimension:
+            raise IncompatibleUnits(f'Cannot convert {self.labels[from_id]} to {self.labels[to_id]}')
+        return base / to_factor
+
+    def to_grams(self, quantity, unit, density=None):
+        """Weight in grams, or ``None`` when the unit has no known mass"""
+        dimension, base = self.to_base(quantity, unit, density)
+        return base if dimension == 'weight' else None
+
+    # Batch APIs -------------------------------------------------------------
+
+    def scale(self, rows, factor):
+        """
+        Scale ``(quantity, unit)`` rows by ``factor`` in one pass, keeping
+        each row's own unit. Returns ``(quantity, label)`` pairs.
+        """
+        return [
+            (quantity * factor, self.labels.get(self.resolve(unit), unit))
+            for quantity, unit in rows
+        ]
+
+    def normalize(self, rows):
+        """
+        Aggregate ``(key, quantity, unit, density)`` rows into one total per
+        key and dimension, e.g. "1 cup" and "250 ml" of milk become one
+        volume. Totals keep the unit when every contribution shared it;
+        otherwise they are expressed in g/kg or ml/l.
+        """
+        totals = {}
+        for key, quantity, unit, density in rows:
+            unit_id = self.resolve(unit)
+            dimension, base = self.to_base(quantity, unit, density)
+            entry = totals.setdefault((key, dimension), {'base': 0.0, 'units': set(), 'raw': 0.0})
+            entry['base'] += base
+            entry['raw'] += quantity
+            entry['units'].add(unit_id if unit_id is not None else unit)
+
+        results = []
+        for (key, dimension), entry in totals.items():
+            if len(entry['units']) == 1:
+                unit = next(iter(entry['units']))
+                results.append(Quantity(key, entry['raw'], self.labels.get(unit, unit)))
+            else:
+                results.append(Quantity(key, *self._display(dimension, entry['base'])))
+        return results
+
+    def total_grams(self, rows):
+        """Sum ``(quantity, unit, density)`` rows in grams, skipping massless units"""
+        total = 0.0
+        for quantity, unit, density in rows:
+            grams = self.to_grams(quantity, unit, density)
+            if grams is not None:
+                total += grams
+        return total
+
+    def calories(self, rows):
+        """
+        Energy of ``(quantity, unit, density, kcal_per_100g)`` rows as
+        ``(kcal, unknown)``; ``unknown`` counts rows that could not be
+        weighed or have no calorie data.
+        """
+        kcal, unknown = 0.0, 0
+        for quantity, unit, density, kcal_per_100g in rows:
+            grams = self.to_grams(quantity, unit, density)
+            if grams is None or kcal_per_100g is None:
+                unknown += 1
+                continue
+            kcal += grams * kcal_per_100g / 100
+        return kcal, unknown
+
+    def _display(self, dimension, base):
+        for label, factor in DISPLAY_UNITS.get(dimension, []):
+            if base >= factor:
+                return base / factor, label
+        if dimension in DISPLAY_UNITS:
+            return base, DISPLAY_UNITS[dimension][-1][0]
+        return base, ''
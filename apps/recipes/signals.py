@@ -0,0 +1,193 @@
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    MAINTAINED_FIELDS, Category, Ingredient, Recipe, RecipeIngredient, RecipeRating, RecipeStep, Tag, Unit,
+)
+from apps.core.images import delete_derivative_files
+from apps.core.storage import release_files, retain_files
+from .services import autocomplete, ingredient_index, nutrition, search_index
+
+User = get_user_model()
+
+# User fields rendered on recipe cards
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+# Recipe fields the search document, calorie rollup and title index are built from
+SEARCH_FIELDS = {'title', 'description', 'instructions'}
+NUTRITION_FIELDS = {'servings'}
+AUTOCOMPLETE_FIELDS = {'title', 'image', 'image_derivatives', 'is_public', 'author', 'author_id'}
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # New recipes and saves without update_fields may have changed anything
+    changed = None if created or update_fields is None else set(update_fields)
+    if changed is None or changed & SEARCH_FIELDS:
+        search_index.index_recipes([instance.pk])
+    if changed is None or changed & NUTRITION_FIELDS:
+        nutrition.update_nutrition([instance.pk])
+    if changed is None or changed - MAINTAINED_FIELDS:
+        Recipe.objects.filter(pk=instance.pk).bump_card_version()
+    if changed is None or changed & AUTOCOMPLETE_FIELDS:
+        transaction.on_commit(autocomplete.bump_version)
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_similar_lists(sender, instance, **kwargs):
+    # Lists losing this neighbour are rescored by the next compute_recipe_similarity
+    Recipe.objects.filter(similar__neighbor=instance).update(similarity_computed_at=None)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    search_index.remove_recipes([instance.pk])
+    transaction.on_commit(autocomplete.bump_version)
+    transaction.on_commit(ingredient_index.bump_version)
+
+
+# Recipes whose ingredients changed in the current transaction, per connection
+_pending_refresh = WeakKeyDictionary()
+
+
+def _refresh_pending(connection):
+    """Search document, calorie rollup and card version of the pending recipes"""
+    recipe_ids = list(_pending_refresh.pop(connection, ()))
+    if not recipe_ids:
+        return
+    search_index.index_recipes(recipe_ids)
+    nutrition.update_nutrition(recipe_ids)
+    Recipe.objects.filter(pk__in=recipe_ids).bump_card_version()
+
+
+def _refresh_after_commit(recipe_id):
+    """
+    Queue a recipe for one shared refresh on commit, so saving a formset
+    refreshes once. Every call registers a callback: the first to run takes
+    all pending recipes and the rest find nothing left, and after a rollback
+    the next transaction's callback still picks the recipes up.
+    """
+    connection = transaction.get_connection()
+    _pending_refresh.setdefault(connection, set()).add(recipe_id)
+    # Outside a transaction this runs straight away
+    transaction.on_commit(partial(_refresh_pending, connection))
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def reindex_recipe_ingredients(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _refresh_after_commit(instance.recipe_id)
+
+
+@receiver(post_save, sender=RecipeStep)
+@receiver(post_delete, sender=RecipeStep)
+def invalidate_recipe_steps(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Recipe.objects.filter(pk=instance.recipe_id).bump_card_version()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        Recipe.objects.filter(pk=instance.pk).bump_card_version()
+    elif action == 'pre_clear':
+        instance.recipe_set.bump_card_version()
+    else:
+        Recipe.objects.filter(pk__in=pk_set).bump_card_version()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tagged_recipes(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Recipe.objects.filter(tags=instance).bump_card_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_recipes(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Recipe.objects.filter(category=instance).bump_card_version()
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_recipes(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    recipes = Recipe.objects.filter(ingredients__ingredient=instance)
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    # Ingredient names are part of each recipe's search document
+    search_index.index_recipes(recipe_ids)
+    # Calorie or density edits change every recipe using the ingredient
+    nutrition.update_nutrition(recipe_ids)
+    recipes.bump_card_version()
+
+
+@receiver(post_save, sender=Unit)
+def invalidate_unit_recipes(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    Recipe.objects.filter(ingredients__unit=instance).bump_card_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created:
+        return
+    # Skip the last_login-only save on every sign-in
+    if update_fields is not None and not CARD_USER_FIELDS.intersection(update_fields):
+        return
+    Recipe.objects.filter(author=instance).bump_card_version()
+
+
+@receiver(post_save, sender=RecipeRating)
+@receiver(post_delete, sender=RecipeRating)
+def update_recipe_rating_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Recipe.objects.filter(pk=instance.recipe_id).update_rating_stats()
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=RecipeStep)
+def remember_stored_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('image', flat=True).first() if instance.pk else None
+    instance._previous_image = previous or ''
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeStep)
+def count_stored_image(sender, instance, raw=False, **kwargs):
+    previous = instance.__dict__.pop('_previous_image', None)
+    current = instance.image.name or ''
+    if raw or previous is None or previous == current:
+        return
+    # Content-addressed files may be shared; only the reference count goes
+    retain_files([current])
+    release_files([previous])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=RecipeStep)
+def release_stored_image(sender, instance, **kwargs):
+    release_files([instance.image.name])
+    # Unlike the shared source, derivatives belong to this row alone
+    derivatives = getattr(instance, 'image_derivatives', None)
+    if derivatives:
+        transaction.on_commit(partial(delete_derivative_files, derivatives))
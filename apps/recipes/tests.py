@@ -0,0 +1,338 @@
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from apps.core.pagination import CursorPaginator
+from .models import Category, Ingredient, Recipe, RecipeIngredient, RecipeRating, RecipeStep, Tag, Unit
+from .services import search_index
+from .services.catalogue import export_recipes
+from .services.measures import DEFAULT_QUANTITY, DEFAULT_UNIT, parse_measure, parse_measures
+
+User = get_user_model()
+
+
+def make_user(username='cook'):
+    return User.objects.create_user(username=username, email=f'{username}@example.com', password='secret')
+
+
+def make_recipe(author, title='Recipe', **fields):
+    fields = {'description': '', 'instructions': '', 'prep_time': 10, 'cook_time': 20, **fields}
+    return Recipe.objects.create(author=author, title=title, **fields)
+
+
+class ParseMeasureTests(SimpleTestCase):
+    def test_quantities(self):
+        cases = {
+            '2 cups': (2, 'cup'),
+            '1 1/2 cups': (1.5, 'cup'),
+            '½ tsp': (0.5, 'teaspoon'),
+            '1½ tbsp': (1.5, 'tablespoon'),
+            '.5 kg': (0.5, 'kilogram'),
+            '2-1/2 cups': (2.5, 'cup'),
+        }
+        for measure, expected in cases.items():
+            with self.subTest(measure=measure):
+                self.assertEqual(parse_measure(measure), expected)
+
+    def test_ranges_count_as_their_lower_bound(self):
+        self.assertEqual(parse_measure('2-3 cloves'), (2, 'clove'))
+        self.assertEqual(parse_measure('3 to 4 slices'), (3, 'slice'))
+
+    def test_unit_attached_to_the_quantity(self):
+        self.assertEqual(parse_measure('200g'), (200, 'gram'))
+        self.assertEqual(parse_measure('500ML'), (500, 'milliliter'))
+
+    def test_container_size_is_not_the_unit(self):
+        self.assertEqual(parse_measure('14-ounce can'), (14, 'can'))
+        self.assertEqual(parse_measure('1 (400g) tin'), (1, 'can'))
+
+    def test_defaults(self):
+        self.assertEqual(parse_measure(''), (DEFAULT_QUANTITY, DEFAULT_UNIT))
+        self.assertEqual(parse_measure(None), (DEFAULT_QUANTITY, DEFAULT_UNIT))
+        self.assertEqual(parse_measure('to taste'), (DEFAULT_QUANTITY, DEFAULT_UNIT))
+        self.assertEqual(parse_measure('Pinch'), (DEFAULT_QUANTITY, 'pinch'))
+        self.assertEqual(parse_measure('1/0 cup'), (DEFAULT_QUANTITY, 'cup'))
+
+    def test_parse_measures_keeps_input_order(self):
+        self.assertEqual(
+            parse_measures(['1 cup', '2 g', '1 cup']),
+            [(1, 'cup'), (2, 'gram'), (1, 'cup')],
+        )
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user()
+        cls.recipes = [make_recipe(author, f'Recipe {i}') for i in range(7)]
+        # Some recipes have no calorie figure at all
+        for i, recipe in enumerate(cls.recipes):
+            calories = None if i % 3 == 0 else 100 + 50 * (i % 2)
+            Recipe.objects.filter(pk=recipe.pk).update(calories_per_serving=calories)
+
+    def walk(self, paginator):
+        """Every page going forward, then every page going back from the last one"""
+        forward = []
+        page = paginator.page()
+        while True:
+            forward.append([recipe.pk for recipe in page])
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        backward = []
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backward.insert(0, [recipe.pk for recipe in page])
+        return forward, backward
+
+    def test_pages_cover_the_ordering_once(self):
+        paginator = CursorPaginator(Recipe.objects.all(), 3)
+        forward, backward = self.walk(paginator)
+        expected = list(Recipe.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual([len(page) for page in forward], [3, 3, 1])
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward[:-1])
+
+    def test_nulls_last_ordering_keeps_null_rows(self):
+        ordering = (F('calories_per_serving').asc(nulls_last=True), '-created_at', '-id')
+        paginator = CursorPaginator(Recipe.objects.all(), 2, ordering=ordering)
+        forward, backward = self.walk(paginator)
+        expected = list(Recipe.objects.order_by(*ordering).values_list('pk', flat=True))
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(len(expected), len(self.recipes))
+        self.assertEqual(backward, forward[:-1])
+
+    def test_first_and_last_page_flags(self):
+        paginator = CursorPaginator(Recipe.objects.all(), 3)
+        first = paginator.page()
+        self.assertFalse(first.has_previous())
+        self.assertIsNone(first.previous_cursor)
+        self.assertTrue(first.has_next())
+
+        everything = CursorPaginator(Recipe.objects.all(), 10).page()
+        self.assertFalse(everything.has_other_pages())
+        self.assertIsNone(everything.next_cursor)
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        paginator = CursorPaginator(Recipe.objects.all(), 3)
+        first = [recipe.pk for recipe in paginator.page()]
+        other_ordering = CursorPaginator(Recipe.objects.all(), 3, ordering=('-id',))
+        for cursor in ('not-a-cursor', 'e30', other_ordering.encode_cursor(self.recipes[0], 'next')):
+            with self.subTest(cursor=cursor):
+                self.assertEqual([recipe.pk for recipe in paginator.page(cursor)], first)
+
+
+class RatingColumnTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user()
+        cls.raters = [make_user(f'rater{i}') for i in range(3)]
+
+    def setUp(self):
+        self.recipe = make_recipe(self.author)
+
+    def columns(self):
+        return Recipe.objects.filter(pk=self.recipe.pk).values('rating_count', 'rating_sum', 'rating_avg').get()
+
+    def test_ratings_keep_the_columns_current(self):
+        ratings = [
+            RecipeRating.objects.create(recipe=self.recipe, user=user, score=score)
+            for user, score in zip(self.raters, (5, 4, 3))
+        ]
+        self.assertEqual(self.columns(), {'rating_count': 3, 'rating_sum': 12, 'rating_avg': 4.0})
+
+        ratings[2].score = 1
+        ratings[2].save()
+        self.assertEqual(self.columns(), {'rating_count': 3, 'rating_sum': 10, 'rating_avg': 10 / 3})
+
+        ratings[0].delete()
+        self.assertEqual(self.columns(), {'rating_count': 2, 'rating_sum': 5, 'rating_avg': 2.5})
+
+        for rating in ratings[1:]:
+            rating.delete()
+        self.assertEqual(self.columns(), {'rating_count': 0, 'rating_sum': 0, 'rating_avg': 0})
+
+    def test_rating_bumps_the_card_version(self):
+        version = self.recipe.card_version
+        RecipeRating.objects.create(recipe=self.recipe, user=self.raters[0], score=4)
+        self.assertGreater(Recipe.objects.get(pk=self.recipe.pk).card_version, version)
+
+    def test_saving_a_stale_recipe_keeps_the_columns(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        RecipeRating.objects.create(recipe=self.recipe, user=self.raters[0], score=4)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.columns(), {'rating_count': 1, 'rating_sum': 4, 'rating_avg': 4.0})
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).title, 'Renamed')
+
+    def test_update_rating_stats_recomputes_from_the_ratings(self):
+        RecipeRating.objects.create(recipe=self.recipe, user=self.raters[0], score=2)
+        Recipe.objects.filter(pk=self.recipe.pk).update(rating_count=9, rating_sum=40, rating_avg=4.4)
+        Recipe.objects.filter(pk=self.recipe.pk).update_rating_stats()
+        self.assertEqual(self.columns(), {'rating_count': 1, 'rating_sum': 2, 'rating_avg': 2.0})
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user()
+        cls.in_title = make_recipe(author, 'Lemon tart', instructions='Bake the pastry.')
+        cls.in_description = make_recipe(author, 'Citrus pie', description='A sharp lemon filling.')
+        cls.in_instructions = make_recipe(author, 'Fish supper', instructions='Squeeze a lemon over the fish.')
+        cls.unrelated = make_recipe(author, 'Beef stew', instructions='Simmer for two hours.')
+
+    def search(self, query):
+        return list(search_index.search_recipes(Recipe.objects.all(), query).order_by('search_rank', 'id'))
+
+    def test_title_matches_rank_above_description_and_instructions(self):
+        self.assertEqual(self.search('lemon'), [self.in_title, self.in_description, self.in_instructions])
+
+    def test_terms_are_anded_prefixes(self):
+        self.assertEqual(self.search('lem tar'), [self.in_title])
+        self.assertEqual(self.search('lemon stew'), [])
+
+    def test_punctuation_and_empty_queries(self):
+        self.assertEqual(self.search('"lemon" (tart*'), [self.in_title])
+        self.assertEqual(self.search('  ?! '), [])
+
+    def test_saved_changes_are_reindexed(self):
+        self.unrelated.title = 'Lemon beef stew'
+        self.unrelated.save()
+        # Both title matches rank ahead of the other two
+        self.assertCountEqual(self.search('lemon')[:2], [self.in_title, self.unrelated])
+
+        self.unrelated.delete()
+        self.assertNotIn(self.unrelated.title, [recipe.title for recipe in self.search('lemon')])
+
+    def test_ingredient_names_are_searchable(self):
+        unit = Unit.objects.create(name='piece', abbreviation='pc', unit_type='count')
+        ingredient = Ingredient.objects.create(name='Saffron')
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(recipe=self.unrelated, ingredient=ingredient, quantity=1, unit=unit)
+        self.assertEqual(self.search('saffron'), [self.unrelated])
+
+        ingredient.name = 'Turmeric'
+        ingredient.save()
+        self.assertEqual(self.search('saffron'), [])
+        self.assertEqual(self.search('turmeric'), [self.unrelated])
+
+
+class CatalogueRoundtripTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user()
+        category = Category.objects.create(name='Dessert', icon='cake', color='#ff0000')
+        tags = [Tag.objects.create(name=name) for name in ('quick', 'sweet')]
+        unit = Unit.objects.create(name='gram', abbreviation='g', unit_type='weight')
+        flour = Ingredient.objects.create(name='Flour', calories_per_100g=364)
+        sugar = Ingredient.objects.create(name='Sugar', calories_per_100g=387)
+
+        tart = make_recipe(cls.author, 'Lemon tart', category=category, servings=6, difficulty='medium')
+        tart.tags.set(tags)
+        RecipeStep.objects.create(recipe=tart, step_number=1, instruction='Make the pastry.', time_required=15)
+        RecipeStep.objects.create(recipe=tart, step_number=2, instruction='Bake.')
+        with cls.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(recipe=tart, ingredient=flour, unit=unit, quantity=200, notes='sifted')
+            RecipeIngredient.objects.create(recipe=tart, ingredient=sugar, unit=unit, quantity=100)
+        make_recipe(cls.author, 'Plain toast', is_public=False)
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recipes.jsonl.gz')
+
+    def export(self):
+        call_command('export_recipes', self.path, stdout=StringIO())
+
+    def load(self, *args):
+        call_command('import_recipes_jsonl', self.path, *args, stdout=StringIO())
+
+    def test_records_survive_export_and_import(self):
+        expected = list(export_recipes())
+        calories = Recipe.objects.get(title='Lemon tart').calories_per_serving
+        self.export()
+        Recipe.objects.all().delete()
+        Category.objects.all().delete()
+        Tag.objects.all().delete()
+        Ingredient.objects.all().delete()
+        Unit.objects.all().delete()
+
+        self.load()
+        self.assertEqual(list(export_recipes()), expected)
+        tart = Recipe.objects.get(title='Lemon tart')
+        # Rollups and the search index are rebuilt even though bulk_create skips signals
+        self.assertEqual(tart.calories_per_serving, calories)
+        self.assertIsNotNone(calories)
+        self.assertEqual(list(search_index.search_recipes(Recipe.objects.all(), 'tart')), [tart])
+
+    def test_existing_recipes_are_skipped(self):
+        self.export()
+        self.load()
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        self.load('--allow-duplicates')
+        self.assertEqual(Recipe.objects.filter(title='Lemon tart').count(), 2)
+        copy = Recipe.objects.filter(title='Lemon tart').latest('id')
+        self.assertEqual(copy.steps.count(), 2)
+        self.assertEqual(copy.ingredients.count(), 2)
+        self.assertEqual(copy.tags.count(), 2)
+
+    def test_unknown_author_needs_a_default(self):
+        self.export()
+        Recipe.objects.all().delete()
+        self.author.username = 'renamed'
+        self.author.save()
+
+        with self.assertRaises(CommandError):
+            self.load()
+        self.assertFalse(Recipe.objects.exists())
+
+        self.load('--author', 'renamed')
+        self.assertEqual(set(Recipe.objects.values_list('author', flat=True)), {self.author.pk})
+
+
+# The manifest only exists after collectstatic
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class RecipeDetailConditionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user()
+        cls.rater = make_user('rater')
+        cls.recipe = make_recipe(cls.author, 'Lemon tart')
+        cls.url = reverse('recipes:detail', args=[cls.recipe.pk])
+
+    def test_matching_etag_gives_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response.headers)
+        self.assertIn('private', response.headers['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_changes_give_a_new_etag(self):
+        etag = self.client.get(self.url).headers['ETag']
+        RecipeRating.objects.create(recipe=self.recipe, user=self.rater, score=5)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_etag_depends_on_the_viewer(self):
+        etag = self.client.get(self.url).headers['ETag']
+        self.client.force_login(self.rater)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_private_recipes_stay_hidden(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(is_public=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
@@ -10,4 +10,6 @@ urlpatterns = [
     path('<int:pk>/edit/', views.RecipeUpdateView.as_view(), name='edit'),
     path('<int:pk>/delete/', views.RecipeDeleteView.as_view(), name='delete'),
     path('my-recipes/', views.my_recipes, name='my_recipes'),
+    path('cook/', views.cook_with, name='cook_with'),
+    path('api/search/', views.recipe_autocomplete, name='autocomplete'),
 ]
\ No newline at end of file
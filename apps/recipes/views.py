@@ -1,37 +1,60 @@
+import hashlib
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q
+from django.db.models import Count, F, Max, Q
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
+from apps.core.api import FastJsonResponse
+from apps.core.pagination import CursorPaginationMixin
 from .models import Recipe, Category
 from .forms import RecipeForm
+from .services.autocomplete import autocomplete
+from .services.ingredient_index import find_recipes
+from .services.search_index import search_recipes
+from .services.units import UnitConverter, format_quantity
+
+SIMILAR_RECIPES_SHOWN = 4
+
+CALORIE_LIMITS = [300, 500, 800]
 
-class RecipeListView(ListView):
+class RecipeListView(CursorPaginationMixin, ListView):
     model = Recipe
     template_name = 'recipes/list.html'
     context_object_name = 'recipes'
     paginate_by = 12
     
+    def get_cursor_ordering(self):
+        if self.request.GET.get('sort') == 'kcal':
+            return (F('calories_per_serving').asc(nulls_last=True), '-created_at', '-id')
+        if self.request.GET.get('search'):
+            return ('search_rank', '-created_at', '-id')
+        return ('-created_at', '-id')
+    
     def get_queryset(self):
-        queryset = Recipe.objects.filter(is_public=True).select_related('author', 'category').prefetch_related('tags', 'ingredients', 'steps')
-        
-        # Search functionality
-        search_query = self.request.GET.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(instructions__icontains=search_query)
-            )
+        queryset = Recipe.objects.filter(is_public=True).select_related('author', 'category').with_card_stats()
         
         # Category filter
         category_id = self.request.GET.get('category')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
         
+        # Calorie filter/sort on the indexed rollup column
+        max_kcal = self.request.GET.get('max_kcal', '')
+        if max_kcal.isdigit():
+            queryset = queryset.filter(calories_per_serving__lte=int(max_kcal))
+        
+        # Search functionality (full-text index, best matches first)
+        search_query = self.request.GET.get('search')
+        if search_query:
+            return search_recipes(queryset, search_query).order_by('search_rank', '-created_at')
+        
         return queryset.order_by('-created_at')
     
     def get_context_data(self, **kwargs):
@@ -39,6 +62,9 @@ class RecipeListView(ListView):
         context['categories'] = Category.objects.all()
         context['search_query'] = self.request.GET.get('search', '')
         context['selected_category'] = self.request.GET.get('category', '')
+        context['calorie_limits'] = CALORIE_LIMITS
+        context['max_kcal'] = self.request.GET.get('max_kcal', '')
+        context['sort'] = self.request.GET.get('sort', '')
         return context
 
 class RecipeDetailView(DetailView):
@@ -46,21 +72,89 @@ class RecipeDetailView(DetailView):
     template_name = 'recipes/detail.html'
     context_object_name = 'recipe'
     
+    def get_visible_recipes(self):
+        if self.request.user.is_authenticated:
+            # Show user's own recipes even if private
+            return Recipe.objects.filter(
+                Q(is_public=True) | Q(author=self.request.user)
+            )
+        return Recipe.objects.filter(is_public=True)
+    
     def get_queryset(self):
-        queryset = Recipe.objects.select_related('author', 'category').prefetch_related(
+        return self.get_visible_recipes().select_related('author', 'category').prefetch_related(
             'ingredients__ingredient',
-            'ingredients__unit', 
             'steps',
-            'tags',
-            'ratings__user'
+            'tags'
+        )
+    
+    def get_validators(self):
+        """Cheap (etag, last_modified) for the page, from a single narrow query"""
+        recipe = self.get_visible_recipes().filter(pk=self.kwargs['pk']).only(
+            'updated_at', 'related_updated_at', 'similarity_computed_at', 'card_version', 'image_hash'
+        ).annotate(
+            # Similar recipes are rendered too: a renamed, re-imaged, hidden or deleted neighbour changes the page
+            neighbors_updated_at=Max('similar__neighbor__updated_at'),
+            neighbors_related_updated_at=Max('similar__neighbor__related_updated_at'),
+            neighbor_count=Count('similar'),
+        ).first()
+        if recipe is None:
+            raise Http404('No recipe found matching the query')
+        last_modified = max(filter(None, [
+            recipe.last_modified, recipe.neighbors_updated_at, recipe.neighbors_related_updated_at
+        ]))
+        
+        # The page also renders per-viewer bits (navbar, author-only actions)
+        user = self.request.user
+        viewer = f'{user.pk}:{user.username}:{user.first_name}:{user.avatar_hash}' if user.is_authenticated else 'anon'
+        key = (
+            f'{recipe.pk}:{recipe.card_version}:{last_modified.isoformat()}:{recipe.image_hash}:'
+            f'{recipe.neighbor_count}:{viewer}'
         )
+        return quote_etag(hashlib.md5(key.encode()).hexdigest()), last_modified
+    
+    def get(self, request, *args, **kwargs):
+        # Pending flash messages are consumed by rendering, so never answer 304 for them
+        if messages.get_messages(request):
+            return super().get(request, *args, **kwargs)
+        
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified.timestamp())
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
         
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        neighbors = Q(neighbor__is_public=True)
         if self.request.user.is_authenticated:
-            # Show user's own recipes even if private
-            return queryset.filter(
-                Q(is_public=True) | Q(author=self.request.user)
-            )
-        return queryset.filter(is_public=True)
+            neighbors |= Q(neighbor__author=self.request.user)
+        context['similar_recipes'] = [
+            similarity.neighbor for similarity in
+            self.object.similar.filter(neighbors).select_related('neighbor').order_by('rank')[:SIMILAR_RECIPES_SHOWN]
+        ]
+        
+        # Server-side scaling: ?servings=N rescales every ingredient in one batch
+        servings = self.object.servings
+        try:
+            servings = max(1, min(int(self.request.GET.get('servings', servings)), 100))
+        except ValueError:
+            pass
+        recipe_ingredients = list(self.object.ingredients.all())
+        scaled = UnitConverter.load().scale(
+            [(ri.quantity, ri.unit_id) for ri in recipe_ingredients],
+            servings / self.object.servings if self.object.servings else 1
+        )
+        context['servings'] = servings
+        context['scaled_ingredients'] = [
+            (ri, format_quantity(quantity), unit) for ri, (quantity, unit) in zip(recipe_ingredients, scaled)
+        ]
+        return context
 from django.forms import inlineformset_factory
 from .models import RecipeStep
 from .forms import RecipeStepForm
@@ -126,19 +220,11 @@ class RecipeDeleteView(LoginRequiredMixin, DeleteView):
 @login_required
 def my_recipes(request):
     """View user's own recipes with enhanced data"""
-    recipes = Recipe.objects.filter(author=request.user).select_related('category').prefetch_related(
-        'ingredients__ingredient',
-        'steps',
-        'tags'
-    ).order_by('-created_at')
+    recipes = Recipe.objects.filter(author=request.user).select_related('category').with_card_stats().order_by('-created_at')
     
     search_query = request.GET.get('search')
     if search_query:
-        recipes = recipes.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(instructions__icontains=search_query)
-        )
+        recipes = search_recipes(recipes, search_query).order_by('search_rank', '-created_at')
     
     context = {
         'recipes': recipes,
@@ -160,4 +246,34 @@ def calendar_view(request):
     """Placeholder for meal planning calendar"""
     return render(request, 'meal_planning/calendar.html', {
         'title': 'Meal Planning Calendar'
-    })
\ No newline at end of file
+    })
+
+def recipe_autocomplete(request):
+    """Title suggestions for the navbar search box, served from the in-memory index"""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return FastJsonResponse({'results': []})
+    return FastJsonResponse({'results': autocomplete(query, user=request.user)})
+
+def cook_with(request):
+    """"Cook with what I have": recipes ranked by how many of their ingredients the user has"""
+    raw = request.GET.get('ingredients', '')
+    names = [name for name in raw.replace('\n', ',').split(',') if name.strip()]
+    
+    matches, matched_ingredients = [], []
+    if names:
+        results, matched_ingredients = find_recipes(names, user=request.user)
+        recipes = Recipe.objects.select_related('author', 'category').in_bulk(
+            [result['recipe_id'] for result in results]
+        )
+        for result in results:
+            recipe = recipes.get(result['recipe_id'])
+            if recipe is not None:
+                matches.append(dict(result, recipe=recipe, coverage_percent=round(result['coverage'] * 100)))
+    
+    context = {
+        'ingredients_query': raw,
+        'matched_ingredients': matched_ingredients,
+        'matches': matches,
+    }
+    return render(request, 'recipes/cook_with.html', context)
@@ -3,7 +3,8 @@ from collections import defaultdict
 from decimal import Decimal
 
 from .models import ShoppingList, ShoppingListItem, ShoppingListCategory
-from apps.recipes.models import RecipeIngredient
+from apps.recipes.models import Ingredient, RecipeIngredient
+from apps.recipes.services.units import UnitConverter
 
 def generate_shopping_list_from_meals(user, meal_plans, week_start):
     """Generate a shopping list from meal plans"""
@@ -18,29 +19,29 @@ def generate_shopping_list_from_meals(user, meal_plans, week_start):
         meal_plan_week=week_start,
     )
     
-    # Aggregate ingredients from all recipes
-    ingredient_totals = defaultdict(lambda: {'quantity': Decimal('0'), 'unit': None, 'recipes': []})
-    
+    # Collect every recipe ingredient in one query, scaled to the planned servings
+    multipliers = defaultdict(list)
     for meal_plan in meal_plans:
         recipe = meal_plan.recipe
-        servings_multiplier = Decimal(str(meal_plan.servings)) / Decimal(str(recipe.servings))
-        
-        for recipe_ingredient in recipe.ingredients.all():
-            ingredient = recipe_ingredient.ingredient
-            key = f"{ingredient.id}_{recipe_ingredient.unit.id}"
-            
-            adjusted_quantity = Decimal(str(recipe_ingredient.quantity)) * servings_multiplier
-            ingredient_totals[key]['quantity'] += adjusted_quantity
-            ingredient_totals[key]['unit'] = recipe_ingredient.unit
-            ingredient_totals[key]['ingredient'] = ingredient
-            ingredient_totals[key]['recipes'].append(recipe.title)
+        multipliers[recipe.id].append(meal_plan.servings / recipe.servings if recipe.servings else 1)
+    
+    rows, recipes_by_ingredient = [], defaultdict(set)
+    for recipe_ingredient in RecipeIngredient.objects.filter(recipe_id__in=list(multipliers)).values_list(
+        'recipe_id', 'recipe__title', 'ingredient_id', 'quantity', 'unit_id', 'ingredient__density_g_per_ml'
+    ):
+        recipe_id, title, ingredient_id, quantity, unit_id, density = recipe_ingredient
+        for multiplier in multipliers[recipe_id]:
+            rows.append((ingredient_id, quantity * multiplier, unit_id, density))
+        recipes_by_ingredient[ingredient_id].add(title)
+    
+    # Convertible units of the same ingredient merge ("1 cup" + "250 ml" milk)
+    totals = UnitConverter.load().normalize(rows)
+    ingredients = Ingredient.objects.in_bulk([total.key for total in totals])
     
     # Create shopping list items
-    for key, data in ingredient_totals.items():
-        ingredient = data['ingredient']
-        unit = data['unit']
-        quantity = data['quantity']
-        recipes = list(set(data['recipes']))  # Remove duplicates
+    for total in totals:
+        ingredient = ingredients[total.key]
+        recipes = sorted(recipes_by_ingredient[total.key])
         
         # Try to categorize the ingredient
         category = get_ingredient_category(ingredient)
@@ -49,8 +50,8 @@ def generate_shopping_list_from_meals(user, meal_plans, week_start):
             shopping_list=shopping_list,
             ingredient=ingredient,
             name=ingredient.name,
-            quantity=quantity,
-            unit=unit.abbreviation,
+            quantity=Decimal(str(round(total.quantity, 2))),
+            unit=total.unit,
             category=category,
             notes=f"For: {', '.join(recipes[:3])}{'...' if len(recipes) > 3 else ''}",
         )
@@ -82,19 +83,27 @@ def get_ingredient_category(ingredient):
     return None
 
 def consolidate_shopping_items(shopping_list):
-    """Consolidate duplicate items in a shopping list"""
+    """Consolidate duplicate items in a shopping list, converting between compatible units"""
+    converter = UnitConverter.load()
     items_by_ingredient = defaultdict(list)
     
-    for item in shopping_list.items.all():
-        key = f"{item.ingredient.id if item.ingredient else item.name}_{item.unit}"
+    for item in shopping_list.items.select_related('ingredient'):
+        density = item.ingredient.density_g_per_ml if item.ingredient else None
+        dimension, _ = converter.to_base(1, item.unit, density)
+        key = (item.ingredient_id or item.name.lower(), dimension)
         items_by_ingredient[key].append(item)
     
     # Merge duplicate items
-    for items in items_by_ingredient.values():
+    for key, items in items_by_ingredient.items():
         if len(items) > 1:
             # Keep the first item and consolidate others into it
             main_item = items[0]
-            total_quantity = sum(Decimal(str(item.quantity)) for item in items)
+            (total,) = converter.normalize(
+                (key, float(item.quantity), item.unit, item.ingredient.density_g_per_ml if item.ingredient else None)
+                for item in items
+            )
+            total_quantity = Decimal(str(round(total.quantity, 2)))
+            main_item.unit = total.unit
             
             # Combine notes
             notes = [item.notes for item in items if item.notes]
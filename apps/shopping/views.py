@@ -9,11 +9,12 @@ from django.utils import timezone
 from django.db import models
 from django.db.models import Sum, Count
 
+from apps.core.pagination import CursorPaginationMixin
 from .models import ShoppingList, ShoppingListItem, ShoppingListCategory, ShoppingListTemplate
 from .forms import ShoppingListForm, ShoppingListItemForm, ShoppingListTemplateForm
 from .utils import generate_shopping_list_from_meals
 
-class ShoppingListListView(LoginRequiredMixin, ListView):
+class ShoppingListListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = ShoppingList
     template_name = 'shopping/list.html'
     context_object_name = 'shopping_lists'
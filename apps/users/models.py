@@ -1,12 +1,14 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from PIL import Image
+
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=30)
     last_name = models.CharField(max_length=30)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar_hash = models.CharField(max_length=64, blank=True, editable=False)
+    avatar_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=100, blank=True)
     birth_date = models.DateField(null=True, blank=True)
@@ -24,13 +26,3 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.username
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        if self.avatar:
-            img = Image.open(self.avatar.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.avatar.path)
\ No newline at end of file
@@ -18,6 +18,9 @@ if not User.objects.filter(username='admin').exists():
     User.objects.create_superuser('admin', 'admin@example.com', 'admin123')
 EOF
 
+# Build image derivatives for new uploads outside the web workers
+python manage.py process_image_derivatives --interval 30 &
+
 # Start Gunicorn in the background
 gunicorn --bind 127.0.0.1:8001 apps.recipes.wsgi:application &
 
@@ -137,6 +137,45 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Image derivatives (card/detail/thumbnail) are generated outside the web
+# workers by `manage.py process_image_derivatives --interval N`
+
+# TheMealDB import client (point MEALDB_API_URL at a local stub server for testing)
+MEALDB_API_URL = os.getenv('MEALDB_API_URL', 'https://www.themealdb.com/api/json/v1/1/')
+MEALDB_RATE_LIMIT = float(os.getenv('MEALDB_RATE_LIMIT', '5'))
+MEALDB_WORKERS = int(os.getenv('MEALDB_WORKERS', '8'))
+# On-disk response cache: 'off', 'record' (serve fresh copies, store new responses)
+# or 'replay' (serve only what was recorded; no network access at all)
+MEALDB_CACHE_MODE = os.getenv('MEALDB_CACHE_MODE', 'off')
+MEALDB_CACHE_DIR = os.getenv('MEALDB_CACHE_DIR', str(BASE_DIR / 'cache' / 'mealdb'))
+MEALDB_CACHE_MAX_AGE = int(os.getenv('MEALDB_CACHE_MAX_AGE', str(7 * 24 * 3600)))
+
+# GPT recipe analysis (point OPENAI_BASE_URL at a local stub server for testing)
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+GPT_MAX_CONCURRENCY = int(os.getenv('GPT_MAX_CONCURRENCY', '4'))
+# Paid GPT answers are kept in the database; least recently used beyond this are evicted
+GPT_CACHE_MAX_ENTRIES = int(os.getenv('GPT_CACHE_MAX_ENTRIES', '20000'))
+# USD per million (prompt, completion) tokens, for the cost estimates in gpt_metrics
+GPT_TOKEN_PRICES = {
+    'gpt-4o': (2.50, 10.00),
+}
+
+# Cache shared by every web worker and command (recipe card fragments, list
+# counts, and the version keys that tell other processes to rebuild their
+# autocomplete and ingredient indexes). It must be the same cache on every
+# host: with more than one host, point CACHE_LOCATION at a directory they all
+# mount, or set CACHE_BACKEND to a server backend such as
+# django.core.cache.backends.redis.RedisCache with CACHE_LOCATION=redis://...
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache' / 'django')),
+    }
+}
+if CACHE_BACKEND.endswith('FileBasedCache'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '5000'))}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
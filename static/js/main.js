@@ -32,7 +32,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Search Autocomplete
 function initializeSearchAutocomplete() {
-    const searchInput = document.querySelector('input[name="q"]');
+    const searchInput = document.querySelector('input[name="search"]');
     if (!searchInput) return;
     
     let searchTimeout;
@@ -76,12 +76,35 @@ function displaySearchResults(results, container) {
         return;
     }
     
-    container.innerHTML = results.map(result => `
-        <a href="${result.url}" class="d-flex align-items-center p-2 text-decoration-none border-bottom">
-            ${result.image ? `<img src="${result.image}" class="rounded me-2" style="width: 40px; height: 40px; object-fit: cover;">` : '<div class="bg-light rounded me-2 d-flex align-items-center justify-content-center" style="width: 40px; height: 40px;"><i class="bi bi-image text-muted"></i></div>'}
-            <span class="text-dark">${result.title}</span>
-        </a>
-    `).join('');
+    // Titles are user content: build nodes and set text, never parse them as HTML
+    container.replaceChildren(...results.map(result => {
+        const link = document.createElement('a');
+        link.setAttribute('href', result.url);
+        link.className = 'd-flex align-items-center p-2 text-decoration-none border-bottom';
+        
+        if (result.image) {
+            const image = document.createElement('img');
+            image.setAttribute('src', result.image);
+            image.setAttribute('alt', '');
+            image.className = 'rounded me-2';
+            image.style.cssText = 'width: 40px; height: 40px; object-fit: cover;';
+            link.appendChild(image);
+        } else {
+            const placeholder = document.createElement('div');
+            placeholder.className = 'bg-light rounded me-2 d-flex align-items-center justify-content-center';
+            placeholder.style.cssText = 'width: 40px; height: 40px;';
+            const icon = document.createElement('i');
+            icon.className = 'bi bi-image text-muted';
+            placeholder.appendChild(icon);
+            link.appendChild(placeholder);
+        }
+        
+        const title = document.createElement('span');
+        title.className = 'text-dark';
+        title.textContent = result.title;
+        link.appendChild(title);
+        return link;
+    }));
     
     container.style.display = 'block';
 }
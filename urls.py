@@ -10,6 +10,7 @@ urlpatterns = [
     path('recipes/', include('apps.recipes.urls')),
     path('meal-planning/', include('apps.meal_planning.urls')),
     path('shopping/', include('apps.shopping.urls')),
+    path('api/v1/', include('apps.recipes.api_urls')),
 ]
 
 # Serve media files during development